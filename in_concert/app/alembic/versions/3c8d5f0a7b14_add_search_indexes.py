@@ -0,0 +1,63 @@
+"""add search indexes
+
+Revision ID: 3c8d5f0a7b14
+Revises: e7a2c4d81f56
+Create Date: 2026-10-18 14:02:37.518224
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3c8d5f0a7b14"
+down_revision: Union[str, None] = "e7a2c4d81f56"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# same tables, columns and index definitions as in_concert.app.search, copied so that the migration stays stable
+SEARCH_COLUMNS = {"venues": ("name", "city", "about"), "bands": ("name", "city")}
+
+
+def upgrade() -> None:
+    dialect_name = op.get_bind().dialect.name
+    for table_name, column_names in SEARCH_COLUMNS.items():
+        if dialect_name == "sqlite":
+            create_sqlite_search_index(table_name, column_names)
+        elif dialect_name == "postgresql":
+            vector = " || ".join(
+                f"setweight(to_tsvector('simple', coalesce({name}, '')), '{label}')"
+                for name, label in zip(column_names, "ABC")
+            )
+            op.execute(f"CREATE INDEX ix_{table_name}_search ON {table_name} USING gin (({vector}))")
+
+
+def downgrade() -> None:
+    dialect_name = op.get_bind().dialect.name
+    for table_name in SEARCH_COLUMNS:
+        if dialect_name == "sqlite":
+            for suffix in ("ai", "ad", "au"):
+                op.execute(f"DROP TRIGGER IF EXISTS {table_name}_fts_{suffix}")
+            op.execute(f"DROP TABLE IF EXISTS {table_name}_fts")
+        elif dialect_name == "postgresql":
+            op.execute(f"DROP INDEX IF EXISTS ix_{table_name}_search")
+
+
+def create_sqlite_search_index(table_name: str, column_names: tuple[str, ...]) -> None:
+    """Create an external content fts5 table kept in sync by triggers, and index the existing rows."""
+    fts_name = f"{table_name}_fts"
+    columns = ", ".join(column_names)
+    new_values = ", ".join(f"new.{name}" for name in column_names)
+    old_values = ", ".join(f"old.{name}" for name in column_names)
+    delete_old = f"INSERT INTO {fts_name}({fts_name}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+    insert_new = f"INSERT INTO {fts_name}(rowid, {columns}) VALUES (new.id, {new_values});"
+    op.execute(
+        f"CREATE VIRTUAL TABLE {fts_name} USING fts5({columns}, content='{table_name}', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    op.execute(f"INSERT INTO {fts_name}({fts_name}) VALUES ('rebuild')")
+    op.execute(f"CREATE TRIGGER {fts_name}_ai AFTER INSERT ON {table_name} BEGIN {insert_new} END")
+    op.execute(f"CREATE TRIGGER {fts_name}_ad AFTER DELETE ON {table_name} BEGIN {delete_old} END")
+    op.execute(
+        f"CREATE TRIGGER {fts_name}_au AFTER UPDATE OF {columns} ON {table_name} BEGIN {delete_old} {insert_new} END"
+    )
@@ -0,0 +1,34 @@
+"""add updated at
+
+Revision ID: 5d0f7b3c9e21
+Revises: a840e84e705b
+Create Date: 2026-10-18 10:12:41.518204
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5d0f7b3c9e21"
+down_revision: Union[str, None] = "a840e84e705b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # batch mode, sqlite cannot add a column with a non constant default in place
+    for table_name in ("venues", "bands"):
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.add_column(
+                sa.Column("updated_at", sa.DateTime(), server_default=sa.text("(CURRENT_TIMESTAMP)"), nullable=False)
+            )
+            batch_op.create_index(f"ix_{table_name}_updated_at", ["updated_at"], unique=False)
+
+
+def downgrade() -> None:
+    for table_name in ("venues", "bands"):
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.drop_index(f"ix_{table_name}_updated_at")
+            batch_op.drop_column("updated_at")
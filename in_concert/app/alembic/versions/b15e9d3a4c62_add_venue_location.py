@@ -0,0 +1,32 @@
+"""add venue location
+
+Revision ID: b15e9d3a4c62
+Revises: 3c8d5f0a7b14
+Create Date: 2026-10-18 15:11:52.904316
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b15e9d3a4c62"
+down_revision: Union[str, None] = "3c8d5f0a7b14"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # no batch mode, recreating the table on sqlite would drop the triggers of the search index
+    op.add_column("venues", sa.Column("latitude", sa.Float(), nullable=True))
+    op.add_column("venues", sa.Column("longitude", sa.Float(), nullable=True))
+    op.add_column("venues", sa.Column("geo_cell", sa.Integer(), nullable=True))
+    op.create_index("ix_venues_geo_cell", "venues", ["geo_cell", "latitude", "longitude"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_venues_geo_cell", table_name="venues")
+    op.drop_column("venues", "geo_cell")
+    op.drop_column("venues", "longitude")
+    op.drop_column("venues", "latitude")
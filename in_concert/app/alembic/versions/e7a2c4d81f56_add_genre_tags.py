@@ -0,0 +1,99 @@
+"""add genre tags
+
+Revision ID: e7a2c4d81f56
+Revises: 9b4e1a6f2c83
+Create Date: 2026-10-18 12:21:09.332871
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e7a2c4d81f56"
+down_revision: Union[str, None] = "9b4e1a6f2c83"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 10_000
+GENRE_NAME_MAX_LENGTH = 30
+
+
+def upgrade() -> None:
+    op.create_table(
+        "genres",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=GENRE_NAME_MAX_LENGTH), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("name"),
+    )
+    op.create_table(
+        "band_genres",
+        sa.Column("band_id", sa.Integer(), nullable=False),
+        sa.Column("genre_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["band_id"], ["bands.id"]),
+        sa.ForeignKeyConstraint(["genre_id"], ["genres.id"]),
+        sa.PrimaryKeyConstraint("band_id", "genre_id"),
+    )
+    op.create_index("ix_band_genres_genre_id_band_id", "band_genres", ["genre_id", "band_id"], unique=False)
+    op.create_table(
+        "venue_genres",
+        sa.Column("venue_id", sa.Integer(), nullable=False),
+        sa.Column("genre_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["genre_id"], ["genres.id"]),
+        sa.ForeignKeyConstraint(["venue_id"], ["venues.id"]),
+        sa.PrimaryKeyConstraint("venue_id", "genre_id"),
+    )
+    op.create_index("ix_venue_genres_genre_id_venue_id", "venue_genres", ["genre_id", "venue_id"], unique=False)
+
+    backfill_genre_tags("venues", "venue_genres", "venue_id")
+    backfill_genre_tags("bands", "band_genres", "band_id")
+    # genres are looked up through the tags, the indexes of the genres strings serve no query anymore
+    op.drop_index("ix_venues_genres", table_name="venues")
+    op.drop_index("ix_bands_genres", table_name="bands")
+
+
+def downgrade() -> None:
+    op.create_index("ix_bands_genres", "bands", ["genres"], unique=False)
+    op.create_index("ix_venues_genres", "venues", ["genres"], unique=False)
+    op.drop_index("ix_venue_genres_genre_id_venue_id", table_name="venue_genres")
+    op.drop_table("venue_genres")
+    op.drop_index("ix_band_genres_genre_id_band_id", table_name="band_genres")
+    op.drop_table("band_genres")
+    op.drop_table("genres")
+
+
+def backfill_genre_tags(table_name: str, association_name: str, tagged_id_name: str) -> None:
+    """Tag the existing entries with the genres of their comma separated genres string, in batches of entries."""
+    connection = op.get_bind()
+    entries = sa.table(table_name, sa.column("id", sa.Integer), sa.column("genres", sa.String))
+    genres = sa.table("genres", sa.column("id", sa.Integer), sa.column("name", sa.String))
+    association = sa.table(association_name, sa.column(tagged_id_name, sa.Integer), sa.column("genre_id", sa.Integer))
+    genre_ids: dict[str, int] = dict(connection.execute(sa.select(genres.c.name, genres.c.id)).all())
+
+    last_id = 0
+    while batch := connection.execute(
+        sa.select(entries.c.id, entries.c.genres)
+        .where(entries.c.id > last_id, entries.c.genres.is_not(None))
+        .order_by(entries.c.id)
+        .limit(BACKFILL_BATCH_SIZE)
+    ).all():
+        last_id = batch[-1].id
+        # same normalization as in_concert.app.models.parse_genres, copied so that the migration stays stable
+        links = [
+            (entry_id, name)
+            for entry_id, genres_string in batch
+            for name in dict.fromkeys(
+                name.strip().lower()[:GENRE_NAME_MAX_LENGTH].rstrip() for name in genres_string.split(",")
+            )
+            if name
+        ]
+        if new_names := {name for _, name in links} - genre_ids.keys():
+            connection.execute(sa.insert(genres), [{"name": name} for name in sorted(new_names)])
+            genre_ids = dict(connection.execute(sa.select(genres.c.name, genres.c.id)).all())
+        if links:
+            connection.execute(
+                sa.insert(association),
+                [{tagged_id_name: entry_id, "genre_id": genre_ids[name]} for entry_id, name in links],
+            )
@@ -1,61 +1,173 @@
 import asyncio
-from typing import Annotated, Any
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+from datetime import datetime
+from typing import Annotated, Any, Optional
 
+import httpx
 import jwt
 import openfga_sdk
+import sqlalchemy.exc
 from authlib.integrations.starlette_client import OAuth
-from fastapi import Depends, FastAPI, HTTPException, Request, Response, Security
-from fastapi.responses import HTMLResponse
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, Security
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from jwt.jwks_client import PyJWKClient
+from pydantic import BaseModel
 from sqlalchemy import engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
 from starlette.middleware.sessions import SessionMiddleware
-from starlette.status import HTTP_404_NOT_FOUND
+from starlette.status import (
+    HTTP_403_FORBIDDEN,
+    HTTP_404_NOT_FOUND,
+    HTTP_409_CONFLICT,
+    HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+    HTTP_422_UNPROCESSABLE_ENTITY,
+)
 from starlette_wtf import StarletteForm
 
 from definitions import PROJECT_ROOT
+from in_concert.app.bulk_import import (
+    CSV_CONTENT_TYPES,
+    NDJSON_CONTENT_TYPES,
+    import_records,
+    iter_lines,
+    iter_records,
+    permission_tuples,
+)
+from in_concert.app.catalog_export import export_ndjson
 from in_concert.app.forms import BandForm, VenueForm
-from in_concert.app.models import Band, Base, User, Venue, delete_db_entry
-from in_concert.app.schemas import BandSchema, UserSchema, VenueSchema
+from in_concert.app.geo import get_nearby
+from in_concert.app.hold_expiry import HoldExpiryScheduler
+from in_concert.app.local_authorization import UserAuthorizerLocal
+from in_concert.app.models import (
+    Band,
+    BandListItem,
+    Base,
+    Event,
+    User,
+    Venue,
+    VenueListItem,
+    delete_db_entry_with_tombstone,
+    get_page,
+)
+from in_concert.app.page_cache import (
+    InMemoryPageCacheBackend,
+    PageCache,
+    etag_matches,
+)
+from in_concert.app.reservations import (
+    ReservationConflictError,
+    check_event_managers,
+    confirm_reservation,
+    create_event,
+    get_available_seats,
+    has_events,
+    hold_seats,
+    release_reservation,
+)
+from in_concert.app.schemas import (
+    BandExportSchema,
+    BandListItemSchema,
+    BandSchema,
+    EventSchema,
+    ImportReportSchema,
+    NearbyVenueSchema,
+    PageSchema,
+    ReservationRequestSchema,
+    ReservationSchema,
+    SeatSchema,
+    UserSchema,
+    VenueExportSchema,
+    VenueListItemSchema,
+    VenueSchema,
+)
+from in_concert.app.search import search
+from in_concert.app.seat_map import SeatMapCache
+from in_concert.cache import TTLCache
+from in_concert.dependencies.auth.jwks_client import AsyncJWKSClient
+from in_concert.dependencies.auth.server_metadata import ServerMetadataClient
 from in_concert.dependencies.auth.token_validation import (
     HTTPBearerWithCookie,
     JwkTokenVerifier,
 )
 from in_concert.dependencies.auth.user_authorization import (
+    RelationshipAuthorizer,
     UserAuthorizerFGA,
     UserAuthorizerJWT,
     UserOAuth2Integrator,
 )
-from in_concert.dependencies.db_session import DBSessionDependency
+from in_concert.dependencies.db_session import (
+    create_db_session_dependency,
+    run_and_commit,
+    run_in_session,
+)
+from in_concert.dependencies.http_transport import SharedTransport
+from in_concert.dependencies.schemas import QueueTicketSchema
+from in_concert.dependencies.waiting_room import WaitingRoom
 from in_concert.routers.auth import auth_router
 from in_concert.settings import AppSettings
 
 
 class AppFactory:
     def __init__(self) -> None:
+        self.http_transport: SharedTransport = None
+        self.http_client: httpx.AsyncClient = None
+        self.server_metadata_client: ServerMetadataClient = None
+        self.jwks_client: AsyncJWKSClient = None
         self.user_authorizer_jwt: UserAuthorizerJWT = None
-        self.user_authorizer_fga: UserAuthorizerFGA = None
+        self.user_authorizer_fga: RelationshipAuthorizer = None
         self.user_oauth_integrator: UserOAuth2Integrator = None
+        self.page_cache: PageCache = None
+        self.hold_expiry_scheduler: HoldExpiryScheduler = None
+        self.waiting_room: WaitingRoom = None
+        self.seat_maps: SeatMapCache = None
         self.app = None
 
     def configure(self, app_settings: AppSettings):
+        self.configure_http_client(app_settings)
+        self.configure_server_metadata_client(app_settings)
         self.configure_user_authorizer_jwt(app_settings)
         self.configure_user_authorizer_fga(app_settings)
-        self.configure_user_oauth_integrator()
+        self.configure_user_oauth_integrator(app_settings)
+        self.configure_page_cache(app_settings)
+        self.configure_waiting_room(app_settings)
+
+    def configure_http_client(self, app_settings: AppSettings):
+        # one connection pool for the calls to the identity provider, fga keeps its own aiohttp pool
+        limits = httpx.Limits(
+            max_connections=app_settings.http_max_connections,
+            max_keepalive_connections=app_settings.http_max_keepalive_connections,
+        )
+        self.http_transport = SharedTransport(limits=limits)
+        self.http_client = httpx.AsyncClient(transport=self.http_transport, timeout=app_settings.http_timeout)
+
+    def configure_server_metadata_client(self, app_settings: AppSettings):
+        assert self.http_client
+        metadata_url = f"{app_settings.base_url}/.well-known/openid-configuration"
+        self.server_metadata_client = ServerMetadataClient(
+            metadata_url, http_client=self.http_client, refresh_interval=app_settings.server_metadata_refresh_interval
+        )
 
     def configure_user_authorizer_jwt(self, app_settings: AppSettings):
+        assert self.http_client
         http_bearer = HTTPBearerWithCookie()
-        jwks_url = f"https://{app_settings.domain}/.well-known/jwks.json"
-        jwks_client = PyJWKClient(jwks_url)
-        token_verifier = JwkTokenVerifier(settings=app_settings, jwks_client=jwks_client, decoder=jwt.decode)
+        jwks_url = f"{app_settings.base_url}/.well-known/jwks.json"
+        self.jwks_client = AsyncJWKSClient(
+            jwks_url, http_client=self.http_client, refresh_interval=app_settings.jwks_refresh_interval
+        )
+        payload_cache = TTLCache(maxsize=app_settings.jwt_payload_cache_size, ttl=app_settings.jwt_payload_cache_ttl)
+        token_verifier = JwkTokenVerifier(
+            settings=app_settings, jwks_client=self.jwks_client, decoder=jwt.decode, payload_cache=payload_cache
+        )
         self.user_authorizer_jwt = UserAuthorizerJWT(token_verifier=token_verifier, bearer=http_bearer)
 
     def configure_user_authorizer_fga(self, app_settings: AppSettings):
         assert self.user_authorizer_jwt
         # configure fga auth
         credentials = openfga_sdk.credentials.Credentials(
-            method="client_credentials",
+            method=app_settings.fga_api_credentials_method,
             configuration=openfga_sdk.credentials.CredentialConfiguration(
                 api_issuer=app_settings.fga_api_token_issuer,
                 api_audience=app_settings.fga_api_audience,
@@ -70,40 +182,171 @@ class AppFactory:
             # authorization_model_id=app_settings.fga_model_id,
             credentials=credentials,  # Credentials are not needed if connecting to the Playground API
         )
-        self.user_authorizer_fga = UserAuthorizerFGA(fga_configuration, self.user_authorizer_jwt)
+        fga_configuration.connection_pool_maxsize = app_settings.fga_connection_pool_maxsize
+        self.user_authorizer_fga = UserAuthorizerFGA(
+            fga_configuration,
+            self.user_authorizer_jwt,
+            max_tuples_per_write=app_settings.fga_max_tuples_per_write,
+            check_cache=TTLCache(maxsize=app_settings.fga_check_cache_size, ttl=app_settings.fga_check_cache_ttl),
+        )
 
-    def configure_user_oauth_integrator(self):
+    def configure_user_oauth_integrator(self, app_settings: AppSettings):
         assert self.user_authorizer_jwt
         assert self.user_authorizer_fga
         self.user_oauth_integrator = UserOAuth2Integrator(
-            self.user_authorizer_jwt, user_model=User, user_authorizer_fga=self.user_authorizer_fga
+            self.user_authorizer_jwt,
+            user_model=User,
+            user_authorizer_fga=self.user_authorizer_fga,
+            known_users=TTLCache(maxsize=app_settings.known_user_cache_size, ttl=app_settings.known_user_cache_ttl),
+        )
+
+    def configure_page_cache(self, app_settings: AppSettings):
+        backend = InMemoryPageCacheBackend(maxsize=app_settings.page_cache_size, ttl=app_settings.page_cache_ttl)
+        self.page_cache = PageCache(backend)
+
+    def configure_waiting_room(self, app_settings: AppSettings):
+        assert self.user_authorizer_jwt
+        self.waiting_room = WaitingRoom(
+            self.user_authorizer_jwt,
+            secret_key=app_settings.waiting_room_secret_key,
+            admission_rate=app_settings.waiting_room_admission_rate,
+            burst=app_settings.waiting_room_burst,
+            max_queue_length=app_settings.waiting_room_max_queue_length,
+            token_ttl=app_settings.waiting_room_token_ttl,
         )
 
     def create_app(
         self, app_settings: AppSettings, engine: engine, override_security_dependencies: bool = False
     ) -> FastAPI:
-        app = FastAPI()
+        @asynccontextmanager
+        async def lifespan(app: FastAPI):
+            if isinstance(engine, AsyncEngine):
+                async with engine.begin() as connection:
+                    await connection.run_sync(Base.metadata.create_all)
+            await self.server_metadata_client.start()
+            await self.jwks_client.start()
+            await self.user_authorizer_fga.open()
+            await self.hold_expiry_scheduler.start()
+            await self.seat_maps.start()
+            yield
+            await self.seat_maps.stop()
+            await self.hold_expiry_scheduler.stop()
+            await self.user_authorizer_fga.close()
+            await self.jwks_client.stop()
+            await self.server_metadata_client.stop()
+            await self.http_transport.close()
+
+        app = FastAPI(lifespan=lifespan)
         app.user_oauth_integrator = self.user_oauth_integrator
 
         # configure jwt auth
         app.add_middleware(SessionMiddleware, secret_key=app_settings.middleware_secret_key)
         oauth = OAuth()
+        app.oauth = oauth
+
+        # setup db engine, an async engine gets async sessions
+        db_session_dep = create_db_session_dependency(engine)
+        self.seat_maps = SeatMapCache(
+            db_session_dep.session_factory,
+            maxsize=app_settings.seat_map_cache_size,
+            reconcile_interval=app_settings.seat_map_reconcile_interval,
+        )
+        self.hold_expiry_scheduler = HoldExpiryScheduler(
+            db_session_dep.session_factory,
+            batch_size=app_settings.hold_expiry_batch_size,
+            resync_interval=app_settings.hold_expiry_resync_interval,
+            lag_warning_seconds=app_settings.hold_expiry_lag_warning_seconds,
+            on_seats_released=self.seat_maps.release_seats,
+        )
 
-        # setup db engine
-        db_session_dep = DBSessionDependency(engine)
+        # check the permission tuples in process instead of on the remote fga, writing through to fga if synced
+        if app_settings.authorization_backend == "local":
+            self.user_authorizer_fga = UserAuthorizerLocal(
+                db_session_dep.session_factory,
+                self.user_authorizer_jwt,
+                remote=self.user_authorizer_fga if app_settings.local_authorization_sync_to_fga else None,
+                reload_interval=app_settings.local_authorization_reload_interval,
+                import_from=self.user_authorizer_fga if app_settings.local_authorization_import_from_fga else None,
+            )
+            self.user_oauth_integrator.user_authorizer_fga = self.user_authorizer_fga
 
         # add auth router
         authentication_router = auth_router.create_router(
-            app_settings, oauth, self.user_oauth_integrator, db_session_dep=db_session_dep
+            app_settings,
+            oauth,
+            self.user_oauth_integrator,
+            db_session_dep=db_session_dep,
+            http_transport=self.http_transport,
+            server_metadata_client=self.server_metadata_client,
         )
         app.include_router(authentication_router)
 
-        # setup internal sql dbs
-        Base.metadata.create_all(engine)
+        # setup internal sql dbs, tables of an async engine are created on startup
+        if not isinstance(engine, AsyncEngine):
+            Base.metadata.create_all(engine)
 
         # setup templates
         templates = Jinja2Templates(directory=PROJECT_ROOT / "in_concert/app/templates")
 
+        def accepts_json(request: Request) -> bool:
+            return "application/json" in request.headers.get("accept", "")
+
+        def render_page(
+            request: Request,
+            template_name: str,
+            entries_name: str,
+            entries: list,
+            next_cursor: Optional[int],
+            limit: int,
+            item_schema: type[BaseModel],
+            cursor_param: str = "after",
+        ) -> Any:
+            """Render a page of a list as html, or as json if the client accepts json."""
+            next_url = None
+            if next_cursor is not None:
+                next_url = str(request.url.include_query_params(**{cursor_param: next_cursor, "limit": limit}))
+            if accepts_json(request):
+                items = [item_schema.model_validate(entry) for entry in entries]
+                return PageSchema[item_schema](items=items, next_cursor=next_cursor, next_url=next_url)
+            return templates.TemplateResponse(
+                template_name, {entries_name: entries, "next_url": next_url, "request": request}
+            )
+
+        async def import_entries(
+            request: Request,
+            db_session: Any,
+            user_id: str,
+            schema: type[BaseModel],
+            model_class: Base,
+            object_type: str,
+            namespace: str,
+        ) -> ImportReportSchema:
+            """Import the ndjson or csv body of the request, the current user manages all imported entries."""
+            content_type = request.headers.get("content-type", "").split(";")[0].strip()
+            if content_type not in NDJSON_CONTENT_TYPES + CSV_CONTENT_TYPES:
+                raise HTTPException(
+                    status_code=HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                    detail=f"Expected one of {', '.join(NDJSON_CONTENT_TYPES + CSV_CONTENT_TYPES)}",
+                )
+
+            async def on_inserted(object_ids: list[int]) -> None:
+                self.page_cache.invalidate(namespace)
+                await self.user_oauth_integrator.user_authorizer_fga.add_permission_tuples(
+                    permission_tuples(f"user:{user_id}", ["can_delete", "can_update"], object_type, object_ids)
+                )
+
+            lines = iter_lines(request.stream(), max_line_length=app_settings.import_max_line_length)
+            return await import_records(
+                iter_records(lines, content_type),
+                schema,
+                model_class,
+                db_session,
+                defaults={"manager_id": user_id},
+                on_inserted=on_inserted,
+                chunk_size=app_settings.import_chunk_size,
+                max_errors=app_settings.import_max_errors,
+            )
+
         # mount static files
         app.mount("/static", StaticFiles(directory=PROJECT_ROOT / "in_concert/app/static"), name="static")
 
@@ -122,6 +365,20 @@ class AppFactory:
         async def read_private():
             return {"secret": "secret123"}
 
+        @app.get(
+            "/stats",
+            include_in_schema=False,
+            dependencies=[
+                Security(self.user_oauth_integrator.user_authorizer.is_authorized_current_user, scopes=("read:stats",)),
+            ],
+        )
+        async def read_stats():
+            """Counters of the in-process caches and background tasks, to tune their settings under real traffic."""
+            return {
+                "fga_check_cache": self.user_oauth_integrator.user_authorizer_fga.check_cache.stats(),
+                "hold_expiry": self.hold_expiry_scheduler.stats(),
+            }
+
         @app.post("/users", status_code=201)
         async def create_user(
             user_schema: UserSchema,
@@ -129,7 +386,9 @@ class AppFactory:
             request: Request,
         ):
             user = User(**user_schema.model_dump())
-            user_id: int = user.insert(db_session)
+            user_id: int = await run_in_session(db_session, user.insert)
+            # commit before responding, the session dependency commits only after the response is sent
+            await run_in_session(db_session, Session.commit)
             return {"id": user_id}
 
         @app.api_route(
@@ -153,7 +412,9 @@ class AppFactory:
                 venue_form_dict["manager_id"] = user_id
                 venue_schema = VenueSchema(**venue_form_dict)
                 venue = Venue(**venue_schema.model_dump())
-                venue_id: int = venue.insert(db_session)
+                venue_id: int = await run_in_session(db_session, venue.insert)
+                await run_in_session(db_session, Session.commit)
+                self.page_cache.invalidate("venues")
                 response.status_code = 201
 
                 await self.user_oauth_integrator.user_authorizer_fga.add_permissions(
@@ -165,6 +426,21 @@ class AppFactory:
             html = templates.TemplateResponse("venue_form.html", {"form": venue_form, "request": request})
             return html
 
+        @app.post(
+            "/venues/import",
+            dependencies=[
+                Security(
+                    self.user_oauth_integrator.user_authorizer.is_authorized_current_user, scopes=("create:venues",)
+                ),
+            ],
+        )
+        async def import_venues(
+            db_session: Annotated[Any, Depends(db_session_dep)],
+            user_id: Annotated[str, Depends(self.user_oauth_integrator.user_authorizer.get_current_user_id)],
+            request: Request,
+        ) -> ImportReportSchema:
+            return await import_entries(request, db_session, user_id, VenueSchema, Venue, "venue", "venues")
+
         @app.delete(
             "/venues/{object_id:int}",
             dependencies=[
@@ -182,36 +458,110 @@ class AppFactory:
             db_session: Annotated[Any, Depends(db_session_dep)],
             request: Request,
         ):
+            # events are not deleted along with their venue, they may have sold seats
+            has_events_error = HTTPException(
+                status_code=HTTP_409_CONFLICT, detail="Events take place at the venue, delete them first."
+            )
+            if await run_in_session(db_session, has_events, object_id):
+                raise has_events_error
             try:
-                venue_id = delete_db_entry(db_session, object_id, Venue)
+                venue_id = await run_in_session(db_session, delete_db_entry_with_tombstone, object_id, Venue)
             except KeyError as e:
                 raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=str(e))
+            except sqlalchemy.exc.IntegrityError:
+                # an event was added meanwhile
+                await run_in_session(db_session, Session.rollback)
+                raise has_events_error
             else:
+                await run_in_session(db_session, Session.commit)
+                self.page_cache.invalidate("venues")
                 await self.user_oauth_integrator.user_authorizer_fga.remove_permissions(
                     request=request, object_type="venue", object_id=venue_id, relations=["can_delete", "can_update"]
                 )
                 return {"id": venue_id}
 
         @app.get("/list_venues")
-        def list_venues(
+        async def list_venues(
             db_session: Annotated[Any, Depends(db_session_dep)],
             request: Request,
+            after: Optional[int] = None,
+            limit: int = Query(default=app_settings.page_size, ge=1, le=app_settings.max_page_size),
+            genre: Optional[str] = None,
         ):
-            venues = db_session.query(Venue).all()
-            html = templates.TemplateResponse("venues.html", {"venues": venues, "request": request})
-            return html
+            async def render():
+                venues, next_cursor = await run_in_session(
+                    db_session, get_page, Venue, after, limit, VenueListItem, genre
+                )
+                return render_page(request, "venues.html", "venues", venues, next_cursor, limit, VenueListItemSchema)
+
+            if accepts_json(request):
+                return await render()
+            return await self.page_cache.respond(request, "venues", render)
+
+        @app.get("/venues/export")
+        async def export_venues(
+            db_session: Annotated[Any, Depends(db_session_dep)],
+            updated_since: Optional[datetime] = None,
+        ):
+            chunks = export_ndjson(
+                db_session, VenueExportSchema, Venue, updated_since, app_settings.export_partition_size
+            )
+            return StreamingResponse(chunks, media_type="application/x-ndjson")
+
+        @app.get("/venues/search")
+        async def search_venues(
+            db_session: Annotated[Any, Depends(db_session_dep)],
+            request: Request,
+            q: str = Query(min_length=1, max_length=200),
+            offset: int = Query(default=0, ge=0),
+            limit: int = Query(default=app_settings.page_size, ge=1, le=app_settings.max_page_size),
+        ):
+            async def render():
+                venues, next_offset = await run_in_session(
+                    db_session, search, Venue, q, offset, limit, VenueListItem, app_settings.search_max_candidates
+                )
+                return render_page(
+                    request, "venues.html", "venues", venues, next_offset, limit, VenueListItemSchema, "offset"
+                )
+
+            if accepts_json(request):
+                return await render()
+            return await self.page_cache.respond(request, "venues", render)
+
+        @app.get("/venues/nearby")
+        async def list_nearby_venues(
+            db_session: Annotated[Any, Depends(db_session_dep)],
+            request: Request,
+            lat: float = Query(ge=-90, le=90),
+            lon: float = Query(ge=-180, le=180),
+            radius: float = Query(default=app_settings.nearby_radius_km, gt=0, le=app_settings.nearby_max_radius_km),
+            limit: int = Query(default=app_settings.page_size, ge=1, le=app_settings.max_page_size),
+        ):
+            async def render():
+                nearby = await run_in_session(db_session, get_nearby, Venue, lat, lon, radius, limit, VenueListItem)
+                venues = [
+                    NearbyVenueSchema(**asdict(venue), distance_km=round(distance_km, 3))
+                    for venue, distance_km in nearby
+                ]
+                return render_page(request, "venues.html", "venues", venues, None, limit, NearbyVenueSchema)
+
+            if accepts_json(request):
+                return await render()
+            return await self.page_cache.respond(request, "venues", render)
 
         @app.get("/venues/{object_id:int}")
-        def get_venue(
+        async def get_venue(
             object_id: int,
             db_session: Annotated[Any, Depends(db_session_dep)],
             request: Request,
         ):
-            venue = db_session.get(Venue, object_id)
-            if not venue:
-                raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Venue not found")
-            html = templates.TemplateResponse("venue.html", {"venue": venue, "request": request})
-            return html
+            async def render():
+                venue = await run_in_session(db_session, Session.get, Venue, object_id)
+                if not venue:
+                    raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Venue not found")
+                return templates.TemplateResponse("venue.html", {"venue": venue, "request": request})
+
+            return await self.page_cache.respond(request, "venues", render)
 
         @app.api_route(
             "/bands",
@@ -234,7 +584,9 @@ class AppFactory:
                 band_form_dict["manager_id"] = user_id
                 band_schema = BandSchema(**band_form_dict)
                 band = Band(**band_schema.model_dump())
-                band_id: int = band.insert(db_session)
+                band_id: int = await run_in_session(db_session, band.insert)
+                await run_in_session(db_session, Session.commit)
+                self.page_cache.invalidate("bands")
                 response.status_code = 201
 
                 await self.user_oauth_integrator.user_authorizer_fga.add_permissions(
@@ -246,26 +598,230 @@ class AppFactory:
             html = templates.TemplateResponse("band_form.html", {"form": band_form, "request": request})
             return html
 
+        @app.post(
+            "/bands/import",
+            dependencies=[
+                Security(
+                    self.user_oauth_integrator.user_authorizer.is_authorized_current_user, scopes=("create:bands",)
+                ),
+            ],
+        )
+        async def import_bands(
+            db_session: Annotated[Any, Depends(db_session_dep)],
+            user_id: Annotated[str, Depends(self.user_oauth_integrator.user_authorizer.get_current_user_id)],
+            request: Request,
+        ) -> ImportReportSchema:
+            return await import_entries(request, db_session, user_id, BandSchema, Band, "band", "bands")
+
         @app.get("/list_bands")
-        def list_bands(
+        async def list_bands(
             db_session: Annotated[Any, Depends(db_session_dep)],
             request: Request,
+            after: Optional[int] = None,
+            limit: int = Query(default=app_settings.page_size, ge=1, le=app_settings.max_page_size),
+            genre: Optional[str] = None,
         ):
-            bands = db_session.query(Band).all()
-            html = templates.TemplateResponse("bands.html", {"bands": bands, "request": request})
-            return html
+            async def render():
+                bands, next_cursor = await run_in_session(db_session, get_page, Band, after, limit, BandListItem, genre)
+                return render_page(request, "bands.html", "bands", bands, next_cursor, limit, BandListItemSchema)
+
+            if accepts_json(request):
+                return await render()
+            return await self.page_cache.respond(request, "bands", render)
+
+        @app.get("/bands/export")
+        async def export_bands(
+            db_session: Annotated[Any, Depends(db_session_dep)],
+            updated_since: Optional[datetime] = None,
+        ):
+            chunks = export_ndjson(
+                db_session, BandExportSchema, Band, updated_since, app_settings.export_partition_size
+            )
+            return StreamingResponse(chunks, media_type="application/x-ndjson")
+
+        @app.get("/bands/search")
+        async def search_bands(
+            db_session: Annotated[Any, Depends(db_session_dep)],
+            request: Request,
+            q: str = Query(min_length=1, max_length=200),
+            offset: int = Query(default=0, ge=0),
+            limit: int = Query(default=app_settings.page_size, ge=1, le=app_settings.max_page_size),
+        ):
+            async def render():
+                bands, next_offset = await run_in_session(
+                    db_session, search, Band, q, offset, limit, BandListItem, app_settings.search_max_candidates
+                )
+                return render_page(
+                    request, "bands.html", "bands", bands, next_offset, limit, BandListItemSchema, "offset"
+                )
+
+            if accepts_json(request):
+                return await render()
+            return await self.page_cache.respond(request, "bands", render)
 
         @app.get("/bands/{object_id:int}")
-        def get_band(
+        async def get_band(
             object_id: int,
             db_session: Annotated[Any, Depends(db_session_dep)],
             request: Request,
         ):
-            band = db_session.get(Band, object_id)
-            if not band:
-                raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="band not found")
-            html = templates.TemplateResponse("band.html", {"band": band, "request": request})
-            return html
+            async def render():
+                band = await run_in_session(db_session, Session.get, Band, object_id)
+                if not band:
+                    raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="band not found")
+                return templates.TemplateResponse("band.html", {"band": band, "request": request})
+
+            return await self.page_cache.respond(request, "bands", render)
+
+        def hold_seats_as_schema(session: Session, *args, **kwargs) -> ReservationSchema:
+            reservation, seat_ids = hold_seats(session, *args, **kwargs)
+            return ReservationSchema(
+                id=reservation.id,
+                event_id=reservation.event_id,
+                status=reservation.status,
+                expires_at=reservation.expires_at,
+                seat_ids=seat_ids,
+            )
+
+        async def update_reservation(update_fn, reservation_id: int, db_session: Any, user_id: str) -> dict:
+            """Confirm or release a reservation of the current user, mapping failures to http errors.
+
+            update_fn returns the reservation and the ids of the seats it made available.
+            """
+
+            def update_as_dict(session: Session) -> tuple[dict, int, list[int]]:
+                reservation, released_seat_ids = update_fn(session, reservation_id, user_id)
+                return {"id": reservation.id, "status": reservation.status}, reservation.event_id, released_seat_ids
+
+            try:
+                reservation, event_id, released_seat_ids = await run_and_commit(db_session, update_as_dict)
+            except (KeyError, ReservationConflictError) as e:
+                status_code = HTTP_404_NOT_FOUND if isinstance(e, KeyError) else HTTP_409_CONFLICT
+                raise HTTPException(status_code=status_code, detail=str(e))
+            self.seat_maps.set_available(event_id, released_seat_ids, True)
+            return reservation
+
+        async def admit_current_user(
+            request: Request,
+            user_id: Annotated[str, Depends(self.user_oauth_integrator.user_authorizer.get_current_user_id)],
+        ) -> bool:
+            """Admit the request of the authenticated current user through the waiting room."""
+            return await self.waiting_room.admit(request, user_id)
+
+        @app.post(
+            "/events",
+            status_code=201,
+            dependencies=[
+                Security(
+                    self.user_oauth_integrator.user_authorizer.is_authorized_current_user, scopes=("create:events",)
+                ),
+            ],
+        )
+        async def post_event(
+            event_schema: EventSchema,
+            db_session: Annotated[Any, Depends(db_session_dep)],
+            user_id: Annotated[str, Depends(self.user_oauth_integrator.user_authorizer.get_current_user_id)],
+        ):
+            try:
+                await run_in_session(
+                    db_session, check_event_managers, event_schema.venue_id, event_schema.band_id, user_id
+                )
+            except KeyError as e:
+                raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=str(e))
+            except PermissionError as e:
+                raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail=str(e))
+            event = Event(**event_schema.model_dump(exclude={"seat_rows", "seats_per_row"}), manager_id=user_id)
+            seat_labels = [
+                f"{row}-{seat}"
+                for row in range(1, event_schema.seat_rows + 1)
+                for seat in range(1, event_schema.seats_per_row + 1)
+            ]
+            event_id: int = await run_in_session(db_session, create_event, event, seat_labels)
+            await run_in_session(db_session, Session.commit)
+            return {"id": event_id}
+
+        @app.get("/events/{object_id:int}/seats")
+        async def get_event_seats(
+            object_id: int,
+            db_session: Annotated[Any, Depends(db_session_dep)],
+        ) -> list[SeatSchema]:
+            try:
+                seats = await run_in_session(db_session, get_available_seats, object_id)
+            except KeyError as e:
+                raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=str(e))
+            return [SeatSchema.model_validate(seat) for seat in seats]
+
+        @app.get("/events/{object_id:int}/seat-map")
+        async def get_event_seat_map(object_id: int, request: Request) -> Response:
+            """Availability of all seats of the event as a bitmap, served from memory."""
+            try:
+                seat_map = await self.seat_maps.get(object_id)
+            except KeyError as e:
+                raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=str(e))
+            etag = self.seat_maps.etag(seat_map)
+            if etag_matches(request.headers.get("if-none-match"), etag):
+                return Response(status_code=304, headers={"ETag": etag})
+            return Response(seat_map.to_json(), media_type="application/json", headers={"ETag": etag})
+
+        @app.post("/waiting-room", status_code=201)
+        async def join_waiting_room(request: Request, response: Response) -> QueueTicketSchema:
+            queue_ticket = await self.waiting_room.join(request)
+            response.headers["Retry-After"] = str(queue_ticket.retry_after)
+            return queue_ticket
+
+        @app.get("/waiting-room")
+        async def get_waiting_room_position(request: Request, response: Response) -> QueueTicketSchema:
+            queue_ticket = await self.waiting_room.get_position(request)
+            response.headers["Retry-After"] = str(queue_ticket.retry_after)
+            return queue_ticket
+
+        @app.post("/events/{object_id:int}/reservations", status_code=201, dependencies=[Depends(admit_current_user)])
+        async def post_reservation(
+            object_id: int,
+            reservation_request: ReservationRequestSchema,
+            db_session: Annotated[Any, Depends(db_session_dep)],
+            user_id: Annotated[str, Depends(self.user_oauth_integrator.user_authorizer.get_current_user_id)],
+        ) -> ReservationSchema:
+            n_seats = reservation_request.quantity or len(reservation_request.seat_ids)
+            if n_seats > app_settings.max_seats_per_reservation:
+                raise HTTPException(
+                    status_code=HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail=f"At most {app_settings.max_seats_per_reservation} seats per reservation",
+                )
+            try:
+                reservation = await run_and_commit(
+                    db_session,
+                    hold_seats_as_schema,
+                    object_id,
+                    user_id,
+                    app_settings.reservation_hold_seconds,
+                    seat_ids=reservation_request.seat_ids,
+                    quantity=reservation_request.quantity,
+                )
+            except (KeyError, ReservationConflictError) as e:
+                status_code = HTTP_404_NOT_FOUND if isinstance(e, KeyError) else HTTP_409_CONFLICT
+                raise HTTPException(status_code=status_code, detail=str(e))
+            self.hold_expiry_scheduler.schedule(reservation.id, reservation.expires_at)
+            self.seat_maps.set_available(object_id, reservation.seat_ids, False)
+            return reservation
+
+        @app.post("/reservations/{object_id:int}/confirm")
+        async def post_reservation_confirmation(
+            object_id: int,
+            db_session: Annotated[Any, Depends(db_session_dep)],
+            user_id: Annotated[str, Depends(self.user_oauth_integrator.user_authorizer.get_current_user_id)],
+        ):
+            return await update_reservation(
+                lambda *args: (confirm_reservation(*args), []), object_id, db_session, user_id
+            )
+
+        @app.delete("/reservations/{object_id:int}")
+        async def delete_reservation(
+            object_id: int,
+            db_session: Annotated[Any, Depends(db_session_dep)],
+            user_id: Annotated[str, Depends(self.user_oauth_integrator.user_authorizer.get_current_user_id)],
+        ):
+            return await update_reservation(release_reservation, object_id, db_session, user_id)
 
         if override_security_dependencies:
 
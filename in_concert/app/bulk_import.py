@@ -0,0 +1,167 @@
+"""Streaming import of venues and bands from ndjson or csv request bodies."""
+import csv
+import itertools
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Optional, Union
+
+import sqlalchemy.exc
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.orm import Session
+
+from in_concert.app.models import Base, bulk_insert
+from in_concert.app.schemas import ImportErrorSchema, ImportReportSchema
+from in_concert.dependencies.db_session import run_in_session
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl")
+CSV_CONTENT_TYPES = ("text/csv",)
+
+# a record is its line number and either the parsed row or the reason it could not be parsed
+Record = tuple[int, Union[dict, str]]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_length: int) -> AsyncIterator[Optional[str]]:
+    """Split a stream of bytes into lines, holding at most one line in memory.
+
+    :param chunks: utf-8 encoded body, as streamed by starlette
+    :param max_line_length: lines longer than this many bytes are skipped and yielded as None
+    """
+    buffer = b""
+    skipping = False
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if skipping:
+                skipping = False
+                yield None
+            elif len(line) > max_line_length:
+                yield None
+            else:
+                yield line.decode("utf-8", errors="replace").rstrip("\r")
+        if len(buffer) > max_line_length:
+            buffer = b""
+            skipping = True
+    if skipping:
+        yield None
+    elif buffer:
+        yield buffer.decode("utf-8", errors="replace").rstrip("\r")
+
+
+async def iter_records(lines: AsyncIterator[Optional[str]], content_type: str) -> AsyncIterator[Record]:
+    """Parse lines of ndjson or csv into rows, csv rows are keyed by the header in the first line.
+
+    Blank lines are skipped. A csv record must fit on one line. Empty csv fields are read as missing values.
+    """
+    header: Optional[list[str]] = None
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if line is None:
+            yield line_number, "Line too long."
+            continue
+        if not line.strip():
+            continue
+        if content_type in NDJSON_CONTENT_TYPES:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, f"Invalid json: {e}"
+                continue
+            yield line_number, row if isinstance(row, dict) else "Expected a json object."
+        elif header is None:
+            header = next(csv.reader([line]))
+        else:
+            values = next(csv.reader([line]))
+            if len(values) != len(header):
+                yield line_number, f"Expected {len(header)} fields, got {len(values)}."
+                continue
+            yield line_number, {name: value for name, value in zip(header, values) if value != ""}
+
+
+async def import_records(
+    records: AsyncIterator[Record],
+    schema: type[BaseModel],
+    model_class: Base,
+    db_session: Any,
+    defaults: dict,
+    on_inserted: Callable[[list[int]], Awaitable[None]],
+    chunk_size: int,
+    max_errors: int,
+) -> ImportReportSchema:
+    """Validate records with schema and insert them in chunks, one transaction and one bulk insert per chunk.
+
+    Rows that fail to validate or to insert, because they violate a constraint or do not fit their columns, are
+    reported and skipped, they do not abort the import. Memory is bounded
+    by the chunk size and max_errors, whatever the number of records.
+
+    :param records: line numbers and parsed rows, as yielded by iter_records
+    :param schema: schema to validate each row with
+    :param model_class: table to insert into
+    :param db_session: sync or async session as injected by the session dependency
+    :param defaults: fields overriding those of each row, e.g. the manager id
+    :param on_inserted: called with the ids of each committed chunk, e.g. to grant permissions
+    :param chunk_size: rows per insert
+    :param max_errors: maximum number of errors reported in detail, further errors are only counted
+    :return: report of the import
+    """
+    report = ImportReportSchema()
+
+    def fail(line: int, error: str) -> None:
+        report.failed += 1
+        if len(report.errors) < max_errors:
+            report.errors.append(ImportErrorSchema(line=line, error=error))
+
+    async def insert_chunk(chunk: list[tuple[int, dict]]) -> None:
+        try:
+            ids = await run_in_session(db_session, insert_and_commit, [row for _, row in chunk])
+        except (sqlalchemy.exc.IntegrityError, sqlalchemy.exc.DataError) as e:
+            await run_in_session(db_session, Session.rollback)
+            if len(chunk) == 1:
+                if isinstance(e, sqlalchemy.exc.IntegrityError):
+                    fail(chunk[0][0], "Row violates a database constraint.")
+                else:
+                    fail(chunk[0][0], "Row holds a value the database column cannot store.")
+                return
+            # retry row by row to find the offending rows
+            for line_and_row in chunk:
+                await insert_chunk([line_and_row])
+            return
+        report.imported += len(ids)
+        await on_inserted(ids)
+
+    def insert_and_commit(session: Session, rows: list[dict]) -> list[int]:
+        ids = bulk_insert(session, model_class, rows)
+        session.commit()
+        return ids
+
+    async def valid_rows() -> AsyncIterator[tuple[int, dict]]:
+        async for line, row in records:
+            if isinstance(row, str):
+                fail(line, row)
+                continue
+            try:
+                yield line, schema(**{**row, **defaults}).model_dump()
+            except ValidationError as e:
+                fail(line, "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()))
+
+    chunk: list[tuple[int, dict]] = []
+    async for line_and_row in valid_rows():
+        chunk.append(line_and_row)
+        if len(chunk) >= chunk_size:
+            await insert_chunk(chunk)
+            chunk = []
+    if chunk:
+        await insert_chunk(chunk)
+    return report
+
+
+def permission_tuples(
+    user: str, relations: list[str], object_type: str, object_ids: list[int]
+) -> Iterator[tuple[str, str, str]]:
+    """Get the permission tuples granting user the relations on each object.
+
+    >>> list(permission_tuples("user:1", ["can_delete"], "venue", [1, 2]))
+    [('user:1', 'can_delete', 'venue:1'), ('user:1', 'can_delete', 'venue:2')]
+    """
+    for object_id, relation in itertools.product(object_ids, relations):
+        yield user, relation, f"{object_type}:{object_id}"
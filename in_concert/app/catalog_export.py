@@ -0,0 +1,53 @@
+"""Streaming export of venues and bands as ndjson.
+
+Incremental exports, those given updated_since, end with a tombstone line {"id": ..., "deleted_at": ...} for each entry
+deleted since, so that their consumers drop it.
+"""
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import select
+
+from in_concert.app.models import Base, Tombstone
+from in_concert.app.schemas import TombstoneSchema
+from in_concert.dependencies.db_session import stream_in_session
+
+
+async def export_ndjson(
+    db_session: Any,
+    schema: type[BaseModel],
+    model_class: Base,
+    updated_since: Optional[datetime],
+    partition_size: int,
+) -> AsyncIterator[bytes]:
+    """Stream all entries of a table as ndjson, ordered by id, one chunk per partition of rows.
+
+    Only the columns of the schema are selected, so no orm objects are created. Given updated_since, the entries
+    deleted since follow as tombstones, ordered by deletion.
+
+    :param db_session: sync or async session as injected by the session dependency
+    :param schema: schema to serialize each row with
+    :param model_class: table to export
+    :param updated_since: only export entries updated at or after this time, naive datetimes are taken as utc
+    :param partition_size: rows fetched and serialized at a time
+    """
+    query = select(*(getattr(model_class, name) for name in schema.model_fields)).order_by(model_class.id)
+    if updated_since is not None:
+        if updated_since.tzinfo is not None:
+            updated_since = updated_since.astimezone(timezone.utc).replace(tzinfo=None)
+        query = query.where(model_class.updated_at >= updated_since)
+    async for partition in stream_in_session(db_session, query, partition_size):
+        yield b"".join(schema(**row._mapping).model_dump_json().encode() + b"\n" for row in partition)
+    if updated_since is None:
+        return
+    query = (
+        select(Tombstone.entry_id, Tombstone.deleted_at)
+        .where(Tombstone.table_name == model_class.__tablename__, Tombstone.deleted_at >= updated_since)
+        .order_by(Tombstone.id)
+    )
+    async for partition in stream_in_session(db_session, query, partition_size):
+        yield b"".join(
+            TombstoneSchema(id=entry_id, deleted_at=deleted_at).model_dump_json().encode() + b"\n"
+            for entry_id, deleted_at in partition
+        )
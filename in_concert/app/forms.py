@@ -1,6 +1,6 @@
 from starlette_wtf import StarletteForm
-from wtforms import IntegerField, StringField
-from wtforms.validators import DataRequired, Length
+from wtforms import FloatField, IntegerField, StringField
+from wtforms.validators import DataRequired, Length, NumberRange, Optional
 
 
 class VenueForm(StarletteForm):
@@ -14,6 +14,8 @@ class VenueForm(StarletteForm):
     website = StringField("website", validators=[Length(max=30)])
     image_link = StringField("image_link", validators=[Length(max=300)])
     genres = StringField("genres", validators=[Length(max=30)])
+    latitude = FloatField("latitude", validators=[Optional(), NumberRange(min=-90, max=90)])
+    longitude = FloatField("longitude", validators=[Optional(), NumberRange(min=-180, max=180)])
 
 
 class BandForm(StarletteForm):
@@ -0,0 +1,153 @@
+"""Proximity search of venues, a grid cell index prefilters the candidates which are then ranked by distance."""
+import heapq
+import math
+from dataclasses import fields
+from typing import Optional
+
+from sqlalchemy import or_, select, union_all
+from sqlalchemy.orm import DeclarativeBase, Session
+
+# mean earth radius
+EARTH_RADIUS_KM = 6371.0088
+# edge of a grid cell, 0.1 degrees of latitude are about 11 km
+CELL_DEGREES = 0.1
+N_LONGITUDE_CELLS = round(360 / CELL_DEGREES)
+
+# a longitude range, bounding boxes crossing the antimeridian are split in two
+LongitudeRange = tuple[float, float]
+
+
+def geo_cell(latitude: Optional[float], longitude: Optional[float]) -> Optional[int]:
+    """Get the id of the grid cell containing a location, cells of a row of latitude have consecutive ids.
+
+    >>> geo_cell(52.52, 13.405)
+    5131934
+    >>> geo_cell(None, 13.405) is None
+    True
+    """
+    if latitude is None or longitude is None:
+        return None
+    row = math.floor((latitude + 90) / CELL_DEGREES)
+    return row * N_LONGITUDE_CELLS + _longitude_cell(longitude)
+
+
+def _longitude_cell(longitude: float) -> int:
+    # longitude 180 is the eastern edge of the last cell
+    return min(math.floor((longitude + 180) / CELL_DEGREES), N_LONGITUDE_CELLS - 1)
+
+
+def bounding_box(latitude: float, longitude: float, radius_km: float) -> tuple[float, float, list[LongitudeRange]]:
+    """Get the smallest latitude and longitude ranges containing a circle on the earth's surface.
+
+    :return: minimum and maximum latitude, and one longitude range, or two if the box crosses the antimeridian
+    """
+    angular_radius = radius_km / EARTH_RADIUS_KM
+    delta_latitude = math.degrees(angular_radius)
+    min_latitude, max_latitude = latitude - delta_latitude, latitude + delta_latitude
+    if min_latitude <= -90 or max_latitude >= 90 or angular_radius >= math.pi / 2:
+        # the circle contains a pole, all longitudes are in range
+        return max(min_latitude, -90.0), min(max_latitude, 90.0), [(-180.0, 180.0)]
+    delta_longitude = math.degrees(math.asin(math.sin(angular_radius) / math.cos(math.radians(latitude))))
+    min_longitude, max_longitude = longitude - delta_longitude, longitude + delta_longitude
+    if min_longitude < -180:
+        return min_latitude, max_latitude, [(min_longitude + 360, 180.0), (-180.0, max_longitude)]
+    if max_longitude > 180:
+        return min_latitude, max_latitude, [(min_longitude, 180.0), (-180.0, max_longitude - 360)]
+    return min_latitude, max_latitude, [(min_longitude, max_longitude)]
+
+
+def cell_ranges(latitude: float, longitude: float, radius_km: float) -> list[tuple[int, int]]:
+    """Get the ranges of grid cell ids covering the bounding box of a circle, one range per row and longitude range.
+
+    >>> cell_ranges(52.52, 13.405, 10)
+    [(5128332, 5128335), (5131932, 5131935), (5135532, 5135535)]
+    """
+    min_latitude, max_latitude, longitude_ranges = bounding_box(latitude, longitude, radius_km)
+    first_row = math.floor((min_latitude + 90) / CELL_DEGREES)
+    last_row = min(math.floor((max_latitude + 90) / CELL_DEGREES), round(180 / CELL_DEGREES))
+    return [
+        (
+            row * N_LONGITUDE_CELLS + _longitude_cell(min_longitude),
+            row * N_LONGITUDE_CELLS + _longitude_cell(max_longitude),
+        )
+        for row in range(first_row, last_row + 1)
+        for min_longitude, max_longitude in longitude_ranges
+    ]
+
+
+def haversine_terms(latitude: float, longitude: float, latitudes: list[float], longitudes: list[float]) -> list[float]:
+    """Get the haversine of the central angle between a location and each of many, in one pass over the columns.
+
+    The haversine grows with the distance, so candidates are ranked by it and only the nearest are converted to km.
+    """
+    cos_latitude = math.cos(math.radians(latitude))
+    rad, half_rad = math.pi / 180, math.pi / 360
+    sin, cos = math.sin, math.cos
+    return [
+        sin((lat - latitude) * half_rad) ** 2 + cos_latitude * cos(lat * rad) * sin((lon - longitude) * half_rad) ** 2
+        for lat, lon in zip(latitudes, longitudes)
+    ]
+
+
+def haversine_km(haversine_term: float) -> float:
+    """Convert a haversine term to the great circle distance in km.
+
+    >>> round(haversine_km(haversine_terms(52.52, 13.405, [48.1375], [11.575])[0]))
+    504
+    """
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(haversine_term, 1.0)))
+
+
+def get_nearby(
+    session: Session,
+    model_class: type[DeclarativeBase],
+    latitude: float,
+    longitude: float,
+    radius_km: float,
+    limit: int,
+    read_model: type,
+) -> list[tuple[object, float]]:
+    """Get the entries within a radius of a location, nearest first.
+
+    The locations in the grid cells covering the bounding box of the circle are read from the covering cell index,
+    ranked by their exact great circle distance, and only the nearest entries are loaded as read models.
+
+    :param session: alchemy orm session
+    :param model_class: table with latitude, longitude and geo_cell columns
+    :param latitude: latitude of the location in degrees
+    :param longitude: longitude of the location in degrees
+    :param radius_km: maximum distance in km
+    :param limit: maximum number of entries
+    :param read_model: dataclass to load the entries as, only its fields are selected
+    :return: the entries and their distance in km
+    """
+    min_latitude, max_latitude, longitude_ranges = bounding_box(latitude, longitude, radius_km)
+    in_box = (
+        model_class.latitude.between(min_latitude, max_latitude),
+        or_(*(model_class.longitude.between(first, last) for first, last in longitude_ranges)),
+    )
+    # one index range scan per range of cells, the ranges are disjoint so that no deduplication is needed
+    candidates_query = union_all(
+        *(
+            select(model_class.id, model_class.latitude, model_class.longitude).where(
+                model_class.geo_cell.between(first, last), *in_box
+            )
+            for first, last in cell_ranges(latitude, longitude, radius_km)
+        )
+    )
+    # plain tuples through the connection, the orm result processing would cost more than the ranking
+    candidates = session.connection().execute(candidates_query).all()
+    if not candidates:
+        return []
+    ids, latitudes, longitudes = zip(*candidates)
+    terms = haversine_terms(latitude, longitude, latitudes, longitudes)
+    max_term = math.sin(radius_km / EARTH_RADIUS_KM / 2) ** 2
+    nearest = heapq.nsmallest(
+        limit, ((term, entry_id) for term, entry_id in zip(terms, ids) if term <= max_term), key=lambda pair: pair[0]
+    )
+    if not nearest:
+        return []
+    columns = (getattr(model_class, field.name) for field in fields(read_model))
+    rows = session.execute(select(*columns).where(model_class.id.in_([entry_id for _, entry_id in nearest])))
+    entries = {row.id: read_model(*row) for row in rows}
+    return [(entries[entry_id], haversine_km(term)) for term, entry_id in nearest if entry_id in entries]
@@ -0,0 +1,153 @@
+"""Background release of expired seat holds, driven by a min-heap of hold deadlines."""
+import asyncio
+import heapq
+from datetime import datetime
+from typing import Callable, Optional, Union
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from in_concert.app.models import utcnow
+from in_concert.app.reservations import expire_holds, get_held_reservations
+from in_concert.dependencies.db_session import run_in_new_session
+from in_concert.logging_in_concert.named_loggers_base import LoggedClass
+
+
+class HoldExpiryScheduler(LoggedClass):
+    """Return the seats of expired holds to the inventory shortly after the holds expire.
+
+    The deadlines of the held reservations are kept in a min-heap, so the scheduler sleeps until the next deadline and
+    never scans the reservations table for expired holds. Due reservations are released in batches of two updates.
+    The heap is rebuilt from the database on start and every resync_interval, which picks up holds made by other
+    processes and ones scheduled before a restart.
+
+    Seats of an expired hold are available to buyers whether or not the scheduler has run, releasing them only
+    tidies the reservation's status and the seat rows.
+
+    >>> scheduler = HoldExpiryScheduler(session_factory=None)
+    >>> scheduler.stats()
+    {'pending': 0, 'released': 0, 'batches': 0, 'mean_lag_seconds': 0.0, 'max_lag_seconds': 0.0}
+    """
+
+    def __init__(
+        self,
+        session_factory: Union[sessionmaker, async_sessionmaker],
+        batch_size: int = 500,
+        resync_interval: float = 60.0,
+        clock: Callable[[], datetime] = utcnow,
+        on_seats_released: Optional[Callable[[list[tuple[int, int]]], None]] = None,
+        lag_warning_seconds: float = 30.0,
+    ) -> None:
+        """Init the HoldExpiryScheduler.
+
+        :param session_factory: factory of sync or async sessions, as created by the session dependency
+        :param batch_size: maximum number of reservations released per transaction
+        :param resync_interval: seconds between rebuilds of the heap from the database
+        :param clock: naive utc clock, as the reservation timestamps are stored
+        :param on_seats_released: called with the event id and id of the seats released by each batch
+        :param lag_warning_seconds: a batch releasing holds later than this after their expiry is logged as a warning
+        """
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.resync_interval = resync_interval
+        self.clock = clock
+        self.on_seats_released = on_seats_released
+        self.lag_warning_seconds = lag_warning_seconds
+        self.released = 0
+        self.batches = 0
+        self.total_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+        self._deadlines: list[tuple[datetime, int]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Load the held reservations and start releasing expired holds in the background. Call it on app startup."""
+        self._wakeup = asyncio.Event()
+        await self.rebuild()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task. Call it once on app shutdown."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def schedule(self, reservation_id: int, expires_at: datetime) -> None:
+        """Schedule the release of a held reservation at its expiry.
+
+        Reservations confirmed or released before their expiry need not be unscheduled, they are skipped when due.
+        """
+        heapq.heappush(self._deadlines, (expires_at, reservation_id))
+        if self._wakeup is not None and self._deadlines[0][1] == reservation_id:
+            self._wakeup.set()
+
+    async def rebuild(self) -> None:
+        """Replace the heap by the deadlines of all held reservations in the database."""
+        deadlines = await run_in_new_session(self.session_factory, get_held_reservations)
+        heapq.heapify(deadlines)
+        self._deadlines = deadlines
+        self.logger.debug("Loaded %d held reservations", len(deadlines))
+
+    async def release_due(self) -> int:
+        """Release the reservations whose holds expired, one transaction per batch.
+
+        :return: number of reservations released
+        """
+        n_released = 0
+        while self._deadlines and self._deadlines[0][0] <= self.clock():
+            now = self.clock()
+            due_ids = []
+            while self._deadlines and self._deadlines[0][0] <= now and len(due_ids) < self.batch_size:
+                due_ids.append(heapq.heappop(self._deadlines)[1])
+            released, released_seats = await run_in_new_session(
+                self.session_factory, expire_holds, due_ids, now, commit=True
+            )
+            if self.on_seats_released is not None and released_seats:
+                self.on_seats_released(released_seats)
+            # lag between the expiry of a hold and the release of its seats
+            lags = [(self.clock() - expires_at).total_seconds() for _, expires_at in released]
+            self.released += len(released)
+            self.batches += 1
+            self.total_lag_seconds += sum(lags)
+            self.max_lag_seconds = max([self.max_lag_seconds, *lags])
+            n_released += len(released)
+            self.logger.debug("Released %d of %d due reservations", len(released), len(due_ids))
+            if lags and max(lags) > self.lag_warning_seconds:
+                self.logger.warning("Released %d holds up to %.1f s after their expiry", len(released), max(lags))
+        return n_released
+
+    def stats(self) -> dict:
+        """Count the released holds and the lag between their expiry and their release, in seconds."""
+        return {
+            "pending": len(self._deadlines),
+            "released": self.released,
+            "batches": self.batches,
+            "mean_lag_seconds": self.total_lag_seconds / self.released if self.released else 0.0,
+            "max_lag_seconds": self.max_lag_seconds,
+        }
+
+    async def _run(self) -> None:
+        last_rebuild = asyncio.get_running_loop().time()
+        while True:
+            timeout = self.resync_interval - (asyncio.get_running_loop().time() - last_rebuild)
+            if self._deadlines:
+                timeout = min(timeout, (self._deadlines[0][0] - self.clock()).total_seconds())
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(timeout, 0.0))
+            except asyncio.TimeoutError:
+                pass
+            try:
+                if asyncio.get_running_loop().time() - last_rebuild >= self.resync_interval:
+                    last_rebuild = asyncio.get_running_loop().time()
+                    await self.rebuild()
+                await self.release_due()
+            except Exception as exc_info:
+                # the deadlines popped are back after the next rebuild
+                self.logger.warning("Could not release expired holds: %s", exc_info)
+                await asyncio.sleep(1.0)
@@ -0,0 +1,243 @@
+"""In-process authorizer checking the relationship tuples of the fga model against a local index."""
+import asyncio
+from typing import Optional, Union
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+from in_concert.app.models import PermissionTuple
+from in_concert.cache import TTLCache
+from in_concert.dependencies.auth.user_authorization import (
+    RelationshipAuthorizer,
+    UserAuthorizerFGA,
+    UserAuthorizerJWT,
+)
+from in_concert.dependencies.db_session import run_in_new_session
+from in_concert.logging_in_concert.named_loggers_base import LoggedClass
+
+# stored once the tuples of the fga store were imported, no user of the fga model is of type store
+FGA_IMPORT_MARKER = ("store:local", "imported_from", "store:fga")
+
+
+def get_permission_tuples(session: Session) -> list[tuple[str, str, str]]:
+    """Get all (user, relation, object) tuples."""
+    query = select(PermissionTuple.user, PermissionTuple.relation, PermissionTuple.object_)
+    return [tuple(row) for row in session.execute(query)]
+
+
+def has_permission_tuple(session: Session, permission_tuple: tuple[str, str, str]) -> bool:
+    """Check whether the (user, relation, object) tuple is stored."""
+    user, relation, object_ = permission_tuple
+    query = select(PermissionTuple.user).where(
+        PermissionTuple.user == user, PermissionTuple.relation == relation, PermissionTuple.object_ == object_
+    )
+    return session.execute(query).first() is not None
+
+
+class PermissionTupleIndex(LoggedClass):
+    """Index the permission tuples in memory as object -> relation -> users.
+
+    The index is loaded from the database on first use. The writes of this process are applied in place, and a
+    background pass reloads the index every reload_interval to pick up the writes of other processes. Until then, a
+    permission revoked by another process is still granted here, so keep the interval short where that matters.
+    """
+
+    def __init__(self, session_factory: Union[sessionmaker, async_sessionmaker], reload_interval: float = 60.0) -> None:
+        """Init the PermissionTupleIndex.
+
+        :param session_factory: factory of sync or async sessions, as created by the session dependency
+        :param reload_interval: seconds between reloads of the index from the database
+        """
+        self.session_factory = session_factory
+        self.reload_interval = reload_interval
+        self._users: Optional[dict[str, dict[str, set[str]]]] = None
+        # writes committed while the index is being reloaded, replayed onto the reloaded index
+        self._pending_writes: Optional[list[tuple[list[tuple[str, str, str]], bool]]] = None
+        self._reload_task: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Load the index and start reloading it in the background. Call it on app startup."""
+        await self.reload()
+        self._task = asyncio.create_task(self._reload_periodically())
+
+    async def stop(self) -> None:
+        """Stop the background reload. Call it once on app shutdown."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def contains(self, user: str, relation: str, object_: str) -> bool:
+        """Check whether the tuple exists, loading the index if it was not loaded yet."""
+        if self._users is None:
+            await self.reload()
+        users = self._users.get(object_, {}).get(relation)
+        return users is not None and user in users
+
+    def apply(self, permission_tuples: list[tuple[str, str, str]], delete: bool) -> None:
+        """Apply a committed write of tuples to the index."""
+        if self._pending_writes is not None:
+            self._pending_writes.append((permission_tuples, delete))
+        if self._users is not None:
+            _apply(self._users, permission_tuples, delete)
+
+    async def reload(self) -> None:
+        """Rebuild the index from the database, joining a reload that is already in flight."""
+        if self._reload_task is None or self._reload_task.done():
+            self._reload_task = asyncio.create_task(self._reload())
+        await asyncio.shield(self._reload_task)
+
+    async def _reload(self) -> None:
+        self._pending_writes = []
+        try:
+            users: dict[str, dict[str, set[str]]] = {}
+            _apply(users, await run_in_new_session(self.session_factory, get_permission_tuples), delete=False)
+            # writes committed while loading may be missing in what was read
+            for permission_tuples, delete in self._pending_writes:
+                _apply(users, permission_tuples, delete)
+        finally:
+            self._pending_writes = None
+        self._users = users
+
+    async def _reload_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await self.reload()
+            except Exception as exc_info:
+                self.logger.warning("Could not reload permission tuples: %s", exc_info)
+
+
+def _apply(users: dict[str, dict[str, set[str]]], permission_tuples: list[tuple[str, str, str]], delete: bool) -> None:
+    for user, relation, object_ in permission_tuples:
+        if delete:
+            object_users = users.get(object_, {}).get(relation)
+            if object_users is not None:
+                object_users.discard(user)
+        else:
+            users.setdefault(object_, {}).setdefault(relation, set()).add(user)
+
+
+class PermissionTupleImport(LoggedClass):
+    """Copy the tuples of the fga store into the permission_tuples table, once per database.
+
+    A marker tuple records the import, so that tuples revoked locally later on are not imported again. Processes
+    importing at the same time insert the same tuples, which is harmless.
+    """
+
+    def __init__(
+        self, session_factory: Union[sessionmaker, async_sessionmaker], user_authorizer_fga: UserAuthorizerFGA
+    ) -> None:
+        """Init the PermissionTupleImport.
+
+        :param session_factory: factory of sync or async sessions, as created by the session dependency
+        :param user_authorizer_fga: fga authorizer to read the tuples from
+        """
+        self.session_factory = session_factory
+        self.user_authorizer_fga = user_authorizer_fga
+
+    async def run(self) -> bool:
+        """Import the tuples unless they were imported before.
+
+        If fga cannot be read, the error is logged and the import is retried on the next run, meanwhile only the
+        tuples stored already are checked.
+
+        :return: true if the tuples are imported, by this or an earlier run
+        """
+        try:
+            if await run_in_new_session(self.session_factory, has_permission_tuple, FGA_IMPORT_MARKER):
+                return True
+            async for permission_tuples in self.user_authorizer_fga.read_permission_tuples():
+                if permission_tuples:
+                    await run_in_new_session(
+                        self.session_factory, PermissionTuple.insert_missing, permission_tuples, commit=True
+                    )
+            await run_in_new_session(
+                self.session_factory, PermissionTuple.insert_missing, [FGA_IMPORT_MARKER], commit=True
+            )
+        except Exception as exc_info:
+            self.logger.warning("Could not import permission tuples from fga, checking the stored ones: %s", exc_info)
+            return False
+        return True
+
+
+class UserAuthorizerLocal(RelationshipAuthorizer):
+    """
+    Manage the authorization of the current user based on FGA authorization model, checked in process.
+
+    The tuples are stored in the permission_tuples table and indexed in memory, so that a check is a dict lookup
+    instead of a request to OpenFGA.
+
+    Given a remote fga authorizer, every write is sent to OpenFGA first and only stored locally once OpenFGA accepted
+    it, so that both hold the same tuples and a deployment can switch between the backends. Only the direct tuples are
+    checked, relations that the fga model derives from others, e.g. by usersets, are not resolved.
+
+    Given an fga authorizer to import from, the tuples of the fga store are copied into the table once on open, so
+    that the permissions granted while the deployment used the fga backend hold after switching to the local one,
+    see PermissionTupleImport.
+
+    Each process checks against its own index, which picks up the writes of other processes only on its next reload,
+    see PermissionTupleIndex.
+    """
+
+    def __init__(
+        self,
+        session_factory: Union[sessionmaker, async_sessionmaker],
+        user_authorizer_jwt: UserAuthorizerJWT,
+        remote: Optional[UserAuthorizerFGA] = None,
+        max_tuples_per_write: int = 500,
+        reload_interval: float = 60.0,
+        check_cache: Optional[TTLCache] = None,
+        import_from: Optional[UserAuthorizerFGA] = None,
+    ) -> None:
+        """Init the UserAuthorizerLocal.
+
+        :param session_factory: factory of sync or async sessions, as created by the session dependency
+        :param user_authorizer_jwt: authorizer providing the current user's id
+        :param remote: fga authorizer to write the tuples through to, local only if not given
+        :param max_tuples_per_write: maximum number of tuples written in one transaction
+        :param reload_interval: seconds between reloads of the index from the database
+        :param check_cache: cache of check decisions keyed on (user, relation, object), disabled if not given
+        :param import_from: fga authorizer whose tuples are imported on open unless imported before
+        """
+        super().__init__(user_authorizer_jwt, max_tuples_per_write=max_tuples_per_write, check_cache=check_cache)
+        self.session_factory = session_factory
+        self.remote = remote
+        self.import_from = import_from
+        self.index = PermissionTupleIndex(session_factory, reload_interval=reload_interval)
+
+    async def open(self) -> None:
+        """Open the remote authorizer, import the fga tuples if due and load the index. Call it once on app startup."""
+        if self.remote is not None:
+            await self.remote.open()
+        if self.import_from is not None:
+            try:
+                await PermissionTupleImport(self.session_factory, self.import_from).run()
+            finally:
+                if self.import_from is not self.remote:
+                    await self.import_from.close()
+        await self.index.start()
+
+    async def close(self) -> None:
+        """Stop reloading the index and close the remote authorizer. Call it once on app shutdown."""
+        await self.index.stop()
+        if self.remote is not None:
+            await self.remote.close()
+
+    async def _check_tuple(self, user: str, relation: str, object_: str) -> bool:
+        return await self.index.contains(user, relation, object_)
+
+    async def _write_tuples(self, permission_tuples: list[tuple[str, str, str]], delete: bool) -> None:
+        if self.remote is not None:
+            if delete:
+                await self.remote.remove_permission_tuples(permission_tuples)
+            else:
+                await self.remote.add_permission_tuples(permission_tuples)
+        write = PermissionTuple.delete_all if delete else PermissionTuple.insert_missing
+        await run_in_new_session(self.session_factory, write, permission_tuples, commit=True)
+        self.index.apply(permission_tuples, delete)
@@ -1,7 +1,7 @@
 import uvicorn
-from sqlalchemy import Engine, create_engine
 
 from in_concert.app import AppFactory
+from in_concert.dependencies.db_session import create_db_engine
 from in_concert.settings import AppSettingsDev
 
 if __name__ == "__main__":
@@ -9,7 +9,7 @@ if __name__ == "__main__":
     app_factory = AppFactory()
     app_factory.configure(app_settings_dev)
 
-    engine: Engine = create_engine(app_settings_dev.db_connection_string.get_secret_value())
+    engine = create_db_engine(app_settings_dev)
     app = app_factory.create_app(app_settings_dev, engine=engine)
     uvicorn.run(
         app,
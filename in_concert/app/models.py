@@ -1,23 +1,105 @@
-from typing import List
+from dataclasses import dataclass, fields
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
 
-from sqlalchemy import ForeignKey, Integer, String
-from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column, relationship
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Table,
+    UniqueConstraint,
+    delete,
+    func,
+    insert,
+    select,
+    tuple_,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import (
+    DeclarativeBase,
+    Mapped,
+    Session,
+    mapped_column,
+    relationship,
+    validates,
+)
+
+from in_concert.app.geo import geo_cell
+
+
+def utcnow() -> datetime:
+    """Get the current time as naive utc datetime, the way it is stored in the database."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 
 class Base(DeclarativeBase):
     def insert(self, session: Session) -> int:
         """Inserts an entry into the database and returns the entry's id.
+
+        The entry is flushed within the transaction of the session, committing is up to the owner of the session.
         param: session: a SQLAlchemy session
         return: the entry's id
         """
-        with session:
-            with session.begin():
-                session.add(self)
-            return self.id
+        session.add(self)
+        session.flush()
+        return self.id
+
+
+class GenreTagged:
+    """Mixin of models whose comma separated genres string is normalized into genre tags on insert."""
+
+    def insert(self, session: Session) -> int:
+        entry_id = super().insert(session)
+        tag_genres(session, type(self), [(entry_id, self.genres)])
+        return entry_id
+
+
+GENRE_NAME_MAX_LENGTH = 30
+
+
+class Genre(Base):
+    __tablename__ = "genres"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(String(GENRE_NAME_MAX_LENGTH), unique=True)
+
+
+# lookups by genre are paged by id, hence the index on (genre_id, entry id)
+venue_genres = Table(
+    "venue_genres",
+    Base.metadata,
+    Column("venue_id", ForeignKey("venues.id"), primary_key=True),
+    Column("genre_id", ForeignKey("genres.id"), primary_key=True),
+    Index("ix_venue_genres_genre_id_venue_id", "genre_id", "venue_id"),
+)
+
+band_genres = Table(
+    "band_genres",
+    Base.metadata,
+    Column("band_id", ForeignKey("bands.id"), primary_key=True),
+    Column("genre_id", ForeignKey("genres.id"), primary_key=True),
+    Index("ix_band_genres_genre_id_band_id", "genre_id", "band_id"),
+)
+
+
+def _geo_cell_default(context) -> Optional[int]:
+    """Grid cell of a row inserted without orm objects, e.g. by bulk_insert."""
+    parameters = context.get_current_parameters()
+    return geo_cell(parameters.get("latitude"), parameters.get("longitude"))
 
 
-class Venue(Base):
+class Venue(GenreTagged, Base):
     __tablename__ = "venues"
+    # lookups by manager or city are paged by id, hence the id in the index
+    __table_args__ = (
+        Index("ix_venues_manager_id_id", "manager_id", "id"),
+        Index("ix_venues_city_id", "city", "id"),
+        # covers the proximity search, which ranks the candidates of the cells by their location
+        Index("ix_venues_geo_cell", "geo_cell", "latitude", "longitude"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(30))
@@ -32,6 +114,20 @@ class Venue(Base):
     genres: Mapped[str] = mapped_column(String(30), nullable=True)
     manager_id: Mapped[int] = mapped_column(ForeignKey("user_account.id"))
     manager: Mapped["User"] = relationship(back_populates="venues")
+    genre_tags: Mapped[List[Genre]] = relationship(secondary=venue_genres)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(), default=utcnow, onupdate=utcnow, server_default=func.now(), index=True
+    )
+    latitude: Mapped[float] = mapped_column(Float(), nullable=True)
+    longitude: Mapped[float] = mapped_column(Float(), nullable=True)
+    geo_cell: Mapped[int] = mapped_column(Integer(), nullable=True, default=_geo_cell_default)
+
+    @validates("latitude", "longitude")
+    def validate_location(self, key: str, value: Optional[float]) -> Optional[float]:
+        """Keep the grid cell in sync with the location of the venue."""
+        location = {"latitude": self.latitude, "longitude": self.longitude, key: value}
+        self.geo_cell = geo_cell(location["latitude"], location["longitude"])
+        return value
 
     def __repr__(self):
         return f"<Venue {self.id} {self.name}>"
@@ -43,6 +139,29 @@ class User(Base):
     venues: Mapped[List[Venue]] = relationship(back_populates="manager")
     bands: Mapped[List["Band"]] = relationship(back_populates="manager")
 
+    @classmethod
+    def insert_if_missing(cls, session: Session, user_id: str) -> bool:
+        """Insert a user unless a user with this id exists, without failing the transaction if it does.
+
+        On dialects without upsert, an existing user raises an IntegrityError.
+        param: session: a SQLAlchemy session
+        return: true if the user was inserted
+        """
+        return _insert_ignoring_conflicts(session, cls.__table__, [{"id": user_id}]) > 0
+
+
+@dataclass(frozen=True, slots=True)
+class VenueListItem:
+    """Read model of a venue as shown in lists."""
+
+    id: int
+    name: str
+    image_link: Optional[str]
+    street: str
+    zip_code: int
+    city: str
+    state: str
+
 
 def delete_db_entry(session: Session, id: int, model_class: Base) -> int:
     """Delete an entry from the database.
@@ -53,19 +172,150 @@ def delete_db_entry(session: Session, id: int, model_class: Base) -> int:
     :raises KeyError: if the entry does not exist in the database
     :return: the id of the deleted entry
     """
-    with session, session.begin():
-        db_entry = session.get(model_class, id)
-        if not db_entry:
-            raise KeyError(f"No {model_class.__name__} with id {id} exists in the database.")
-        else:
-            db_entry_id = db_entry.id
-            session.delete(db_entry)
+    db_entry = session.get(model_class, id)
+    if not db_entry:
+        raise KeyError(f"No {model_class.__name__} with id {id} exists in the database.")
+    else:
+        db_entry_id = db_entry.id
+        session.delete(db_entry)
+        session.flush()
+
+    return db_entry_id
+
+
+def delete_db_entry_with_tombstone(session: Session, id: int, model_class: Base) -> int:
+    """Delete an entry from the database and record its deletion for incremental exports.
 
+    :param session: alchemy orm session
+    :param id: id of the entry to delete
+    :param model_class: table to delete
+    :raises KeyError: if the entry does not exist in the database
+    :return: the id of the deleted entry
+    """
+    db_entry_id = delete_db_entry(session, id, model_class)
+    session.add(Tombstone(table_name=model_class.__tablename__, entry_id=db_entry_id))
+    session.flush()
     return db_entry_id
 
 
-class Band(Base):
+def bulk_insert(session: Session, model_class: Base, rows: list[dict]) -> list[int]:
+    """Insert rows in one batched executemany, without creating orm objects.
+
+    :param session: alchemy orm session
+    :param model_class: table to insert into
+    :param rows: column values of each row
+    :return: ids of the inserted rows, in the order of rows
+    """
+    query = insert(model_class).returning(model_class.id, sort_by_parameter_order=True)
+    ids = list(session.scalars(query, rows))
+    if issubclass(model_class, GenreTagged):
+        tag_genres(session, model_class, zip(ids, (row.get("genres") for row in rows)))
+    return ids
+
+
+def parse_genres(genres: Optional[str]) -> list[str]:
+    """Split a comma separated genres string into normalized genre names.
+
+    Names longer than the genre name column are truncated to fit it.
+
+    >>> parse_genres(" Rock, jazz,rock,, ")
+    ['rock', 'jazz']
+    >>> parse_genres("progressive psychedelic space rock, Progressive psychedelic space ROCK band")
+    ['progressive psychedelic space']
+    """
+    names = (name.strip().lower()[:GENRE_NAME_MAX_LENGTH].rstrip() for name in (genres or "").split(","))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def tag_genres(session: Session, model_class: Base, entries: Iterable[tuple[int, Optional[str]]]) -> None:
+    """Link entries to the genres named in their genres string, creating genres not seen before.
+
+    :param session: alchemy orm session
+    :param model_class: genre tagged table the entries belong to
+    :param entries: id and genres string of each entry
+    """
+    association, tagged_id = _genre_association(model_class)
+    links = [(entry_id, name) for entry_id, genres in entries for name in parse_genres(genres)]
+    if not links:
+        return
+    names = {name for _, name in links}
+    genre_ids = dict(session.execute(select(Genre.name, Genre.id).where(Genre.name.in_(names))).all())
+    if missing_names := names - genre_ids.keys():
+        # another transaction may create the same genre meanwhile
+        _insert_ignoring_conflicts(session, Genre.__table__, [{"name": name} for name in missing_names])
+        genre_ids = dict(session.execute(select(Genre.name, Genre.id).where(Genre.name.in_(names))).all())
+    session.execute(
+        insert(association), [{tagged_id.key: entry_id, "genre_id": genre_ids[name]} for entry_id, name in links]
+    )
+
+
+def _genre_association(model_class: Base) -> tuple[Table, Column]:
+    """Get the association table of a genre tagged model and its column referencing the model."""
+    association = model_class.genre_tags.property.secondary
+    tagged_id = next(column for column in association.c if column.references(model_class.__table__.c.id))
+    return association, tagged_id
+
+
+def _insert_ignoring_conflicts(session: Session, table: Table, rows: list[dict]) -> int:
+    """Insert rows, skipping those conflicting with existing rows, and get the number of rows inserted."""
+    dialect_name = session.get_bind().dialect.name
+    if dialect_name == "postgresql":
+        query = postgresql.insert(table).on_conflict_do_nothing()
+    elif dialect_name == "sqlite":
+        query = sqlite.insert(table).on_conflict_do_nothing()
+    else:
+        query = insert(table)
+    return session.execute(query, rows).rowcount
+
+
+def get_page(
+    session: Session,
+    model_class: Base,
+    after: Optional[int],
+    limit: int,
+    read_model: Optional[type] = None,
+    genre: Optional[str] = None,
+) -> tuple[list, Optional[int]]:
+    """Get a page of entries ordered by id, with the id of the last entry of the previous page as cursor.
+
+    Seeking past the cursor on the primary key index costs the same on every page, unlike an offset.
+
+    :param session: alchemy orm session
+    :param model_class: table to page through
+    :param after: id of the last entry of the previous page, None for the first page
+    :param limit: maximum number of entries of the page
+    :param read_model: dataclass to load the entries as, only its fields are selected and the entries are not tracked
+        by the session. By default, the entries are loaded as orm objects
+    :param genre: only get entries tagged with this genre, the model must be genre tagged
+    :return: the entries of the page and the cursor of the next page, None if this is the last page
+    """
+    if read_model is None:
+        query = select(model_class)
+    else:
+        query = select(*(getattr(model_class, field.name) for field in fields(read_model)))
+    id_column = model_class.id
+    if genre is not None:
+        # seek the genre's (genre_id, entry id) index and page by the entry id stored in it
+        association, id_column = _genre_association(model_class)
+        query = (
+            query.join(association, id_column == model_class.id)
+            .join(Genre, Genre.id == association.c.genre_id)
+            .where(Genre.name == genre.strip().lower())
+        )
+    query = query.order_by(id_column).limit(limit + 1)
+    if after is not None:
+        query = query.where(id_column > after)
+    if read_model is None:
+        entries = list(session.scalars(query))
+    else:
+        entries = [read_model(*row) for row in session.execute(query)]
+    next_cursor = entries[limit - 1].id if len(entries) > limit else None
+    return entries[:limit], next_cursor
+
+
+class Band(GenreTagged, Base):
     __tablename__ = "bands"
+    __table_args__ = (Index("ix_bands_manager_id_id", "manager_id", "id"),)
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(120))
     city: Mapped[str] = mapped_column(String(30), nullable=True)
@@ -76,3 +326,113 @@ class Band(Base):
     genres: Mapped[str] = mapped_column(String(120), nullable=True)
     manager_id: Mapped[int] = mapped_column(ForeignKey("user_account.id"))
     manager: Mapped["User"] = relationship(back_populates="bands")
+    genre_tags: Mapped[List[Genre]] = relationship(secondary=band_genres)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(), default=utcnow, onupdate=utcnow, server_default=func.now(), index=True
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class BandListItem:
+    """Read model of a band as shown in lists."""
+
+    id: int
+    name: str
+    image_link: Optional[str]
+    city: Optional[str]
+    genres: Optional[str]
+
+
+class Event(Base):
+    __tablename__ = "events"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(String(120))
+    starts_at: Mapped[datetime] = mapped_column(DateTime())
+    venue_id: Mapped[int] = mapped_column(ForeignKey("venues.id"), index=True)
+    band_id: Mapped[int] = mapped_column(ForeignKey("bands.id"), index=True)
+    manager_id: Mapped[str] = mapped_column(ForeignKey("user_account.id"))
+    venue: Mapped[Venue] = relationship()
+    band: Mapped[Band] = relationship()
+
+
+class Reservation(Base):
+    """Seats of an event held for a user until expires_at, or sold once confirmed."""
+
+    __tablename__ = "reservations"
+    # held reservations by expiry, read by the hold expiry scheduler
+    __table_args__ = (Index("ix_reservations_status_expires_at", "status", "expires_at"),)
+    id: Mapped[int] = mapped_column(primary_key=True)
+    event_id: Mapped[int] = mapped_column(ForeignKey("events.id"), index=True)
+    user_id: Mapped[str] = mapped_column(ForeignKey("user_account.id"), index=True)
+    # held, confirmed or released
+    status: Mapped[str] = mapped_column(String(10), default="held")
+    n_seats: Mapped[int] = mapped_column(Integer())
+    created_at: Mapped[datetime] = mapped_column(DateTime(), default=utcnow)
+    expires_at: Mapped[datetime] = mapped_column(DateTime())
+
+
+class Seat(Base):
+    """A seat of an event, available unless a reservation holds it until held_until, or holds it for good."""
+
+    __tablename__ = "seats"
+    __table_args__ = (UniqueConstraint("event_id", "label"),)
+    id: Mapped[int] = mapped_column(primary_key=True)
+    event_id: Mapped[int] = mapped_column(ForeignKey("events.id"), index=True)
+    label: Mapped[str] = mapped_column(String(20))
+    reservation_id: Mapped[int] = mapped_column(ForeignKey("reservations.id"), nullable=True, index=True)
+    # expiry of the hold, copied from the reservation so that a seat is claimed by a single guarded update.
+    # None with a reservation once the reservation is confirmed
+    held_until: Mapped[datetime] = mapped_column(DateTime(), nullable=True)
+
+
+class PermissionTuple(Base):
+    """Relation of a user to an object, as in the fga model, checked by the local authorizer.
+
+    The primary key leads with the object, so that the users holding a relation to an object are read in key order.
+    """
+
+    __tablename__ = "permission_tuples"
+    object_: Mapped[str] = mapped_column("object", String(255), primary_key=True)
+    relation: Mapped[str] = mapped_column(String(64), primary_key=True)
+    user: Mapped[str] = mapped_column(String(255), primary_key=True)
+
+    @classmethod
+    def insert_missing(cls, session: Session, permission_tuples: list[tuple[str, str, str]]) -> int:
+        """Insert (user, relation, object) tuples, skipping those that exist.
+
+        On dialects without upsert, an existing tuple raises an IntegrityError.
+        return: the number of tuples inserted
+        """
+        rows = [
+            {"user": user, "relation": relation, "object": object_} for user, relation, object_ in permission_tuples
+        ]
+        return _insert_ignoring_conflicts(session, cls.__table__, rows)
+
+    @classmethod
+    def delete_all(cls, session: Session, permission_tuples: list[tuple[str, str, str]]) -> int:
+        """Delete (user, relation, object) tuples, those that do not exist are ignored.
+
+        return: the number of tuples deleted
+        """
+        table = cls.__table__
+        columns = tuple_(table.c.user, table.c.relation, table.c.object)
+        return session.execute(delete(table).where(columns.in_(permission_tuples))).rowcount
+
+
+class Tombstone(Base):
+    """Deletion of a catalog entry, exported by incremental exports so that their consumers drop the entry."""
+
+    __tablename__ = "tombstones"
+    __table_args__ = (Index("ix_tombstones_table_name_deleted_at", "table_name", "deleted_at"),)
+    id: Mapped[int] = mapped_column(primary_key=True)
+    table_name: Mapped[str] = mapped_column(String(30))
+    entry_id: Mapped[int] = mapped_column(Integer())
+    deleted_at: Mapped[datetime] = mapped_column(DateTime(), default=utcnow)
+
+
+@dataclass(frozen=True, slots=True)
+class SeatListItem:
+    """Read model of an available seat."""
+
+    id: int
+    label: str
@@ -0,0 +1,124 @@
+"""Cache of rendered html pages, with ETag revalidation and explicit invalidation on writes."""
+import abc
+import hashlib
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+
+from in_concert.cache import TTLCache
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    body: bytes
+    etag: str
+    media_type: str
+
+
+class PageCacheBackend(abc.ABC):
+    """Storage of cached pages, grouped by namespace so that a write can drop all pages it affects at once."""
+
+    @abc.abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[CachedPage]:
+        pass
+
+    @abc.abstractmethod
+    def set(self, namespace: str, key: str, page: CachedPage) -> None:
+        pass
+
+    @abc.abstractmethod
+    def clear(self, namespace: str) -> None:
+        pass
+
+
+class InMemoryPageCacheBackend(PageCacheBackend):
+    """Keep the pages of each namespace in an in-process lru cache with a time to live."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        """Init the InMemoryPageCacheBackend.
+
+        :param maxsize: maximum number of pages per namespace
+        :param ttl: seconds a page is cached, bounds the staleness if another process writes
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.caches: dict[str, TTLCache] = {}
+
+    def get(self, namespace: str, key: str) -> Optional[CachedPage]:
+        cache = self.caches.get(namespace)
+        return cache.get(key) if cache is not None else None
+
+    def set(self, namespace: str, key: str, page: CachedPage) -> None:
+        if namespace not in self.caches:
+            self.caches[namespace] = TTLCache(maxsize=self.maxsize, ttl=self.ttl)
+        self.caches[namespace].set(key, page)
+
+    def clear(self, namespace: str) -> None:
+        self.caches.pop(namespace, None)
+
+
+class PageCache:
+    """Serve rendered pages from a cache backend, keyed on scheme, host, path and query parameters.
+
+    The pages hold absolute urls built from the Host header of the request, so a page is only served to requests for
+    the same host. Responses carry an ETag, a request whose If-None-Match matches it gets a 304 without a body.
+    """
+
+    def __init__(self, backend: PageCacheBackend) -> None:
+        self.backend = backend
+        self._generations: defaultdict[str, int] = defaultdict(int)
+
+    async def respond(self, request: Request, namespace: str, render: Callable[[], Awaitable[Response]]) -> Response:
+        """Respond with the cached page of the request, rendering and caching it on a miss.
+
+        :param request: starlette request object
+        :param namespace: group of pages invalidated together, e.g. venues
+        :param render: renders the page, only responses with status 200 are cached
+        :return: the page, or 304 if the client has the current version
+        """
+        key = _cache_key(request)
+        page = self.backend.get(namespace, key)
+        if page is None:
+            generation = self._generations[namespace]
+            response = await render()
+            if response.status_code != 200:
+                return response
+            page = CachedPage(body=response.body, etag=_etag(response.body), media_type=response.media_type)
+            # a page rendered while a write invalidated the namespace may be stale, serve it but do not cache it
+            if self._generations[namespace] == generation:
+                self.backend.set(namespace, key, page)
+        headers = {"ETag": page.etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), page.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(page.body, media_type=page.media_type, headers=headers)
+
+    def invalidate(self, namespace: str) -> None:
+        """Drop all cached pages of a namespace, call it after every write affecting them."""
+        self._generations[namespace] += 1
+        self.backend.clear(namespace)
+
+
+def _cache_key(request: Request) -> str:
+    url = request.url
+    return f"{url.scheme}://{url.netloc}{url.path}?{urlencode(sorted(request.query_params.multi_items()))}"
+
+
+def _etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an etag, with weak comparison.
+
+    >>> etag_matches('W/"a", "b"', '"a"')
+    True
+    >>> etag_matches('"b"', '"a"') or etag_matches(None, '"a"')
+    False
+    """
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
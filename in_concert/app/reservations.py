@@ -0,0 +1,269 @@
+"""Seat reservations, safe under contention without overselling.
+
+Seats are claimed by a single guarded update, which only changes seats that are still available and reports the seats
+it changed: two buyers racing for a seat cannot both claim it, whatever the isolation level. Postgres locks the rows
+the update changes, and best available seats are picked skipping rows locked by other buyers. Most requests of an
+on-sale spike ask for seats that are gone, so availability is read first and these requests fail without writing.
+
+The functions write within the transaction of the session, the owner of the session commits or, if they raise,
+rolls back.
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import ColumnElement, and_, case, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from in_concert.app.models import (
+    Band,
+    Event,
+    Reservation,
+    Seat,
+    SeatListItem,
+    Venue,
+    bulk_insert,
+    utcnow,
+)
+
+HELD = "held"
+CONFIRMED = "confirmed"
+RELEASED = "released"
+
+
+class ReservationConflictError(Exception):
+    """The seats or the reservation are no longer in the state the request expects, e.g. seats are taken."""
+
+
+def check_event_managers(session: Session, venue_id: int, band_id: int, user_id: str) -> None:
+    """Check that the venue and the band of an event exist and are managed by the user creating it.
+
+    :raises KeyError: if the venue or the band does not exist
+    :raises PermissionError: if the user does not manage the venue or the band
+    """
+    for model_class, id in ((Venue, venue_id), (Band, band_id)):
+        manager_id = session.scalar(select(model_class.manager_id).where(model_class.id == id))
+        if manager_id is None:
+            raise KeyError(f"No {model_class.__name__} with id {id} exists in the database.")
+        if manager_id != user_id:
+            raise PermissionError(f"The {model_class.__name__.lower()} with id {id} is managed by another user.")
+
+
+def has_events(session: Session, venue_id: int) -> bool:
+    """Check whether any event takes place at the venue."""
+    return session.scalar(select(Event.id).where(Event.venue_id == venue_id).limit(1)) is not None
+
+
+def create_event(session: Session, event: Event, seat_labels: list[str]) -> int:
+    """Insert an event and its seats.
+
+    :param session: alchemy orm session
+    :param event: event to insert
+    :param seat_labels: label of each seat, unique within the event
+    :return: the event's id
+    """
+    event_id = event.insert(session)
+    bulk_insert(session, Seat, [{"event_id": event_id, "label": label} for label in seat_labels])
+    return event_id
+
+
+def get_available_seats(session: Session, event_id: int) -> list[SeatListItem]:
+    """Get the seats of an event not held by any reservation, ordered by id.
+
+    :raises KeyError: if the event does not exist
+    """
+    query = select(Seat.id, Seat.label).where(Seat.event_id == event_id, _is_available(utcnow())).order_by(Seat.id)
+    seats = [SeatListItem(*row) for row in session.execute(query)]
+    if not seats and session.get(Event, event_id) is None:
+        raise KeyError(f"No Event with id {event_id} exists in the database.")
+    return seats
+
+
+def hold_seats(
+    session: Session,
+    event_id: int,
+    user_id: str,
+    hold_seconds: float,
+    seat_ids: Optional[list[int]] = None,
+    quantity: Optional[int] = None,
+) -> tuple[Reservation, list[int]]:
+    """Hold seats of an event for a user, all of them or none.
+
+    :param session: alchemy orm session
+    :param event_id: id of the event
+    :param user_id: id of the user holding the seats
+    :param hold_seconds: seconds until the hold expires and the seats are available again, unless confirmed
+    :param seat_ids: ids of the seats to hold
+    :param quantity: number of best available seats to hold, if no seat ids are given
+    :raises KeyError: if the event does not exist
+    :raises ReservationConflictError: if any of the seats is not available, or fewer seats than quantity are
+    :return: the reservation and the ids of its seats
+    """
+    now = utcnow()
+    expires_at = now + timedelta(seconds=hold_seconds)
+    wanted = and_(Seat.event_id == event_id, _is_available(now))
+    if seat_ids is not None:
+        seat_ids = list(dict.fromkeys(seat_ids))
+        n_seats = len(seat_ids)
+        wanted = and_(wanted, Seat.id.in_(seat_ids))
+        claimed = wanted
+    else:
+        n_seats = quantity
+        best_available = select(Seat.id).where(wanted).order_by(Seat.id).limit(quantity)
+        claimed = and_(wanted, Seat.id.in_(best_available.with_for_update(skip_locked=True).scalar_subquery()))
+    n_available = session.scalar(
+        select(func.count()).select_from(select(Seat.id).where(wanted).limit(n_seats).subquery())
+    )
+    if n_available < n_seats:
+        _raise_unavailable(session, event_id)
+
+    reservation = Reservation(
+        event_id=event_id, user_id=user_id, n_seats=n_seats, created_at=now, expires_at=expires_at
+    )
+    reservation.insert(session)
+    claimed_ids = session.scalars(
+        update(Seat)
+        .where(claimed)
+        .values(reservation_id=reservation.id, held_until=expires_at)
+        .returning(Seat.id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if len(claimed_ids) != n_seats:
+        # another buyer claimed some of the seats since they were read
+        _raise_unavailable(session, event_id)
+    return reservation, sorted(claimed_ids)
+
+
+def confirm_reservation(session: Session, reservation_id: int, user_id: str) -> Reservation:
+    """Confirm a held reservation of the user before it expires, its seats are sold for good.
+
+    :raises KeyError: if the user has no such reservation
+    :raises ReservationConflictError: if the reservation expired or is not held anymore
+    :return: the confirmed reservation
+    """
+    now = utcnow()
+    n_confirmed_seats = session.execute(
+        update(Seat)
+        .where(Seat.reservation_id == reservation_id, Seat.held_until > now)
+        .values(held_until=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    n_confirmed = session.execute(
+        update(Reservation)
+        .where(
+            Reservation.id == reservation_id,
+            Reservation.user_id == user_id,
+            Reservation.status == HELD,
+            Reservation.expires_at > now,
+            Reservation.n_seats == n_confirmed_seats,
+        )
+        .values(status=CONFIRMED)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    reservation = _get_reservation(session, reservation_id, user_id)
+    if not n_confirmed:
+        reason = "expired" if reservation.status == HELD else f"is {reservation.status}"
+        raise ReservationConflictError(f"Reservation {reason} and cannot be confirmed.")
+    return reservation
+
+
+def release_reservation(session: Session, reservation_id: int, user_id: str) -> tuple[Reservation, list[int]]:
+    """Release a held reservation of the user, its seats are available again.
+
+    :raises KeyError: if the user has no such reservation
+    :raises ReservationConflictError: if the reservation is confirmed
+    :return: the released reservation and the ids of the seats made available
+    """
+    n_released = session.execute(
+        update(Reservation)
+        .where(Reservation.id == reservation_id, Reservation.user_id == user_id, Reservation.status == HELD)
+        .values(status=RELEASED)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    reservation = _get_reservation(session, reservation_id, user_id)
+    if not n_released and reservation.status != RELEASED:
+        raise ReservationConflictError(f"Reservation is {reservation.status} and cannot be released.")
+    # seats of an expired hold may be held by another reservation already, they are left alone
+    released_seat_ids = session.scalars(
+        update(Seat)
+        .where(Seat.reservation_id == reservation_id, Seat.held_until.is_not(None))
+        .values(reservation_id=None, held_until=None)
+        .returning(Seat.id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    return reservation, sorted(released_seat_ids)
+
+
+def get_held_reservations(session: Session) -> list[tuple[datetime, int]]:
+    """Get the expiry and id of each held reservation, expired or not.
+
+    :param session: alchemy orm session
+    :return: expiry and id pairs
+    """
+    query = select(Reservation.expires_at, Reservation.id).where(Reservation.status == HELD)
+    return [(expires_at, reservation_id) for expires_at, reservation_id in session.execute(query)]
+
+
+def expire_holds(
+    session: Session, reservation_ids: list[int], now: datetime
+) -> tuple[list[tuple[int, datetime]], list[tuple[int, int]]]:
+    """Release the held reservations among reservation_ids that expired by now, their seats are available again.
+
+    Reservations confirmed, released or extended meanwhile are left alone, so stale ids are harmless. Two updates
+    release the whole batch.
+
+    :param session: alchemy orm session
+    :param reservation_ids: ids of reservations that may have expired
+    :param now: naive utc time the holds are expired at
+    :return: id and expiry of each released reservation, and event id and id of each seat made available
+    """
+    released = session.execute(
+        update(Reservation)
+        .where(Reservation.id.in_(reservation_ids), Reservation.status == HELD, Reservation.expires_at <= now)
+        .values(status=RELEASED)
+        .returning(Reservation.id, Reservation.expires_at)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if not released:
+        return [], []
+    released_seats = session.execute(
+        update(Seat)
+        .where(Seat.reservation_id.in_([reservation_id for reservation_id, _ in released]), Seat.held_until <= now)
+        .values(reservation_id=None, held_until=None)
+        .returning(Seat.event_id, Seat.id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    return (
+        [(reservation_id, expires_at) for reservation_id, expires_at in released],
+        [(event_id, seat_id) for event_id, seat_id in released_seats],
+    )
+
+
+def get_seat_availability(session: Session, event_id: int) -> list[tuple[int, bool]]:
+    """Get the id of each seat of an event and whether it is available, ordered by id.
+
+    :raises KeyError: if the event does not exist
+    """
+    available = case((_is_available(utcnow()), True), else_=False)
+    query = select(Seat.id, available).where(Seat.event_id == event_id).order_by(Seat.id)
+    # plain tuples through the connection, an arena has tens of thousands of seats
+    seats = [(seat_id, bool(is_available)) for seat_id, is_available in session.connection().execute(query)]
+    if not seats and session.get(Event, event_id) is None:
+        raise KeyError(f"No Event with id {event_id} exists in the database.")
+    return seats
+
+
+def _raise_unavailable(session: Session, event_id: int) -> None:
+    if session.get(Event, event_id) is None:
+        raise KeyError(f"No Event with id {event_id} exists in the database.")
+    raise ReservationConflictError("Seats are not available.")
+
+
+def _is_available(now: datetime) -> ColumnElement[bool]:
+    return or_(Seat.reservation_id.is_(None), Seat.held_until < now)
+
+
+def _get_reservation(session: Session, reservation_id: int, user_id: str) -> Reservation:
+    reservation = session.get(Reservation, reservation_id, populate_existing=True)
+    if reservation is None or reservation.user_id != user_id:
+        raise KeyError(f"No Reservation with id {reservation_id} exists in the database.")
+    return reservation
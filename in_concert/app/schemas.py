@@ -1,6 +1,12 @@
-from typing import Optional
+from datetime import datetime
+from typing import Generic, Optional, TypeVar
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+T = TypeVar("T")
+
+# largest value of the Integer columns of the database
+MAX_INTEGER = 2**31 - 1
 
 
 class UserSchema(BaseModel):
@@ -11,6 +17,38 @@ class UserSchema(BaseModel):
 
 
 class VenueSchema(BaseModel):
+    name: str = Field(max_length=30)
+    street: str = Field(max_length=30)
+    city: str = Field(max_length=30)
+    state: str = Field(max_length=30)
+    zip_code: int = Field(ge=0, le=MAX_INTEGER)
+    phone: int = Field(ge=0, le=MAX_INTEGER)
+    website: Optional[str] = Field(default=None, max_length=30)
+    image_link: Optional[str] = None
+    genres: Optional[str] = Field(default=None, max_length=30)
+    manager_id: str
+    about: Optional[str] = Field(default=None, max_length=120)
+    latitude: Optional[float] = Field(default=None, ge=-90, le=90)
+    longitude: Optional[float] = Field(default=None, ge=-180, le=180)
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class BandSchema(BaseModel):
+    name: str = Field(max_length=120)
+    city: Optional[str] = Field(default=None, max_length=30)
+    zip_code: Optional[int] = Field(default=None, ge=0, le=MAX_INTEGER)
+    state: Optional[str] = Field(default=None, max_length=30)
+    website_link: Optional[str] = Field(default=None, max_length=120)
+    image_link: Optional[str] = None
+    genres: Optional[str] = Field(default=None, max_length=120)
+    manager_id: str
+
+
+class VenueExportSchema(BaseModel):
+    """Venue as exported, without the manager id, which identifies a user of the identity provider."""
+
+    id: int
     name: str
     street: str
     city: str
@@ -20,13 +58,16 @@ class VenueSchema(BaseModel):
     website: Optional[str] = None
     image_link: Optional[str] = None
     genres: Optional[str] = None
-    manager_id: str
     about: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    updated_at: datetime
 
-    model_config = ConfigDict(from_attributes=True)
 
+class BandExportSchema(BaseModel):
+    """Band as exported, without the manager id, which identifies a user of the identity provider."""
 
-class BandSchema(BaseModel):
+    id: int
     name: str
     city: Optional[str] = None
     zip_code: Optional[int] = None
@@ -34,4 +75,95 @@ class BandSchema(BaseModel):
     website_link: Optional[str] = None
     image_link: Optional[str] = None
     genres: Optional[str] = None
-    manager_id: str
+    updated_at: datetime
+
+
+class TombstoneSchema(BaseModel):
+    """Entry deleted since an incremental export, consumers drop it."""
+
+    id: int
+    deleted_at: datetime
+
+
+class VenueListItemSchema(BaseModel):
+    id: int
+    name: str
+    street: str
+    city: str
+    state: str
+    zip_code: int
+    image_link: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class NearbyVenueSchema(VenueListItemSchema):
+    distance_km: float
+
+
+class BandListItemSchema(BaseModel):
+    id: int
+    name: str
+    city: Optional[str] = None
+    genres: Optional[str] = None
+    image_link: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PageSchema(BaseModel, Generic[T]):
+    """A page of a paginated list, next_cursor is passed as after, or as offset for search, to get the next page."""
+
+    items: list[T]
+    next_cursor: Optional[int] = None
+    next_url: Optional[str] = None
+
+
+class ImportErrorSchema(BaseModel):
+    line: int
+    error: str
+
+
+class ImportReportSchema(BaseModel):
+    """Outcome of a bulk import, errors holds the first failed rows in detail, failed counts all of them."""
+
+    imported: int = 0
+    failed: int = 0
+    errors: list[ImportErrorSchema] = Field(default_factory=list)
+
+
+class EventSchema(BaseModel):
+    name: str = Field(max_length=120)
+    starts_at: datetime
+    venue_id: int
+    band_id: int
+    seat_rows: int = Field(ge=1, le=200)
+    seats_per_row: int = Field(ge=1, le=500)
+
+
+class SeatSchema(BaseModel):
+    id: int
+    label: str
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ReservationRequestSchema(BaseModel):
+    """Seats to hold, either given by id or a quantity of best available seats."""
+
+    seat_ids: Optional[list[int]] = Field(default=None, min_length=1)
+    quantity: Optional[int] = Field(default=None, ge=1)
+
+    @model_validator(mode="after")
+    def check_seat_ids_or_quantity(self) -> "ReservationRequestSchema":
+        if (self.seat_ids is None) == (self.quantity is None):
+            raise ValueError("Give either seat_ids or quantity.")
+        return self
+
+
+class ReservationSchema(BaseModel):
+    id: int
+    event_id: int
+    status: str
+    expires_at: datetime
+    seat_ids: list[int]
@@ -0,0 +1,203 @@
+"""Ranked full-text search over venues and bands, on sqlite fts5 or postgres text search depending on the dialect."""
+import re
+from dataclasses import fields
+from typing import Any, Optional
+
+from sqlalchemy import (
+    ColumnElement,
+    Connection,
+    MetaData,
+    and_,
+    column,
+    event,
+    func,
+    literal_column,
+    or_,
+    select,
+    table,
+    text,
+)
+from sqlalchemy.orm import Session
+
+from in_concert.app.models import Base
+
+# searchable columns of each table, the first column weighs most in the ranking
+SEARCH_COLUMNS: dict[str, tuple[str, ...]] = {"venues": ("name", "city", "about"), "bands": ("name", "city")}
+# bm25 weight of a match in each column, in the order of SEARCH_COLUMNS
+COLUMN_WEIGHTS = (10.0, 5.0, 1.0)
+# at most this many search terms are matched, further terms are ignored
+MAX_TERMS = 8
+
+
+def parse_terms(query: str) -> list[str]:
+    """Split a user query into lowercase search terms, dropping anything that is not a word character.
+
+    >>> parse_terms('Jazz "Club", BERLIN*')
+    ['jazz', 'club', 'berlin']
+    """
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+def search(
+    session: Session,
+    model_class: Base,
+    query: str,
+    offset: int,
+    limit: int,
+    read_model: type,
+    max_candidates: int,
+) -> tuple[list, Optional[int]]:
+    """Get a page of the entries matching all terms of the query, best match first.
+
+    The last term also matches as a prefix, so that results show up while the user is typing. On sqlite and postgres
+    the entries are ranked by relevance, matches in the first search column weighing most. Other dialects fall back
+    to a scan ordered by id.
+
+    :param session: alchemy orm session
+    :param model_class: table to search, one of SEARCH_COLUMNS
+    :param query: search query as typed by the user
+    :param offset: number of results of the previous pages
+    :param limit: maximum number of entries of the page
+    :param read_model: dataclass to load the entries as, only its fields are selected
+    :param max_candidates: maximum number of best matches that can be paged through, bounds the cost of sorting
+        and paging the results of terms matching most of the table. All matches are still ranked, except on other
+        dialects, where the first max_candidates matches by id are returned
+    :return: the entries of the page and the offset of the next page, None if this is the last page
+    """
+    terms = parse_terms(query)
+    if not terms:
+        return [], None
+    dialect_name = session.get_bind().dialect.name
+    if dialect_name == "sqlite":
+        matches = _sqlite_matches(model_class.__tablename__, terms, max_candidates)
+    elif dialect_name == "postgresql":
+        matches = _postgresql_matches(model_class.__table__, terms, max_candidates)
+    else:
+        matches = _scan_matches(model_class.__table__, terms, max_candidates)
+    statement = (
+        select(*(getattr(model_class, field.name) for field in fields(read_model)))
+        .join(matches, matches.c.id == model_class.id)
+        .order_by(matches.c.score, model_class.id)
+        .offset(offset)
+        .limit(limit + 1)
+    )
+    entries = [read_model(*row) for row in session.execute(statement)]
+    next_offset = offset + limit if len(entries) > limit else None
+    return entries[:limit], next_offset
+
+
+def _sqlite_matches(table_name: str, terms: list[str], max_candidates: int) -> Any:
+    fts = table(f"{table_name}_fts", column("rowid"))
+    fts_ref = literal_column(fts.name)
+    match_query = " ".join(f'"{term}"' for term in terms) + "*"
+    weights = COLUMN_WEIGHTS[: len(SEARCH_COLUMNS[table_name])]
+    score = func.bm25(fts_ref, *weights)
+    # bm25 scores are negative, the lowest is the best match
+    return (
+        select(fts.c.rowid.label("id"), score.label("score"))
+        .where(fts_ref.match(match_query))
+        .order_by(score, fts.c.rowid)
+        .limit(max_candidates)
+        .subquery()
+    )
+
+
+def _postgresql_matches(searched_table: Any, terms: list[str], max_candidates: int) -> Any:
+    vector = _tsvector(searched_table)
+    tsquery = func.to_tsquery(literal_column("'simple'"), " & ".join(terms) + ":*")
+    score = -func.ts_rank(vector, tsquery)
+    return (
+        select(searched_table.c.id, score.label("score"))
+        .where(vector.op("@@")(tsquery))
+        .order_by(score, searched_table.c.id)
+        .limit(max_candidates)
+        .subquery()
+    )
+
+
+def _scan_matches(searched_table: Any, terms: list[str], max_candidates: int) -> Any:
+    columns = [searched_table.c[name] for name in SEARCH_COLUMNS[searched_table.name]]
+    condition = and_(*(or_(*(func.lower(c).contains(term, autoescape=True) for c in columns)) for term in terms))
+    return (
+        select(searched_table.c.id, literal_column("0").label("score"))
+        .where(condition)
+        .order_by(searched_table.c.id)
+        .limit(max_candidates)
+        .subquery()
+    )
+
+
+def _tsvector(searched_table: Any) -> ColumnElement:
+    """Weighted text search vector of a row, the expression of its gin index."""
+    vectors = [
+        func.setweight(func.to_tsvector(literal_column("'simple'"), func.coalesce(searched_table.c[name], "")), label)
+        for name, label in zip(SEARCH_COLUMNS[searched_table.name], "ABC")
+    ]
+    vector = vectors[0]
+    for other in vectors[1:]:
+        vector = vector.op("||")(other)
+    return vector
+
+
+def create_search_indexes(connection: Connection) -> None:
+    """Create the full-text indexes of the searchable tables if missing, filled with the existing rows.
+
+    On sqlite, an external content fts5 table per searched table is kept in sync by triggers, so entries are indexed
+    however they are written. On postgres, a gin index on the weighted text search vector is used.
+    """
+    for table_name, column_names in SEARCH_COLUMNS.items():
+        if connection.dialect.name == "sqlite":
+            _create_sqlite_search_index(connection, table_name, column_names)
+        elif connection.dialect.name == "postgresql":
+            searched_table = Base.metadata.tables[table_name]
+            vector = _tsvector(searched_table).compile(connection, compile_kwargs={"literal_binds": True})
+            connection.execute(
+                text(f"CREATE INDEX IF NOT EXISTS ix_{table_name}_search ON {table_name} USING gin (({vector}))")
+            )
+
+
+def drop_search_indexes(connection: Connection) -> None:
+    """Drop the full-text indexes, the sqlite fts tables are not dropped along with the searched tables."""
+    for table_name in SEARCH_COLUMNS:
+        if connection.dialect.name == "sqlite":
+            connection.execute(text(f"DROP TABLE IF EXISTS {table_name}_fts"))
+        elif connection.dialect.name == "postgresql":
+            connection.execute(text(f"DROP INDEX IF EXISTS ix_{table_name}_search"))
+
+
+def _create_sqlite_search_index(connection: Connection, table_name: str, column_names: tuple[str, ...]) -> None:
+    fts_name = f"{table_name}_fts"
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": fts_name}
+    ).first()
+    columns = ", ".join(column_names)
+    new_values = ", ".join(f"new.{name}" for name in column_names)
+    old_values = ", ".join(f"old.{name}" for name in column_names)
+    delete_old = f"INSERT INTO {fts_name}({fts_name}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+    insert_new = f"INSERT INTO {fts_name}(rowid, {columns}) VALUES (new.id, {new_values});"
+    if not exists:
+        connection.execute(
+            text(
+                f"CREATE VIRTUAL TABLE {fts_name} USING fts5({columns}, content='{table_name}', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+        )
+        connection.execute(text(f"INSERT INTO {fts_name}({fts_name}) VALUES ('rebuild')"))
+    for suffix, trigger_event, body in (
+        ("ai", "AFTER INSERT", insert_new),
+        ("ad", "AFTER DELETE", delete_old),
+        ("au", f"AFTER UPDATE OF {columns}", delete_old + " " + insert_new),
+    ):
+        connection.execute(
+            text(f"CREATE TRIGGER IF NOT EXISTS {fts_name}_{suffix} {trigger_event} ON {table_name} BEGIN {body} END")
+        )
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _after_create(target: MetaData, connection: Connection, **kw) -> None:
+    create_search_indexes(connection)
+
+
+@event.listens_for(Base.metadata, "before_drop")
+def _before_drop(target: MetaData, connection: Connection, **kw) -> None:
+    drop_search_indexes(connection)
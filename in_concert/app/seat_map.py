@@ -0,0 +1,235 @@
+"""In-memory seat availability bitmaps of events, kept current by the reservation writes."""
+import asyncio
+import base64
+import itertools
+import json
+import secrets
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Iterable, Optional, Union
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from in_concert.app.reservations import get_seat_availability
+from in_concert.dependencies.db_session import run_in_new_session
+from in_concert.logging_in_concert.named_loggers_base import LoggedClass
+
+
+class SeatMap:
+    """Availability of the seats of an event, one bit per seat in the order of the seat ids.
+
+    Bit i is bit i % 8 of byte i // 8, set if the seat is available. The seat ids are stored as ranges of consecutive
+    ids, usually a single range as the seats of an event are inserted together, so a map takes little more memory than
+    its bitmap. The bit of a seat is found from the range holding its id.
+
+    >>> seat_map = SeatMap(1, [(10, True), (11, False), (12, True), (20, True)])
+    >>> seat_map.seat_id_ranges, seat_map.bitmap
+    ([(10, 12), (20, 20)], bytearray(b'\\r'))
+    >>> seat_map.set_available([11], True), seat_map.n_available
+    (True, 4)
+    >>> seat_map.set_available([15, 20, 21], False), seat_map.n_available, seat_map.bitmap
+    (True, 3, bytearray(b'\\x07'))
+    """
+
+    def __init__(self, event_id: int, seats: list[tuple[int, bool]]) -> None:
+        """Init the SeatMap.
+
+        :param event_id: id of the event
+        :param seats: id of each seat and whether it is available, ordered by id
+        """
+        self.event_id = event_id
+        self.seat_id_ranges = _ranges([seat_id for seat_id, _ in seats])
+        # first seat id and bit offset of each range
+        self._range_starts = [start for start, _ in self.seat_id_ranges]
+        self._range_offsets = list(
+            itertools.accumulate((end - start + 1 for start, end in self.seat_id_ranges), initial=0)
+        )
+        self.bitmap = bytearray((len(seats) + 7) // 8)
+        for i, (_, available) in enumerate(seats):
+            if available:
+                self.bitmap[i >> 3] |= 1 << (i & 7)
+        self.n_available = sum(available for _, available in seats)
+        # set by the cache, bumped on each change
+        self.version = 0
+        self._body: Optional[bytes] = None
+
+    def set_available(self, seat_ids: Iterable[int], available: bool) -> bool:
+        """Mark seats as available or taken, seats of other events are ignored.
+
+        :return: true if any bit changed
+        """
+        changed = False
+        for seat_id in seat_ids:
+            i = self._bit_index(seat_id)
+            if i is None:
+                continue
+            mask = 1 << (i & 7)
+            if bool(self.bitmap[i >> 3] & mask) != available:
+                self.bitmap[i >> 3] ^= mask
+                self.n_available += 1 if available else -1
+                changed = True
+        if changed:
+            self._body = None
+        return changed
+
+    def _bit_index(self, seat_id: int) -> Optional[int]:
+        """Get the index of the bit of a seat, None if the seat is not one of the event."""
+        r = bisect_right(self._range_starts, seat_id) - 1
+        if r < 0 or seat_id > self.seat_id_ranges[r][1]:
+            return None
+        return self._range_offsets[r] + seat_id - self._range_starts[r]
+
+    def to_json(self) -> bytes:
+        """Serialize the seat map to json, the bitmap base64 encoded. The body is reused until the map changes."""
+        if self._body is None:
+            self._body = json.dumps(
+                {
+                    "event_id": self.event_id,
+                    "seat_id_ranges": self.seat_id_ranges,
+                    "n_available": self.n_available,
+                    "available": base64.b64encode(self.bitmap).decode("ascii"),
+                },
+                separators=(",", ":"),
+            ).encode()
+        return self._body
+
+
+def _ranges(sorted_ids: list[int]) -> list[tuple[int, int]]:
+    """Group sorted ids into ranges of consecutive ids.
+
+    >>> _ranges([1, 2, 3, 7, 9, 10])
+    [(1, 3), (7, 7), (9, 10)]
+    """
+    ranges = []
+    for _, group in itertools.groupby(enumerate(sorted_ids), key=lambda pair: pair[1] - pair[0]):
+        ids = [seat_id for _, seat_id in group]
+        ranges.append((ids[0], ids[-1]))
+    return ranges
+
+
+class SeatMapCache(LoggedClass):
+    """Serve the seat maps of the most recently read events from memory.
+
+    A seat map is loaded from the database on its first read, loads of the same event are shared by concurrent
+    readers. The reservation writes of this process update the cached maps in place, so a map read never queries the
+    database. A background pass reloads the cached maps every reconcile_interval, picking up the writes of other
+    processes and holds that expired before the hold expiry scheduler released them. Each change of a map bumps its
+    version, which the readers use as ETag.
+    """
+
+    def __init__(
+        self,
+        session_factory: Union[sessionmaker, async_sessionmaker],
+        maxsize: int = 1_000,
+        reconcile_interval: float = 30.0,
+    ) -> None:
+        """Init the SeatMapCache.
+
+        :param session_factory: factory of sync or async sessions, as created by the session dependency
+        :param maxsize: maximum number of events whose seat map is cached, the least recently read is evicted first
+        :param reconcile_interval: seconds between reloads of the cached maps from the database
+        """
+        self.session_factory = session_factory
+        self.maxsize = maxsize
+        self.reconcile_interval = reconcile_interval
+        # versions start over with each instance, the instance id tells them apart in etags
+        self.instance_id = secrets.token_hex(4)
+        self._seat_maps: OrderedDict[int, SeatMap] = OrderedDict()
+        self._loads: dict[int, asyncio.Task] = {}
+        # updates of maps being reloaded, replayed onto the reloaded map
+        self._pending_updates: dict[int, list[tuple[list[int], bool]]] = {}
+        self._version_counter = itertools.count(1)
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Start reconciling the cached maps with the database in the background. Call it on app startup."""
+        self._task = asyncio.create_task(self._reconcile_periodically())
+
+    async def stop(self) -> None:
+        """Stop the background reconciliation. Call it once on app shutdown."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def get(self, event_id: int) -> SeatMap:
+        """Get the seat map of an event, loading it on a miss.
+
+        :raises KeyError: if the event does not exist
+        """
+        seat_map = self._seat_maps.get(event_id)
+        if seat_map is not None:
+            self._seat_maps.move_to_end(event_id)
+            return seat_map
+        return await self._load_shared(event_id)
+
+    def etag(self, seat_map: SeatMap) -> str:
+        """Get the etag of the current version of a seat map."""
+        return f'"{self.instance_id}-{seat_map.event_id}-{seat_map.version}"'
+
+    def set_available(self, event_id: int, seat_ids: list[int], available: bool) -> None:
+        """Apply a committed reservation write to the seat map of the event, if cached."""
+        pending_updates = self._pending_updates.get(event_id)
+        if pending_updates is not None:
+            pending_updates.append((seat_ids, available))
+        seat_map = self._seat_maps.get(event_id)
+        if seat_map is not None and seat_map.set_available(seat_ids, available):
+            seat_map.version = next(self._version_counter)
+
+    def release_seats(self, released_seats: list[tuple[int, int]]) -> None:
+        """Mark seats available again, e.g. those of expired holds.
+
+        :param released_seats: event id and id of each seat
+        """
+        for event_id, seats in itertools.groupby(sorted(released_seats), key=lambda pair: pair[0]):
+            self.set_available(event_id, [seat_id for _, seat_id in seats], True)
+
+    async def reconcile(self) -> None:
+        """Reload the cached seat maps from the database."""
+        for event_id in list(self._seat_maps):
+            try:
+                await self._load_shared(event_id)
+            except KeyError:
+                self._seat_maps.pop(event_id, None)
+
+    async def _load_shared(self, event_id: int) -> SeatMap:
+        """Load the seat map of an event, joining a load that is already in flight instead of starting another one."""
+        load = self._loads.get(event_id)
+        if load is None:
+            load = asyncio.create_task(self._load(event_id))
+            self._loads[event_id] = load
+            load.add_done_callback(lambda _: self._loads.pop(event_id, None))
+        return await asyncio.shield(load)
+
+    async def _load(self, event_id: int) -> SeatMap:
+        self._pending_updates[event_id] = []
+        try:
+            seats = await run_in_new_session(self.session_factory, get_seat_availability, event_id)
+            seat_map = SeatMap(event_id, seats)
+            # writes committed while loading may be missing in what was read
+            for seat_ids, available in self._pending_updates[event_id]:
+                seat_map.set_available(seat_ids, available)
+        finally:
+            del self._pending_updates[event_id]
+        cached = self._seat_maps.get(event_id)
+        if cached is not None and cached.bitmap == seat_map.bitmap and cached.seat_id_ranges == seat_map.seat_id_ranges:
+            seat_map.version = cached.version
+        else:
+            seat_map.version = next(self._version_counter)
+        self._seat_maps[event_id] = seat_map
+        self._seat_maps.move_to_end(event_id)
+        while len(self._seat_maps) > self.maxsize:
+            self._seat_maps.popitem(last=False)
+        return seat_map
+
+    async def _reconcile_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                await self.reconcile()
+            except Exception as exc_info:
+                self.logger.warning("Could not reconcile seat maps: %s", exc_info)
@@ -0,0 +1,75 @@
+"""In-process caches shared by the application."""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """A bounded least-recently-used cache whose entries expire after a time to live.
+
+    Hits and misses are counted, so the size and ttl can be tuned under real traffic.
+
+    >>> cache = TTLCache(maxsize=2, ttl=60)
+    >>> cache.set("a", 1)
+    >>> cache.get("a")
+    1
+    >>> cache.get("b") is None
+    True
+    >>> cache.stats()
+    {'hits': 1, 'misses': 1, 'size': 1, 'maxsize': 2}
+    """
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic) -> None:
+        """Init the TTLCache.
+
+        :param maxsize: maximum number of entries, the least recently used entry is evicted first
+        :param ttl: default time to live of an entry in seconds, a cache with maxsize or ttl <= 0 stores nothing
+        :param clock: monotonic clock returning seconds
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get the value cached for key, or default if it is missing or expired."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Cache value for key.
+
+        :param ttl: time to live in seconds, overrides the default ttl of the cache
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+        self._entries[key] = (self.clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Remove the entry for key, if any."""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Get the hit and miss counters and the current size of the cache."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
+
+    def __len__(self) -> int:
+        return len(self._entries)
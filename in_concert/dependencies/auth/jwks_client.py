@@ -0,0 +1,153 @@
+"""Non-blocking provider of the signing keys published by the identity provider."""
+import asyncio
+import re
+import time
+from typing import Optional
+
+import httpx
+import jwt
+
+from in_concert.logging_in_concert.named_loggers_base import LoggedClass
+
+# errors of fetching or parsing the key set, json decoding errors are value errors
+FETCH_ERRORS = (httpx.HTTPError, jwt.PyJWKSetError, ValueError)
+
+
+class AsyncJWKSClient(LoggedClass):
+    """Fetch the json web key set (jwks) asynchronously and keep it fresh in the background.
+
+    The keys are loaded once on startup and refreshed by a background task before they expire. A token signed with
+    an unknown key id triggers a refetch, which is shared by all requests waiting for it, so that a burst of
+    requests does not cause a burst of fetches.
+    """
+
+    def __init__(
+        self,
+        jwks_url: str,
+        http_client: Optional[httpx.AsyncClient] = None,
+        refresh_interval: float = 600.0,
+        min_refetch_interval: float = 10.0,
+    ) -> None:
+        """Init the AsyncJWKSClient.
+
+        :param jwks_url: url of the json web key set
+        :param http_client: http client to fetch the keys with, by default the jwks client opens its own
+        :param refresh_interval: seconds between background refreshes if the jwks response sets no max-age
+        :param min_refetch_interval: minimum seconds between refetches triggered by unknown key ids
+        """
+        self.jwks_url = jwks_url
+        self.refresh_interval = refresh_interval
+        self.min_refetch_interval = min_refetch_interval
+        self.signing_keys: dict[str, jwt.PyJWK] = {}
+        self._http_client = http_client
+        self._owns_http_client = http_client is None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._fetch_task: Optional[asyncio.Task] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._last_fetch: float = -min_refetch_interval
+        self._expires_in: float = refresh_interval
+
+    async def start(self) -> None:
+        """Load the keys and start refreshing them in the background. Call it once on app startup."""
+        self._bind_to_running_loop()
+        try:
+            await self._fetch_shared()
+        except FETCH_ERRORS as exc_info:
+            self.logger.warning("Could not load jwks on startup, loading it on demand: %s", exc_info)
+        self._refresh_task = asyncio.create_task(self._refresh_periodically())
+
+    async def stop(self) -> None:
+        """Stop the background refresh and close the http client if owned. Call it once on app shutdown."""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+        if self._owns_http_client and self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    async def get_signing_key(self, kid: Optional[str]) -> jwt.PyJWK:
+        """Get the signing key with the given key id, refetching the key set once if the key is unknown.
+
+        :param kid: key id as found in the token header
+        :return: signing key
+        :raises jwt.PyJWKClientError: if no key with this id exists or the key set cannot be fetched
+        """
+        self._bind_to_running_loop()
+        signing_key = self.signing_keys.get(kid)
+        fetch_in_flight = self._fetch_task is not None and not self._fetch_task.done()
+        if signing_key is None and (
+            fetch_in_flight or time.monotonic() - self._last_fetch >= self.min_refetch_interval
+        ):
+            try:
+                await self._fetch_shared()
+            except FETCH_ERRORS as exc_info:
+                raise jwt.PyJWKClientError(f"Failed to fetch signing keys: {exc_info}")
+            signing_key = self.signing_keys.get(kid)
+        if signing_key is None:
+            raise jwt.PyJWKClientError(f'Unable to find a signing key that matches: "{kid}"')
+        return signing_key
+
+    async def get_signing_key_from_jwt(self, token: str) -> jwt.PyJWK:
+        """Get the signing key of a token, async counterpart of PyJWKClient.get_signing_key_from_jwt.
+
+        :param token: encoded jwt
+        :return: signing key
+        :raises jwt.DecodeError: if the token header cannot be decoded
+        :raises jwt.PyJWKClientError: if no matching key exists
+        """
+        header = jwt.get_unverified_header(token)
+        return await self.get_signing_key(header.get("kid"))
+
+    async def _fetch_shared(self) -> None:
+        """Fetch the key set, joining a fetch that is already in flight instead of starting another one."""
+        if self._fetch_task is None or self._fetch_task.done():
+            self._fetch_task = asyncio.create_task(self._fetch())
+        await asyncio.shield(self._fetch_task)
+
+    async def _fetch(self) -> None:
+        self._last_fetch = time.monotonic()
+        response = await self._get_http_client().get(self.jwks_url)
+        response.raise_for_status()
+        jwk_set = jwt.PyJWKSet.from_dict(response.json())
+        self.signing_keys = {jwk.key_id: jwk for jwk in jwk_set.keys}
+        self._expires_in = max_age(response.headers.get("cache-control")) or self.refresh_interval
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            # refresh ahead of expiry, retry sooner if the last fetch failed
+            await asyncio.sleep(max(self._expires_in * 0.9, 1.0))
+            try:
+                await self._fetch_shared()
+            except FETCH_ERRORS as exc_info:
+                self.logger.warning("Could not refresh jwks, keeping the current keys: %s", exc_info)
+                self._expires_in = min(self.min_refetch_interval, self.refresh_interval)
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(timeout=10.0)
+        return self._http_client
+
+    def _bind_to_running_loop(self) -> None:
+        """Drop loop bound state if called from another event loop, e.g. by a test client without lifespan."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._fetch_task = None
+            if self._owns_http_client:
+                self._http_client = None
+
+
+def max_age(cache_control: Optional[str]) -> Optional[float]:
+    """Get the max-age in seconds from a Cache-Control header.
+
+    >>> max_age("public, max-age=15, must-revalidate")
+    15.0
+    >>> max_age(None) is None
+    True
+    """
+    match = re.search(r"max-age=(\d+)", cache_control or "")
+    return float(match.group(1)) if match else None
@@ -0,0 +1,98 @@
+"""Provider of the openid server metadata of the identity provider, kept fresh in the background."""
+import asyncio
+import time
+from typing import Any, Optional
+
+import httpx
+
+from in_concert.dependencies.auth.jwks_client import max_age
+from in_concert.logging_in_concert.named_loggers_base import LoggedClass
+
+# errors of fetching or parsing the metadata, json decoding errors are value errors
+FETCH_ERRORS = (httpx.HTTPError, ValueError)
+
+
+class ServerMetadataClient(LoggedClass):
+    """Fetch the openid server metadata once on startup and refresh it in the background.
+
+    authlib loads the metadata of a registered oauth app lazily, on the first login, and keeps it for the life of the
+    process. The fetched metadata is written into the server metadata of the attached oauth app and marked as loaded,
+    so that no login waits for it, and refreshes pick up changed endpoints. If the metadata cannot be fetched on
+    startup, authlib loads it on demand as before.
+    """
+
+    def __init__(
+        self,
+        metadata_url: str,
+        http_client: httpx.AsyncClient,
+        refresh_interval: float = 3_600.0,
+        retry_interval: float = 10.0,
+    ) -> None:
+        """Init the ServerMetadataClient.
+
+        :param metadata_url: url of the openid configuration
+        :param http_client: http client to fetch the metadata with
+        :param refresh_interval: seconds between background refreshes if the response sets no max-age
+        :param retry_interval: seconds until the next refresh after a failed fetch
+        """
+        self.metadata_url = metadata_url
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.server_metadata: dict[str, Any] = {}
+        self._http_client = http_client
+        self._oauth_app = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._expires_in: float = refresh_interval
+
+    def attach(self, oauth_app) -> None:
+        """Keep the server metadata of an oauth app registered with authlib up to date.
+
+        :param oauth_app: the registered app, e.g. oauth.auth0
+        """
+        self._oauth_app = oauth_app
+        if self.server_metadata:
+            self._update_oauth_app()
+
+    async def start(self) -> None:
+        """Load the metadata and start refreshing it in the background. Call it once on app startup."""
+        try:
+            await self.fetch()
+        except FETCH_ERRORS as exc_info:
+            self.logger.warning("Could not load openid server metadata on startup, loading it on demand: %s", exc_info)
+            self._expires_in = self.retry_interval
+        self._refresh_task = asyncio.create_task(self._refresh_periodically())
+
+    async def stop(self) -> None:
+        """Stop the background refresh. Call it once on app shutdown."""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def fetch(self) -> None:
+        """Fetch the metadata and write it into the attached oauth app."""
+        response = await self._http_client.get(self.metadata_url)
+        response.raise_for_status()
+        server_metadata = response.json()
+        if not isinstance(server_metadata, dict):
+            raise ValueError("openid server metadata is not a json object")
+        self.server_metadata = server_metadata
+        self._expires_in = max_age(response.headers.get("cache-control")) or self.refresh_interval
+        self._update_oauth_app()
+
+    def _update_oauth_app(self) -> None:
+        if self._oauth_app is not None:
+            # authlib skips its own load once _loaded_at is set
+            self._oauth_app.server_metadata.update(self.server_metadata, _loaded_at=time.time())
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(max(self._expires_in * 0.9, 1.0))
+            try:
+                await self.fetch()
+            except FETCH_ERRORS as exc_info:
+                self.logger.warning("Could not refresh openid server metadata, keeping the current one: %s", exc_info)
+                self._expires_in = self.retry_interval
@@ -1,3 +1,5 @@
+import hashlib
+import time
 from typing import Callable, Optional
 
 import jwt
@@ -6,6 +8,8 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from fastapi.security.utils import get_authorization_scheme_param
 from starlette.status import HTTP_401_UNAUTHORIZED
 
+from in_concert.cache import TTLCache
+from in_concert.dependencies.auth.jwks_client import AsyncJWKSClient
 from in_concert.dependencies.schemas import OauthTokenSchema
 
 
@@ -64,22 +68,42 @@ class RequestLikeTokenDict:
 class JwkTokenVerifier:
     """Does all the token verification using PyJWT"""
 
-    def __init__(self, settings, jwks_client: jwt.PyJWKClient, decoder: Callable = jwt.decode):
+    def __init__(
+        self,
+        settings,
+        jwks_client: AsyncJWKSClient,
+        decoder: Callable = jwt.decode,
+        payload_cache: Optional[TTLCache] = None,
+    ):
+        """Init the JwkTokenVerifier.
+
+        :param settings: settings holding the expected algorithms, audience and issuer
+        :param jwks_client: client providing the signing keys
+        :param decoder: function verifying and decoding the token
+        :param payload_cache: cache of verified payloads keyed on the token's hash, disabled if not given
+        """
         self.settings = settings
         self.jwks_client = jwks_client
         self.decoder = decoder
+        self.payload_cache = payload_cache if payload_cache is not None else TTLCache(maxsize=0, ttl=0)
 
-    def verify(self, access_token: str) -> dict:
+    async def verify(self, access_token: str) -> dict:
         """
         Verifies the token and returns the payload if successful.
 
         param: token: The access token to verify
         return: dict: The payload if successful
         raises: jwt.exceptions.DecodeError if decoding the signing key or the token fails
+        raises: jwt.exceptions.PyJWKClientError if no signing key matches the token
         raises: jwt.exceptions.InvalidSignatureError if the signature is invalid
         raises: jwt.exceptions.ExpiredSignatureError if the token is expired
         """
-        signing_key = self.jwks_client.get_signing_key_from_jwt(access_token).key
+        cache_key = hashlib.sha256(access_token.encode()).digest()
+        payload = self.payload_cache.get(cache_key)
+        if payload is not None:
+            return payload
+
+        signing_key = (await self.jwks_client.get_signing_key_from_jwt(access_token)).key
         payload = self.decoder(
             access_token,
             signing_key,
@@ -87,4 +111,8 @@ class JwkTokenVerifier:
             audience=self.settings.audience,
             issuer=self.settings.issuer,
         )
+        # a verified payload stays valid until the token expires, tokens without expiry are not cached
+        if "exp" in payload:
+            ttl = min(payload["exp"] - time.time(), self.payload_cache.ttl)
+            self.payload_cache.set(cache_key, payload, ttl=ttl)
         return payload
@@ -1,5 +1,9 @@
 import abc
-from typing import Any
+import asyncio
+import concurrent.futures
+import itertools
+import logging
+from typing import Any, AsyncIterator, Iterable, Optional
 
 import jwt
 import openfga_sdk
@@ -12,12 +16,15 @@ from openfga_sdk.client.models import (
     ClientTuple,
     ClientWriteRequest,
 )
+from openfga_sdk.models.read_request_tuple_key import ReadRequestTupleKey
 from sqlalchemy.orm import Session
 
+from in_concert.cache import TTLCache
 from in_concert.dependencies.auth.token_validation import (
     HTTPBearerWithCookie,
     JwkTokenVerifier,
 )
+from in_concert.dependencies.db_session import run_and_commit, run_in_session
 
 
 class UserAuthorizerJWT:
@@ -85,17 +92,26 @@ class UserAuthorizerJWT:
         """
         Get payload from access token.
 
+        The payload is memoized on the request state, so that a token is verified at most once per request.
+
         :param request: starlette request object
         :param scope: scope to grant access to
         :return: payload
         """
         http_credentials: HTTPAuthorizationCredentials = await self.bearer(request)
         token: str = http_credentials.credentials
+        # request like objects, e.g. RequestLikeTokenDict, have no state to memoize the payload on
+        request_state = request.state if isinstance(request, Request) else None
+        memoized_token, memoized_payload = getattr(request_state, "jwt_payload", (None, None))
+        if memoized_token == token:
+            return memoized_payload
         try:
-            payload = self.token_verifier.verify(token)
+            payload = await self.token_verifier.verify(token)
         except jwt.PyJWTError as exc_info:
             raise HTTPException(status_code=401, detail=f"{exc_info}")
         else:
+            if request_state is not None:
+                request_state.jwt_payload = (token, payload)
             return payload
 
     def set_session(self, token_dict: dict, response: Response) -> None:
@@ -105,16 +121,45 @@ class UserAuthorizerJWT:
         self.bearer.set_token(token_dict, response)
 
 
-class UserAuthorizerFGA:
+class RelationshipAuthorizer(abc.ABC):
     """
-    Manage the authorization of the current user based on FGA authorization model.
+    Manage the authorization of the current user based on relationship tuples, as in the FGA authorization model.
+
+    A tuple (user, relation, object), e.g. ("user:auth0|1", "can_delete", "venue:1"), grants the relation. Subclasses
+    store the tuples, this base maps requests and scopes onto them and caches check decisions.
     """
 
     def __init__(
-        self, fga_configuration: openfga_sdk.ClientConfiguration, user_authorizer_jwt: UserAuthorizerJWT
+        self,
+        user_authorizer_jwt: UserAuthorizerJWT,
+        max_tuples_per_write: int = 10,
+        check_cache: Optional[TTLCache] = None,
     ) -> None:
-        self.fga_configuration = fga_configuration
+        """Init the RelationshipAuthorizer.
+
+        :param user_authorizer_jwt: authorizer providing the current user's id
+        :param max_tuples_per_write: maximum number of tuples written in one request to the store
+        :param check_cache: cache of check decisions keyed on (user, relation, object), disabled if not given
+        """
         self.user_authorizer_jwt = user_authorizer_jwt
+        self.max_tuples_per_write = max_tuples_per_write
+        self.check_cache = check_cache if check_cache is not None else TTLCache(maxsize=0, ttl=0)
+        # incremented on every write, so that a check overlapping with a write does not cache a stale decision
+        self._write_generation = 0
+
+    async def open(self) -> None:
+        """Open the resources shared by all requests. Call it once on app startup."""
+
+    async def close(self) -> None:
+        """Release the resources shared by all requests. Call it once on app shutdown."""
+
+    @abc.abstractmethod
+    async def _check_tuple(self, user: str, relation: str, object_: str) -> bool:
+        """Check whether the store holds the tuple."""
+
+    @abc.abstractmethod
+    async def _write_tuples(self, permission_tuples: list[tuple[str, str, str]], delete: bool) -> None:
+        """Write or delete at most max_tuples_per_write tuples in the store."""
 
     async def is_authorized_current_user(self, request: Request, scopes: SecurityScopes, object_id: int) -> bool:
         """Determine whether current user is authorized for fga scope.
@@ -123,14 +168,12 @@ class UserAuthorizerFGA:
         :param scope: scope to grant access to
         :return: true if authorized
         """
-        response = await self._check_authorization_current_user(request, scopes, object_id)
-        if not response.allowed:
+        allowed = await self._check_authorization_current_user(request, scopes, object_id)
+        if not allowed:
             raise HTTPException(status_code=403, detail="Insufficient permissions")
         return True
 
-    async def _check_authorization_current_user(
-        self, request: Request, scopes: SecurityScopes, object_id: int
-    ) -> Response:
+    async def _check_authorization_current_user(self, request: Request, scopes: SecurityScopes, object_id: int) -> bool:
         user_id: str = await self.user_authorizer_jwt.get_current_user_id(request)
         user_str: str = f"user:{user_id}"
 
@@ -139,21 +182,26 @@ class UserAuthorizerFGA:
         object_type = relation_object_type[1]
         object_str = f"{object_type}:{object_id}"
 
-        options = {"store_id": self.fga_configuration.store_id}
-        body = ClientCheckRequest(
-            user=user_str,
-            relation=relation,
-            object=object_str,
-        )
-        async with OpenFgaClient(self.fga_configuration) as fga_client:
-            # Enter a context with an instance of the OpenFgaClient
-            response = await fga_client.check(body, options)
-            await fga_client.close()
-        return response
+        return await self._check(user_str, relation, object_str)
+
+    async def _check(self, user: str, relation: str, object_: str) -> bool:
+        """Check whether user has relation to object, serving recent decisions from the check cache."""
+        cache_key = (user, relation, object_)
+        allowed: Optional[bool] = self.check_cache.get(cache_key)
+        if allowed is not None:
+            return allowed
+
+        write_generation = self._write_generation
+        allowed = await self._check_tuple(user, relation, object_)
+        if write_generation == self._write_generation:
+            self.check_cache.set(cache_key, allowed)
+        return allowed
 
     async def add_permissions(self, request: Request, relations: list[str], object_type: str, object_id: int) -> None:
         """Add permissions for a user to an object.
 
+        All relations are written in a single request.
+
         :param relation: relation of user to object
         :param object_type: type of object
         :param object_id: id of object
@@ -163,21 +211,7 @@ class UserAuthorizerFGA:
         user_str: str = f"user:{user_id}"
         object_str = f"{object_type}:{object_id}"
 
-        options = {"store_id": self.fga_configuration.store_id}
-        for relation in relations:
-            body = ClientWriteRequest(
-                writes=[
-                    ClientTuple(
-                        user=user_str,
-                        relation=relation,
-                        object=object_str,
-                    ),
-                ],
-            )
-            async with OpenFgaClient(self.fga_configuration) as fga_client:
-                # Enter a context with an instance of the OpenFgaClient
-                await fga_client.write(body, options)
-                await fga_client.close()
+        await self.add_permission_tuples([(user_str, relation, object_str) for relation in relations])
         return
 
     async def remove_permissions(
@@ -185,6 +219,8 @@ class UserAuthorizerFGA:
     ) -> None:
         """Remove permissions for user w.r.t. specified object.
 
+        All relations are deleted in a single request.
+
         :param object_type: type of object
         :param object_id: id of object
         :param relations: relations to remove from object
@@ -193,23 +229,149 @@ class UserAuthorizerFGA:
         user: str = f"user:{user_id}"
         object_: str = f"{object_type}:{object_id}"
 
-        options = {"store_id": self.fga_configuration.store_id}
-        for relation in relations:
-            body = ClientWriteRequest(
-                deletes=[
-                    ClientTuple(
-                        user=user,
-                        relation=relation,
-                        object=object_,
-                    ),
-                ],
-            )
-            async with OpenFgaClient(self.fga_configuration) as fga_client:
-                # Enter a context with an instance of the OpenFgaClient
-                await fga_client.write(body, options)
-                await fga_client.close()
+        await self.remove_permission_tuples([(user, relation, object_) for relation in relations])
         return
 
+    async def add_permission_tuples(self, permission_tuples: Iterable[tuple[str, str, str]]) -> None:
+        """Add permissions for any number of users and objects in bulk.
+
+        The tuples are written in chunks of at most max_tuples_per_write tuples, one request per chunk.
+
+        :param permission_tuples: (user, relation, object) tuples, e.g. ("user:auth0|1", "can_delete", "venue:1")
+        """
+        await self._write_permission_tuples(permission_tuples, delete=False)
+
+    async def remove_permission_tuples(self, permission_tuples: Iterable[tuple[str, str, str]]) -> None:
+        """Remove permissions for any number of users and objects in bulk.
+
+        The tuples are deleted in chunks of at most max_tuples_per_write tuples, one request per chunk.
+
+        :param permission_tuples: (user, relation, object) tuples, e.g. ("user:auth0|1", "can_delete", "venue:1")
+        """
+        await self._write_permission_tuples(permission_tuples, delete=True)
+
+    async def _write_permission_tuples(self, permission_tuples: Iterable[tuple[str, str, str]], delete: bool) -> None:
+        permission_tuples = iter(permission_tuples)
+        while chunk := list(itertools.islice(permission_tuples, self.max_tuples_per_write)):
+            try:
+                await self._write_tuples(chunk, delete)
+            finally:
+                self._write_generation += 1
+                for permission_tuple in chunk:
+                    self.check_cache.invalidate(permission_tuple)
+
+
+class UserAuthorizerFGA(RelationshipAuthorizer):
+    """
+    Manage the authorization of the current user based on FGA authorization model, checked by a remote OpenFGA.
+    """
+
+    # named as LoggedClass names its loggers, its metaclass does not combine with the one of abc
+    logger = logging.getLogger("UserAuthorizerFGA")
+
+    def __init__(
+        self,
+        fga_configuration: openfga_sdk.ClientConfiguration,
+        user_authorizer_jwt: UserAuthorizerJWT,
+        max_tuples_per_write: int = 10,
+        check_cache: Optional[TTLCache] = None,
+    ) -> None:
+        """Init the UserAuthorizerFGA.
+
+        :param fga_configuration: configuration of the fga client
+        :param user_authorizer_jwt: authorizer providing the current user's id
+        :param max_tuples_per_write: maximum number of tuples sent to fga in one write request
+        :param check_cache: cache of check decisions keyed on (user, relation, object), disabled if not given
+        """
+        super().__init__(user_authorizer_jwt, max_tuples_per_write=max_tuples_per_write, check_cache=check_cache)
+        self.fga_configuration = fga_configuration
+        self.fga_client: Optional[OpenFgaClient] = None
+        self._fga_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def open(self) -> None:
+        """Open the fga client shared by all requests.
+
+        The client keeps a pool of keep-alive connections and caches the client credentials token,
+        so it is meant to live as long as the app. Call it once on app startup.
+        """
+        if self.fga_client is None:
+            self.fga_client = OpenFgaClient(self.fga_configuration)
+            self._fga_client_loop = asyncio.get_running_loop()
+
+    async def close(self) -> None:
+        """Close the shared fga client and its connection pool. Call it once on app shutdown."""
+        if self.fga_client is not None:
+            await self.fga_client.close()
+            self.fga_client = None
+            self._fga_client_loop = None
+
+    async def _get_fga_client(self) -> OpenFgaClient:
+        """Get the shared fga client, opening it lazily if the app did not run its startup hook.
+
+        The connection pool is bound to the event loop it was opened on. If we are called from another loop,
+        e.g. by a test client without lifespan, the client is closed and a new one is opened for the current loop.
+        """
+        if self.fga_client is not None and self._fga_client_loop is not asyncio.get_running_loop():
+            fga_client, fga_client_loop = self.fga_client, self._fga_client_loop
+            self.fga_client = None
+            self._fga_client_loop = None
+            if fga_client_loop.is_closed():
+                # the connections went with their loop, there is nothing left to close them with
+                self.logger.warning("Dropped the fga client of a closed event loop without closing it")
+            elif fga_client_loop.is_running():
+                # connections are closed by the loop they belong to
+                closing = asyncio.run_coroutine_threadsafe(fga_client.close(), fga_client_loop)
+                closing.add_done_callback(self._log_close_error)
+            else:
+                try:
+                    await fga_client.close()
+                except RuntimeError as exc_info:
+                    self.logger.warning("Could not close the fga client of a stopped event loop: %s", exc_info)
+        await self.open()
+        return self.fga_client
+
+    def _log_close_error(self, closing: concurrent.futures.Future) -> None:
+        if not closing.cancelled() and closing.exception() is not None:
+            self.logger.warning("Could not close the fga client of another event loop: %s", closing.exception())
+
+    async def _check_tuple(self, user: str, relation: str, object_: str) -> bool:
+        options = {"store_id": self.fga_configuration.store_id}
+        body = ClientCheckRequest(
+            user=user,
+            relation=relation,
+            object=object_,
+        )
+        fga_client = await self._get_fga_client()
+        response = await fga_client.check(body, options)
+        return response.allowed
+
+    async def _write_tuples(self, permission_tuples: list[tuple[str, str, str]], delete: bool) -> None:
+        options = {"store_id": self.fga_configuration.store_id}
+        fga_client = await self._get_fga_client()
+        client_tuples = [
+            ClientTuple(user=user, relation=relation, object=object_) for user, relation, object_ in permission_tuples
+        ]
+        body = ClientWriteRequest(deletes=client_tuples) if delete else ClientWriteRequest(writes=client_tuples)
+        await fga_client.write(body, options)
+
+    async def read_permission_tuples(self, page_size: int = 100) -> AsyncIterator[list[tuple[str, str, str]]]:
+        """Read all tuples of the fga store, a page at a time.
+
+        :param page_size: maximum number of tuples per read request, fga allows at most 100
+        :return: pages of (user, relation, object) tuples
+        """
+        fga_client = await self._get_fga_client()
+        continuation_token = None
+        while True:
+            options = {"store_id": self.fga_configuration.store_id, "page_size": page_size}
+            if continuation_token:
+                options["continuation_token"] = continuation_token
+            response = await fga_client.read(ReadRequestTupleKey(), options)
+            yield [(t.key.user, t.key.relation, t.key.object) for t in response.tuples]
+            continuation_token = response.continuation_token
+            if not continuation_token:
+                return
+
 
 class UserABC(abc.ABC):
     @abc.abstractmethod
@@ -220,6 +382,11 @@ class UserABC(abc.ABC):
     def insert(request: Request, db_session: Session) -> int:
         pass
 
+    @classmethod
+    @abc.abstractmethod
+    def insert_if_missing(cls, db_session: Session, id: str) -> bool:
+        pass
+
 
 class UserOAuth2Integrator:
     """Integrate the UserAuthorizer with the internal user model."""
@@ -228,16 +395,19 @@ class UserOAuth2Integrator:
         self,
         user_authorizer: UserAuthorizerJWT,
         user_model: UserABC,
-        user_authorizer_fga: UserAuthorizerFGA,
+        user_authorizer_fga: RelationshipAuthorizer,
+        known_users: Optional[TTLCache] = None,
     ) -> None:
         """Init the UserOAUth2Integrator.
 
         :param user_authorizer: integrates authorization with oauth2 model
         :param user_model: orm class of internal sql user model
+        :param known_users: cache of the ids of users known to be in the database, disabled if not given
         """
         self.user_model = user_model
         self.user_authorizer = user_authorizer
         self.user_authorizer_fga = user_authorizer_fga
+        self.known_users = known_users if known_users is not None else TTLCache(maxsize=0, ttl=0)
 
     async def get_current_user(self, request: Request, db_session: Session) -> Any:
         """Get the current user from the database.
@@ -248,8 +418,7 @@ class UserOAuth2Integrator:
         """
         current_user_id: str = await self.user_authorizer.get_current_user_id(request)
 
-        with db_session:
-            user_from_db = db_session.get(self.user_model, current_user_id)
+        user_from_db = await run_in_session(db_session, Session.get, self.user_model, current_user_id)
         if not user_from_db:
             raise KeyError("Current user not found in database.")
         else:
@@ -264,17 +433,24 @@ class UserOAuth2Integrator:
         """
         user_id: str = await self.user_authorizer.get_current_user_id(request)
         user = self.user_model(id=user_id)
-        user_id = user.insert(db_session)
+        user_id = await run_in_session(db_session, user.insert)
         return user_id
 
     async def sync_current_user(self, request, db_session: Session):
         """Sync the internal user_model db with oauth2 token.
 
+        The user is inserted unless it exists, and committed. Users synced before are remembered in known_users,
+        so that the logins of returning users do not touch the database.
+
         :param request: starlette request object
         :param db_session: sqlalchemy session object
         """
+        user_id: str = await self.user_authorizer.get_current_user_id(request)
+        if self.known_users.get(user_id):
+            return
         try:
-            _ = await self.add_current_user(request, db_session)
+            await run_and_commit(db_session, self.user_model.insert_if_missing, user_id)
         except sqlalchemy.exc.IntegrityError:
-            return
-        return
+            # the user exists already, on a dialect without upsert
+            pass
+        self.known_users.set(user_id, True)
@@ -1,16 +1,247 @@
-from sqlalchemy.orm import sessionmaker
+import contextvars
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Optional, Sequence, TypeVar, Union
 
+from sqlalchemy import Engine, Executable, create_engine, event
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
 
-class DBSessionDependency:
-    """Inject a SQLAlchemy session into a FastAPI endpoint."""
+from in_concert.logging_in_concert.named_loggers_base import LoggedClass
+from in_concert.settings import AppSettings
 
-    def __init__(self, engine):
+T = TypeVar("T")
+
+
+@dataclass
+class DBRequestStats:
+    """Database usage of one request, counted by the listeners of instrument_engine."""
+
+    pool_checkouts: int = 0
+    transactions: int = 0
+
+
+# stats of the request being served, set by the session dependency
+_db_request_stats: contextvars.ContextVar[Optional[DBRequestStats]] = contextvars.ContextVar(
+    "db_request_stats", default=None
+)
+
+
+def get_db_request_stats(session: Union[Session, AsyncSession]) -> DBRequestStats:
+    """Get the database usage counted for the request a session was injected into.
+
+    :param session: sync or async session as injected by the session dependency
+    :return: stats of the request
+    """
+    return session.info["db_request_stats"]
+
+
+def _count_pool_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+    stats = _db_request_stats.get()
+    if stats is not None:
+        stats.pool_checkouts += 1
+
+
+def _count_transaction(connection) -> None:
+    stats = _db_request_stats.get()
+    if stats is not None:
+        stats.transactions += 1
+
+
+def instrument_engine(engine: Union[Engine, AsyncEngine]) -> None:
+    """Count pool checkouts and transactions of the engine per request. Registering twice is a no-op."""
+    sync_engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+    if not event.contains(sync_engine, "checkout", _count_pool_checkout):
+        event.listen(sync_engine, "checkout", _count_pool_checkout)
+        event.listen(sync_engine, "begin", _count_transaction)
+
+
+def _start_request_stats(session: Union[Session, AsyncSession]) -> DBRequestStats:
+    stats = DBRequestStats()
+    session.info["db_request_stats"] = stats
+    _db_request_stats.set(stats)
+    return stats
+
+
+def _end_session(session: Session, commit: bool) -> None:
+    """Commit or roll back the transaction of the session and close it, in one go to save a threadpool round trip."""
+    try:
+        if commit and session.in_transaction():
+            session.commit()
+    finally:
+        session.close()
+
+
+def create_db_engine(app_settings: AppSettings) -> Union[Engine, AsyncEngine]:
+    """Create the database engine, an async engine if app_settings.db_async is set.
+
+    :param app_settings: settings holding the connection string, e.g. sqlite+aiosqlite:///db.sqlite for async mode
+    :return: sqlalchemy engine
+    """
+    db_connection_string = app_settings.db_connection_string.get_secret_value()
+    if app_settings.db_async:
+        return create_async_engine(db_connection_string)
+    return create_engine(db_connection_string)
+
+
+class DBSessionDependency(LoggedClass):
+    """Inject a SQLAlchemy session into a FastAPI endpoint.
+
+    The request holds one session and one transaction: the transaction begins on first use, is committed once the
+    endpoint returns, or rolled back if it raises, and the connection goes back to the pool once.
+    Note that FastAPI runs the teardown after the response is sent, endpoints that must not report success before
+    the commit commit themselves.
+    """
+
+    def __init__(self, engine: Engine):
         self.engine = engine
         self.session_factory: sessionmaker = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        instrument_engine(self.engine)
 
-    def __call__(self) -> sessionmaker:
+    async def __call__(self) -> AsyncIterator[Session]:
+        session: Session = self.session_factory()
+        stats = _start_request_stats(session)
         try:
-            session = self.session_factory()
-            return session
+            yield session
+        except Exception:
+            await run_in_threadpool(_end_session, session, commit=False)
+            raise
+        else:
+            if session.in_transaction():
+                await run_in_threadpool(_end_session, session, commit=True)
+            else:
+                # the session was not used, e.g. the page was served from cache, closing it does no io
+                session.close()
         finally:
-            session.close()
+            _db_request_stats.set(None)
+            self.logger.debug(
+                "Request used %d pool checkouts, %d transactions", stats.pool_checkouts, stats.transactions
+            )
+
+
+class AsyncDBSessionDependency(LoggedClass):
+    """Inject a SQLAlchemy async session into a FastAPI endpoint, with the lifecycle of DBSessionDependency."""
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.session_factory: async_sessionmaker = async_sessionmaker(autoflush=False, bind=self.engine)
+        instrument_engine(self.engine)
+
+    async def __call__(self) -> AsyncIterator[AsyncSession]:
+        async with self.session_factory() as session:
+            stats = _start_request_stats(session)
+            try:
+                yield session
+            except Exception:
+                await session.rollback()
+                raise
+            else:
+                if session.in_transaction():
+                    await session.commit()
+        _db_request_stats.set(None)
+        self.logger.debug("Request used %d pool checkouts, %d transactions", stats.pool_checkouts, stats.transactions)
+
+
+def create_db_session_dependency(
+    engine: Union[Engine, AsyncEngine]
+) -> Union[DBSessionDependency, AsyncDBSessionDependency]:
+    """Create the session dependency matching the engine, async sessions for an async engine."""
+    if isinstance(engine, AsyncEngine):
+        return AsyncDBSessionDependency(engine)
+    return DBSessionDependency(engine)
+
+
+async def run_in_session(session: Union[Session, AsyncSession], fn: Callable[..., T], *args, **kwargs) -> T:
+    """Run sync orm code with a session without blocking the event loop.
+
+    With an async session, fn runs via AsyncSession.run_sync on the async driver. With a sync session, fn runs in
+    the threadpool.
+
+    :param session: sync or async session as injected by the session dependency
+    :param fn: function taking a sync session as first argument
+    :return: return value of fn
+    """
+    if isinstance(session, AsyncSession):
+        return await session.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, session, *args, **kwargs)
+
+
+async def run_and_commit(session: Union[Session, AsyncSession], fn: Callable[..., T], *args, **kwargs) -> T:
+    """Run sync orm code with a session and commit, or roll back if it raises, in a single call of run_in_session.
+
+    The transaction does not stay open while the event loop serves other requests, which matters for contended rows
+    and for sqlite, where a writer locks the whole database until it commits. The session expires its objects on
+    commit, so fn returns what the caller needs from them.
+
+    :param session: sync or async session as injected by the session dependency
+    :param fn: function taking a sync session as first argument
+    :return: return value of fn
+    """
+
+    def run_committing(sync_session: Session, *args, **kwargs) -> T:
+        try:
+            result = fn(sync_session, *args, **kwargs)
+        except Exception:
+            sync_session.rollback()
+            raise
+        sync_session.commit()
+        return result
+
+    return await run_in_session(session, run_committing, *args, **kwargs)
+
+
+async def run_in_new_session(
+    session_factory: Union[sessionmaker, async_sessionmaker], fn: Callable[..., T], *args, commit: bool = False
+) -> T:
+    """Run sync orm code with a session of its own, for work outside of requests, e.g. background tasks.
+
+    :param session_factory: factory of sync or async sessions, as created by the session dependency
+    :param fn: function taking a sync session as first argument
+    :param commit: commit once fn returns, or roll back if it raises
+    :return: return value of fn
+    """
+    session: Union[Session, AsyncSession] = session_factory()
+    try:
+        if commit:
+            return await run_and_commit(session, fn, *args)
+        return await run_in_session(session, fn, *args)
+    finally:
+        if isinstance(session, AsyncSession):
+            await session.close()
+        else:
+            await run_in_threadpool(session.close)
+
+
+async def stream_in_session(
+    session: Union[Session, AsyncSession], statement: Executable, partition_size: int
+) -> AsyncIterator[Sequence[Any]]:
+    """Stream the rows of a statement in partitions, fetched with a server side cursor where the driver has one.
+
+    Only one partition is held in memory at a time. The session must stay open until the stream is exhausted.
+
+    :param session: sync or async session as injected by the session dependency
+    :param statement: select statement
+    :param partition_size: rows fetched per partition
+    """
+    statement = statement.execution_options(yield_per=partition_size)
+    if isinstance(session, AsyncSession):
+        async_result = await session.stream(statement)
+        try:
+            async for partition in async_result.partitions():
+                yield partition
+        finally:
+            await async_result.close()
+        return
+
+    result = await run_in_threadpool(session.execute, statement)
+    partitions = result.partitions()
+    try:
+        while (partition := await run_in_threadpool(next, partitions, None)) is not None:
+            yield partition
+    finally:
+        await run_in_threadpool(result.close)
@@ -0,0 +1,46 @@
+"""A connection pool shared by the http clients of the app."""
+import asyncio
+from typing import Optional
+
+import httpx
+
+
+class SharedTransport(httpx.AsyncBaseTransport):
+    """Send the requests of many http clients through one connection pool.
+
+    Closing a client that uses this transport leaves the pool open, so that short-lived clients, like the ones
+    authlib opens for each token exchange, reuse the connections of the app instead of opening new ones. The pool is
+    closed by close on app shutdown. Connections belong to the event loop that opened them, the pool is replaced if
+    used from another loop, e.g. by a test client without lifespan.
+    """
+
+    def __init__(self, limits: httpx.Limits = httpx.Limits(), transport: Optional[httpx.AsyncBaseTransport] = None):
+        """Init the SharedTransport.
+
+        :param limits: connection limits of the pool
+        :param transport: transport to send the requests with instead of a pool, e.g. an asgi transport in tests
+        """
+        self.limits = limits
+        self._transport = transport
+        self._owns_transport = transport is None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._get_transport().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        """Keep the pool open when a client using it is closed."""
+
+    async def close(self) -> None:
+        """Close the connection pool. Call it once on app shutdown."""
+        if self._owns_transport and self._transport is not None:
+            await self._transport.aclose()
+            self._transport = None
+
+    def _get_transport(self) -> httpx.AsyncBaseTransport:
+        if self._owns_transport:
+            loop = asyncio.get_running_loop()
+            if self._transport is None or self._loop is not loop:
+                self._transport = httpx.AsyncHTTPTransport(limits=self.limits)
+                self._loop = loop
+        return self._transport
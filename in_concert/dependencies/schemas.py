@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel, ConfigDict
 
 
@@ -6,3 +8,11 @@ class OauthTokenSchema(BaseModel):
     token_type: str
 
     model_config = ConfigDict(extra="allow")
+
+
+class QueueTicketSchema(BaseModel):
+    """Place of a user in the waiting room, the token is only sent once, on joining."""
+
+    token: Optional[str] = None
+    position: int
+    retry_after: int
@@ -0,0 +1,221 @@
+"""Admission control for on-sale spikes, a virtual waiting room in front of the reservation endpoints."""
+import math
+import secrets
+import time
+from typing import Callable, Optional
+
+import jwt
+from fastapi import HTTPException, Request
+from starlette.status import HTTP_401_UNAUTHORIZED, HTTP_429_TOO_MANY_REQUESTS
+
+from in_concert.dependencies.auth.user_authorization import UserAuthorizerJWT
+from in_concert.dependencies.schemas import QueueTicketSchema
+from in_concert.logging_in_concert.named_loggers_base import LoggedClass
+
+# header carrying the queue token of a request
+QUEUE_TOKEN_HEADER = "x-queue-token"
+
+
+class TokenBucket:
+    """Allow events at a sustained rate, with bursts up to the capacity of the bucket.
+
+    >>> now = [0.0]
+    >>> bucket = TokenBucket(rate=2, capacity=3, clock=lambda: now[0])
+    >>> bucket.take_up_to(5)
+    3
+    >>> now[0] = 1.0
+    >>> bucket.take_up_to(5), bucket.seconds_until(1)
+    (2, 0.5)
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic) -> None:
+        """Init the TokenBucket.
+
+        :param rate: tokens added per second
+        :param capacity: maximum number of tokens, the bucket starts full
+        :param clock: monotonic clock returning seconds
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self._updated = clock()
+
+    def take_up_to(self, n: int) -> int:
+        """Take as many whole tokens as available, at most n.
+
+        :return: number of tokens taken
+        """
+        self._refill()
+        taken = max(min(n, math.floor(self.tokens)), 0)
+        self.tokens -= taken
+        return taken
+
+    def seconds_until(self, n: float) -> float:
+        """Get the seconds until n tokens are available, if none are taken meanwhile."""
+        self._refill()
+        return max(n - self.tokens, 0.0) / self.rate
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.tokens + (now - self._updated) * self.rate, self.capacity)
+        self._updated = now
+
+
+class WaitingRoom(LoggedClass):
+    """Admit users to the reservation endpoints at a steady rate, first come first served.
+
+    While capacity lasts, requests are admitted right away. Once the token bucket is used up, users join the queue
+    and get a signed queue token holding their ticket number, tickets are admitted in order at the rate of the bucket.
+    A request is admitted if its token's ticket was admitted, otherwise it is shed with 429 and a Retry-After estimate
+    of the user's wait, as are joins once the queue is full. Queue tokens are bound to the user and to the process
+    that issued them, the queue lives in memory, so each process admits at its own rate. A user holds at most one
+    ticket, joining again returns it, and its token admits a single request.
+    """
+
+    def __init__(
+        self,
+        user_authorizer_jwt: UserAuthorizerJWT,
+        secret_key: str,
+        admission_rate: float,
+        burst: int,
+        max_queue_length: int,
+        token_ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Init the WaitingRoom.
+
+        :param user_authorizer_jwt: authorizer providing the current user's id
+        :param secret_key: key signing the queue tokens
+        :param admission_rate: users admitted per second, sustained
+        :param burst: users admitted at once after a quiet period
+        :param max_queue_length: maximum number of users waiting, further users are turned away
+        :param token_ttl: seconds a queue token is valid, whether its ticket was admitted or not
+        :param clock: monotonic clock returning seconds
+        """
+        self.user_authorizer_jwt = user_authorizer_jwt
+        self.secret_key = secret_key
+        self.bucket = TokenBucket(rate=admission_rate, capacity=burst, clock=clock)
+        self.max_queue_length = max_queue_length
+        self.token_ttl = token_ttl
+        # tokens of another instance, e.g. before a restart, are not honoured, their ticket numbers start over
+        self.room_id = secrets.token_hex(8)
+        # tickets issued so far, tickets below now_serving are admitted
+        self.n_issued = 0
+        self.now_serving = 0
+        self.clock = clock
+        # unused ticket of each user as (ticket, token, expiry on clock), in order of expiry
+        self._tickets: dict[str, tuple[int, str, float]] = {}
+        self.admitted = 0
+        self.shed = 0
+
+    async def admit(self, request: Request, user_id: str) -> bool:
+        """Admit the current request of an authenticated user, to be used by a dependency of the guarded endpoints.
+
+        The user is authenticated first, so that anonymous requests do not use up capacity.
+
+        :param request: starlette request object, carrying the queue token in the x-queue-token header if any
+        :param user_id: id of the current user
+        :raises HTTPException: 429 with Retry-After if the request is not admitted yet, 401 if the queue token is
+            invalid or was used already
+        :return: true if admitted
+        """
+        self._advance()
+        token = request.headers.get(QUEUE_TOKEN_HEADER)
+        if token is None:
+            if self.n_waiting == 0 and self.bucket.take_up_to(1):
+                self.admitted += 1
+                return True
+            self._shed("Capacity used up, join the waiting room.", self._seconds_until_served(self.n_waiting + 1))
+        ticket = self._verify(token, user_id)
+        position = self._position(ticket)
+        if position:
+            self._shed(f"Waiting room position {position}.", self._seconds_until_served(position))
+        del self._tickets[user_id]
+        self.admitted += 1
+        return True
+
+    async def join(self, request: Request) -> QueueTicketSchema:
+        """Join the queue, the ticket is admitted once all tickets issued before are.
+
+        A user who holds an unused ticket already gets it again instead of a new one.
+
+        :param request: starlette request object
+        :raises HTTPException: 429 with Retry-After if the queue is full
+        :return: queue token, position and seconds until admission
+        """
+        user_id = await self.user_authorizer_jwt.get_current_user_id(request)
+        self._advance()
+        if user_id in self._tickets:
+            ticket, token, _ = self._tickets[user_id]
+            return self._ticket_schema(token, ticket)
+        if self.n_waiting >= self.max_queue_length:
+            self._shed("Waiting room is full.", self._seconds_until_served(self.n_waiting))
+        ticket = self.n_issued
+        self.n_issued += 1
+        claims = {"sub": user_id, "room": self.room_id, "ticket": ticket, "exp": int(time.time() + self.token_ttl)}
+        token = jwt.encode(claims, self.secret_key, algorithm="HS256")
+        self._tickets[user_id] = (ticket, token, self.clock() + self.token_ttl)
+        return self._ticket_schema(token, ticket)
+
+    async def get_position(self, request: Request) -> QueueTicketSchema:
+        """Get the position of the current request's queue token, 0 once admitted.
+
+        :param request: starlette request object, carrying the queue token in the x-queue-token header
+        :return: position and seconds until admission
+        """
+        user_id = await self.user_authorizer_jwt.get_current_user_id(request)
+        self._advance()
+        ticket = self._verify(request.headers.get(QUEUE_TOKEN_HEADER), user_id)
+        return self._ticket_schema(None, ticket)
+
+    @property
+    def n_waiting(self) -> int:
+        """Number of tickets issued and not admitted yet."""
+        return self.n_issued - self.now_serving
+
+    def stats(self) -> dict:
+        """Count the waiting users, and the requests admitted and shed."""
+        return {"waiting": self.n_waiting, "admitted": self.admitted, "shed": self.shed}
+
+    def _advance(self) -> None:
+        """Admit as many waiting tickets as the bucket allows, and forget the expired tickets."""
+        self.now_serving += self.bucket.take_up_to(self.n_waiting)
+        now = self.clock()
+        while self._tickets:
+            user_id = next(iter(self._tickets))
+            if self._tickets[user_id][2] > now:
+                break
+            del self._tickets[user_id]
+
+    def _position(self, ticket: int) -> int:
+        return max(ticket - self.now_serving + 1, 0)
+
+    def _seconds_until_served(self, position: int) -> int:
+        return max(math.ceil(self.bucket.seconds_until(position)), 1)
+
+    def _ticket_schema(self, token: Optional[str], ticket: int) -> QueueTicketSchema:
+        position = self._position(ticket)
+        retry_after = self._seconds_until_served(position) if position else 0
+        return QueueTicketSchema(token=token, position=position, retry_after=retry_after)
+
+    def _shed(self, detail: str, retry_after: int) -> None:
+        self.shed += 1
+        raise HTTPException(
+            status_code=HTTP_429_TOO_MANY_REQUESTS, detail=detail, headers={"Retry-After": str(retry_after)}
+        )
+
+    def _verify(self, token: Optional[str], user_id: str) -> int:
+        """Get the ticket number of the unused queue token issued to the user by this waiting room."""
+        if token is None:
+            raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Missing queue token")
+        try:
+            claims = jwt.decode(token, self.secret_key, algorithms=["HS256"], options={"require": ["exp"]})
+        except jwt.PyJWTError as exc_info:
+            raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail=f"Invalid queue token: {exc_info}")
+        if claims.get("room") != self.room_id or claims.get("sub") != user_id:
+            raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Invalid queue token")
+        unused_ticket = self._tickets.get(user_id)
+        if unused_ticket is None or unused_ticket[0] != claims["ticket"]:
+            raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Queue token used already or expired")
+        return claims["ticket"]
@@ -1,11 +1,13 @@
-from typing import Annotated
+from typing import Annotated, Optional
 
+import httpx
 from authlib.integrations.starlette_client import OAuth
 from fastapi import Depends, Request
 from fastapi.responses import RedirectResponse
 from fastapi.routing import APIRouter
 from sqlalchemy.orm import Session
 
+from in_concert.dependencies.auth.server_metadata import ServerMetadataClient
 from in_concert.dependencies.auth.token_validation import RequestLikeTokenDict
 from in_concert.dependencies.auth.user_authorization import UserOAuth2Integrator
 from in_concert.dependencies.db_session import DBSessionDependency
@@ -17,18 +19,28 @@ def create_router(
     oauth: OAuth,
     user_oauth_integrator: UserOAuth2Integrator,
     db_session_dep: DBSessionDependency,
+    http_transport: Optional[httpx.AsyncBaseTransport] = None,
+    server_metadata_client: Optional[ServerMetadataClient] = None,
 ) -> APIRouter:
+    """Create the login and callback routes of the oauth flow.
+
+    :param http_transport: transport of the http clients authlib opens per call, e.g. a pool shared by the app
+    :param server_metadata_client: client keeping the openid server metadata loaded, authlib loads it lazily if None
+    """
     router = APIRouter()
 
     # setup oauth
-    CONF_URL = f"https://{auth_settings.domain}/.well-known/openid-configuration"
+    CONF_URL = f"{auth_settings.base_url}/.well-known/openid-configuration"
     oauth.register(
         name="auth0",
-        server_metadata_url=CONF_URL,
+        server_metadata_url=server_metadata_client.metadata_url if server_metadata_client else CONF_URL,
         client_id=auth_settings.client_id,
         client_secret=auth_settings.client_secret,
+        client_kwargs={"transport": http_transport} if http_transport else None,
         audience=auth_settings.audience,
     )
+    if server_metadata_client is not None:
+        server_metadata_client.attach(oauth.auth0)
 
     @router.get("/login", response_class=RedirectResponse)
     async def login(request: Request) -> RedirectResponse:
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import Field, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -15,6 +15,7 @@ class Auth0Settings(BaseSettings):
     client_id: str = Field(alias="auth0_client_id")
     client_secret: str = Field(alias="auth0_client_secret")
     domain: str = Field(alias="auth0_domain")
+    scheme: str = Field(alias="auth0_scheme", default="https")
     app_secret_key: str = Field()
 
     audience: Optional[str] = Field(alias="auth0_audience", default="https://in-concert-api.com")
@@ -24,18 +25,69 @@ class Auth0Settings(BaseSettings):
 
     middleware_secret_key: str = Field(alias="secret_middleware")
     db_connection_string: SecretStr = Field()
+    db_async: bool = Field(default=False)
+    page_size: int = Field(default=20)
+    max_page_size: int = Field(default=100)
+    page_cache_size: int = Field(default=1_000)
+    page_cache_ttl: float = Field(default=60.0)
+    import_chunk_size: int = Field(default=500)
+    import_max_errors: int = Field(default=100)
+    import_max_line_length: int = Field(default=65_536)
+    export_partition_size: int = Field(default=1_000)
+    search_max_candidates: int = Field(default=2_000)
+    nearby_radius_km: float = Field(default=10.0)
+    nearby_max_radius_km: float = Field(default=200.0)
+    reservation_hold_seconds: float = Field(default=600.0)
+    max_seats_per_reservation: int = Field(default=10)
+    hold_expiry_batch_size: int = Field(default=500)
+    hold_expiry_resync_interval: float = Field(default=60.0)
+    hold_expiry_lag_warning_seconds: float = Field(default=30.0)
+    seat_map_cache_size: int = Field(default=1_000)
+    seat_map_reconcile_interval: float = Field(default=30.0)
+    waiting_room_secret_key: str = Field(alias="secret_waiting_room")
+    waiting_room_admission_rate: float = Field(default=50.0)
+    waiting_room_burst: int = Field(default=100)
+    waiting_room_max_queue_length: int = Field(default=100_000)
+    waiting_room_token_ttl: float = Field(default=3_600.0)
+    known_user_cache_size: int = Field(default=100_000)
+    known_user_cache_ttl: float = Field(default=86_400.0)
+    jwt_payload_cache_size: int = Field(default=10_000)
+    jwt_payload_cache_ttl: float = Field(default=86_400.0)
+    jwks_refresh_interval: float = Field(default=600.0)
+    server_metadata_refresh_interval: float = Field(default=3_600.0)
+    http_timeout: float = Field(default=10.0)
+    http_max_connections: int = Field(default=100)
+    http_max_keepalive_connections: int = Field(default=20)
 
     model_config = SettingsConfigDict(env_file=PROJECT_ROOT / ".env", extra="ignore")
 
+    @property
+    def base_url(self) -> str:
+        """Base url of the identity provider."""
+        return f"{self.scheme}://{self.domain}"
+
 
 class FGAAuthSettings(BaseSettings):
     fga_api_scheme: str = Field()
     fga_api_host: str = Field()
     fga_store_id: str = Field()
+    fga_api_credentials_method: str = Field(default="client_credentials")
     fga_api_token_issuer: str = Field()
     fga_api_audience: str = Field()
     fga_client_id: str = Field()
     fga_client_secret: str = Field()
+    fga_connection_pool_maxsize: int = Field(default=100)
+    fga_max_tuples_per_write: int = Field(default=10)
+    fga_check_cache_size: int = Field(default=10_000)
+    fga_check_cache_ttl: float = Field(default=10.0)
+    # fga checks tuples on the remote OpenFGA, local checks them in process, writing through to fga if synced
+    authorization_backend: Literal["fga", "local"] = Field(default="fga")
+    local_authorization_sync_to_fga: bool = Field(default=False)
+    # import the fga tuples once on startup with the local backend. If fga cannot be read, the error is logged, the
+    # app starts checking the tuples stored locally only and the import is retried on the next startup
+    local_authorization_import_from_fga: bool = Field(default=False)
+    # seconds a permission revoked by another process may still be granted by the local backend
+    local_authorization_reload_interval: float = Field(default=60.0)
 
 
 class AppSettings(Auth0Settings, FGAAuthSettings):
@@ -43,6 +95,9 @@ class AppSettings(Auth0Settings, FGAAuthSettings):
 
 
 class AppSettingsTest(AppSettings):
+    # tests run against local stand-ins of the identity provider and fga instead of the remote services
+    use_stand_ins: bool = Field(default=True)
+
     model_config = SettingsConfigDict(env_file=PROJECT_ROOT / ".env.test", extra="ignore")
 
 
@@ -0,0 +1,117 @@
+"""Load test of the venue detail route with many concurrent clients, per database mode.
+
+Modes:
+- blocking: sync session used inline in the async handlers, the previous behaviour
+- sync: sync session run in the threadpool
+- async: async session on aiosqlite
+
+SQLite answers in microseconds, so every statement is delayed by a configurable latency inside the driver, which
+models the network round trip to a database server.
+
+Usage: python -m tests.benchmarks.bench_async_db [n_clients] [n_requests_per_client] [db_latency_ms]
+"""
+import asyncio
+import contextlib
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+
+from in_concert.app import app_factory as app_factory_module
+from in_concert.app.app_factory import AppFactory
+from in_concert.app.models import Base, Venue
+from in_concert.settings import AppSettingsTest
+
+N_VENUES = 1_000
+
+
+class RemoteLatencyCursor(sqlite3.Cursor):
+    """Sleep in the driver on every statement, to model the round trip to a database server."""
+
+    latency: float = 0.0
+
+    def execute(self, *args, **kwargs):
+        time.sleep(self.latency)
+        return super().execute(*args, **kwargs)
+
+
+class RemoteLatencyConnection(sqlite3.Connection):
+    def cursor(self, factory=RemoteLatencyCursor):
+        return super().cursor(factory)
+
+
+async def run_inline(session, fn, *args, **kwargs):
+    return fn(session, *args, **kwargs)
+
+
+def seed_venues(db_path: Path) -> None:
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session, session.begin():
+        session.add_all(
+            Venue(name=f"venue {i}", street="street", city="city", state="state", zip_code=1, phone=1, manager_id="1")
+            for i in range(N_VENUES)
+        )
+    engine.dispose()
+
+
+async def run_clients(app, n_clients: int, n_requests_per_client: int) -> float:
+    async def client_session(client: httpx.AsyncClient, client_id: int) -> None:
+        for i in range(n_requests_per_client):
+            response = await client.get(f"/venues/{(client_id * n_requests_per_client + i) % N_VENUES + 1}")
+            assert response.status_code == 200
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(app=app, base_url="http://in-concert") as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(client_session(client, client_id) for client_id in range(n_clients)))
+            return n_clients * n_requests_per_client / (time.perf_counter() - start)
+
+
+async def main(n_clients: int, n_requests_per_client: int, db_latency: float) -> None:
+    RemoteLatencyCursor.latency = db_latency
+    app_settings = AppSettingsTest()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = Path(tmp_dir) / "bench.db"
+        seed_venues(db_path)
+        for mode in ("blocking", "sync", "async"):
+            # unbounded pool overflow, so that the pool is not the bottleneck of any mode
+            engine_kwargs = {"pool_size": 20, "max_overflow": -1, "connect_args": {"factory": RemoteLatencyConnection}}
+            if mode == "async":
+                engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", **engine_kwargs)
+            else:
+                engine = create_engine(f"sqlite:///{db_path}", **engine_kwargs)
+            app_factory = AppFactory()
+            app_factory.configure(app_settings)
+            # the identity provider is not needed to serve venues
+            app_factory.jwks_client.start = mock.AsyncMock()
+            app_factory.server_metadata_client.start = mock.AsyncMock()
+            if mode == "blocking":
+                db_mode_patch = mock.patch.object(app_factory_module, "run_in_session", run_inline)
+            else:
+                db_mode_patch = contextlib.nullcontext()
+            with db_mode_patch:
+                app = app_factory.create_app(app_settings, engine=engine)
+                throughput = await run_clients(app, n_clients, n_requests_per_client)
+            if mode == "async":
+                await engine.dispose()
+            else:
+                engine.dispose()
+            print(
+                f"GET /venues/{{id}} [{mode}] {n_clients} clients, {db_latency * 1000:.1f}ms db latency: "
+                f"{throughput:,.0f} requests/s"
+            )
+
+
+if __name__ == "__main__":
+    n_clients = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    n_requests_per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    db_latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 2.0
+    asyncio.run(main(n_clients, n_requests_per_client, db_latency_ms / 1000))
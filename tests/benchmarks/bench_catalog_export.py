@@ -0,0 +1,68 @@
+"""Peak memory and throughput of streaming GET /venues/export for growing catalogs.
+
+The app is served by uvicorn, the in-process httpx transport would buffer the whole response.
+
+Usage: python -m tests.benchmarks.bench_catalog_export [n_venues ...]
+"""
+import asyncio
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from unittest import mock
+
+import httpx
+import uvicorn
+from sqlalchemy import create_engine
+
+from in_concert.app.app_factory import AppFactory
+from in_concert.settings import AppSettingsTest
+from tests.benchmarks.bench_list_pagination import seed_venues
+
+APP_HOST = "127.0.0.1"
+APP_PORT = 8766
+
+
+async def export(app) -> tuple[int, float, int]:
+    n_lines = 0
+    server = uvicorn.Server(uvicorn.Config(app, host=APP_HOST, port=APP_PORT, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://{APP_HOST}:{APP_PORT}", timeout=None) as client:
+            tracemalloc.start()
+            start = time.perf_counter()
+            async with client.stream("GET", "/venues/export") as response:
+                async for chunk in response.aiter_bytes():
+                    n_lines += chunk.count(b"\n")
+            duration = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    finally:
+        server.should_exit = True
+        await server_task
+    return n_lines, duration, peak
+
+
+def main(catalog_sizes: list[int]) -> None:
+    app_settings = AppSettingsTest()
+    for n_venues in catalog_sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.db'}")
+            seed_venues(engine, n_venues)
+            app_factory = AppFactory()
+            app_factory.configure(app_settings)
+            # the identity provider is not needed to export venues
+            app_factory.jwks_client.start = mock.AsyncMock()
+            app_factory.server_metadata_client.start = mock.AsyncMock()
+            app = app_factory.create_app(app_settings, engine=engine)
+            n_lines, duration, peak = asyncio.run(export(app))
+            engine.dispose()
+        assert n_lines == n_venues
+        print(f"export of {n_venues:>9,} venues: {n_venues / duration:,.0f} rows/s, peak memory {peak / 2**20:.1f}MiB")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 300_000])
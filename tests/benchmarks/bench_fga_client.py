@@ -0,0 +1,110 @@
+"""Benchmark the latency of the fga protected venue deletion route against a local stub FGA server.
+
+Compares a shared, pooled fga client (current behaviour) with a fresh client per fga call (previous behaviour).
+The stub server delays each fga call by latency_ms to model the round trip to a remote FGA server.
+
+Usage: python -m tests.benchmarks.bench_fga_client [n_requests] [latency_ms]
+"""
+import asyncio
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from in_concert.app.app_factory import AppFactory
+from in_concert.app.models import Venue
+from in_concert.dependencies.auth.user_authorization import UserAuthorizerFGA
+from in_concert.settings import AppSettings, AppSettingsTest
+from tests.stubs.fga_server import create_fga_stub_app
+from tests.stubs.server import serve, stand_in_settings
+
+USER_ID = "auth0|bench"
+
+
+class PerCallClientUserAuthorizerFGA(UserAuthorizerFGA):
+    """Reproduce the previous behaviour of opening a new fga client for every fga call."""
+
+    async def _get_fga_client(self):
+        await self.close()
+        return await super()._get_fga_client()
+
+
+def percentile(latencies: list[float], q: int) -> float:
+    return statistics.quantiles(latencies, n=100)[q - 1]
+
+
+async def run_deletes(app_factory: AppFactory, app_settings: AppSettings, engine, n_requests: int) -> list[float]:
+    app = app_factory.create_app(app_settings, engine=engine)
+
+    async def get_current_user_id(request=None):
+        return USER_ID
+
+    async def is_authorized_current_user():
+        return True
+
+    user_authorizer = app_factory.user_oauth_integrator.user_authorizer
+    user_authorizer.get_current_user_id = get_current_user_id
+    app.dependency_overrides[user_authorizer.is_authorized_current_user] = is_authorized_current_user
+
+    with Session(engine) as session, session.begin():
+        venues = [
+            Venue(name="venue", street="street", city="city", state="state", zip_code=1, phone=1, manager_id=USER_ID)
+            for _ in range(n_requests)
+        ]
+        session.add_all(venues)
+        session.flush()
+        venue_ids = [venue.id for venue in venues]
+
+    latencies = []
+    async with app.router.lifespan_context(app):
+        user_authorizer_fga = app_factory.user_authorizer_fga
+        async with httpx.AsyncClient(app=app, base_url="http://in-concert") as client:
+            for venue_id in venue_ids:
+                await user_authorizer_fga.add_permissions({}, ["can_delete", "can_update"], "venue", venue_id)
+                start = asyncio.get_running_loop().time()
+                response = await client.delete(f"/venues/{venue_id}")
+                latencies.append(asyncio.get_running_loop().time() - start)
+                assert response.status_code == 200, response.text
+    return latencies
+
+
+def build_app_factory(app_settings: AppSettings, user_authorizer_fga_class: type[UserAuthorizerFGA]) -> AppFactory:
+    app_factory = AppFactory()
+    app_factory.configure(app_settings)
+    # the identity provider is not needed, the current user is overridden
+    app_factory.jwks_client.start = mock.AsyncMock()
+    app_factory.server_metadata_client.start = mock.AsyncMock()
+    fga_configuration = app_factory.user_authorizer_fga.fga_configuration
+    user_authorizer_fga = user_authorizer_fga_class(fga_configuration, app_factory.user_authorizer_jwt)
+    app_factory.user_authorizer_fga = user_authorizer_fga
+    app_factory.user_oauth_integrator.user_authorizer_fga = user_authorizer_fga
+    return app_factory
+
+
+async def main(n_requests: int, latency: float) -> None:
+    async with serve(create_fga_stub_app(latency=latency)) as fga_url:
+        app_settings = stand_in_settings(AppSettingsTest(), fga_url=fga_url)
+        for label, user_authorizer_fga_class in (
+            ("client per call", PerCallClientUserAuthorizerFGA),
+            ("shared client", UserAuthorizerFGA),
+        ):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.db'}")
+                app_factory = build_app_factory(app_settings, user_authorizer_fga_class)
+                latencies = await run_deletes(app_factory, app_settings, engine, n_requests)
+                engine.dispose()
+            print(
+                f"DELETE /venues/{{id}} [{label}]: "
+                f"p50={percentile(latencies, 50) * 1000:.2f}ms p99={percentile(latencies, 99) * 1000:.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    n_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    asyncio.run(main(n_requests, latency_ms / 1000))
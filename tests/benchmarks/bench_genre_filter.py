@@ -0,0 +1,95 @@
+"""Genre filtering on the free-text genres column with LIKE vs indexed joins over the normalized genre tags.
+
+Every venue has a common genre, shared by 1 in 20 venues, and a rare genre, shared by 1 in 2,000 venues.
+
+Usage: python -m tests.benchmarks.bench_genre_filter [n_venues] [n_repeats]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import Session
+
+from in_concert.app.models import (
+    Base,
+    Genre,
+    Venue,
+    VenueListItem,
+    bulk_insert,
+    get_page,
+    venue_genres,
+)
+
+PAGE_SIZE = 20
+N_COMMON_GENRES = 20
+N_RARE_GENRES = 2_000
+
+
+def seed_venues(engine, n_venues: int, batch_size: int = 10_000) -> None:
+    Base.metadata.create_all(engine)
+    with Session(engine) as session, session.begin():
+        for start in range(0, n_venues, batch_size):
+            rows = [
+                dict(
+                    name=f"venue {i}",
+                    street="street",
+                    city="city",
+                    state="state",
+                    zip_code=1,
+                    phone=1,
+                    genres=f"common{i % N_COMMON_GENRES:02d}, rare{i % N_RARE_GENRES:04d}",
+                    manager_id="1",
+                )
+                for i in range(start, min(start + batch_size, n_venues))
+            ]
+            bulk_insert(session, Venue, rows)
+        session.execute(text("ANALYZE"))
+
+
+def like_page(session: Session, genre: str) -> list:
+    columns = (getattr(Venue, name) for name in VenueListItem.__dataclass_fields__)
+    query = select(*columns).where(Venue.genres.like(f"%{genre}%")).order_by(Venue.id).limit(PAGE_SIZE + 1)
+    return session.execute(query).all()
+
+
+def like_count(session: Session, genre: str) -> int:
+    return session.scalar(select(func.count()).select_from(Venue).where(Venue.genres.like(f"%{genre}%")))
+
+
+def tag_count(session: Session, genre: str) -> int:
+    query = select(func.count()).select_from(venue_genres).join(Genre).where(Genre.name == genre)
+    return session.scalar(query)
+
+
+def mean_latency(fn, n_repeats: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(n_repeats):
+        fn()
+    return (time.perf_counter() - start) / n_repeats
+
+
+def main(n_venues: int, n_repeats: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.db'}")
+        seed_venues(engine, n_venues)
+        with Session(engine) as session:
+            for genre in ("common07", "rare0777"):
+                assert like_count(session, genre) == tag_count(session, genre)
+                cases = {
+                    "first page, LIKE": lambda: like_page(session, genre),
+                    "first page, genre tags": lambda: get_page(session, Venue, None, PAGE_SIZE, VenueListItem, genre),
+                    "count, LIKE": lambda: like_count(session, genre),
+                    "count, genre tags": lambda: tag_count(session, genre),
+                }
+                for label, fn in cases.items():
+                    print(f"{genre} {label}: {mean_latency(fn, n_repeats) * 1000:.2f}ms")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    n_venues = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    n_repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    main(n_venues, n_repeats)
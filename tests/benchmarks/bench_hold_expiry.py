@@ -0,0 +1,93 @@
+"""Lag between the expiry of seat holds and the release of their seats, under a burst of expiring holds.
+
+The holds expire spread over a few seconds, next to many reservations confirmed or released long ago, which the
+scheduler must not scan. Also reports the time to rebuild the heap from the database, as on a restart.
+
+Usage: python -m tests.benchmarks.bench_hold_expiry [n_holds] [n_past_reservations] [window_seconds]
+"""
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from in_concert.app.hold_expiry import HoldExpiryScheduler
+from in_concert.app.models import Base, Event, Reservation, Seat, bulk_insert, utcnow
+
+
+def seed_reservations(engine, n_holds: int, n_past_reservations: int, window_seconds: float) -> None:
+    rng = random.Random(0)
+    Base.metadata.create_all(engine)
+    past = utcnow() - timedelta(days=1)
+    with Session(engine) as session, session.begin():
+        event = Event(name="event", starts_at=datetime(2030, 1, 1), venue_id=1, band_id=1, manager_id="1")
+        event_id = event.insert(session)
+        bulk_insert(
+            session,
+            Reservation,
+            [
+                dict(
+                    event_id=event_id,
+                    user_id="1",
+                    status=rng.choice(("confirmed", "released")),
+                    n_seats=1,
+                    created_at=past,
+                    expires_at=past,
+                )
+                for _ in range(n_past_reservations)
+            ],
+        )
+        # the holds expire once seeding and the rebuild on start are done
+        now = utcnow()
+        expiries = [now + timedelta(seconds=rng.uniform(3, 3 + window_seconds)) for _ in range(n_holds)]
+        reservation_ids = bulk_insert(
+            session,
+            Reservation,
+            [
+                dict(event_id=event_id, user_id="1", status="held", n_seats=1, created_at=now, expires_at=expires_at)
+                for expires_at in expiries
+            ],
+        )
+        bulk_insert(
+            session,
+            Seat,
+            [
+                dict(event_id=event_id, label=str(i), reservation_id=reservation_id, held_until=expires_at)
+                for i, (reservation_id, expires_at) in enumerate(zip(reservation_ids, expiries))
+            ],
+        )
+
+
+async def run(engine, window_seconds: float) -> HoldExpiryScheduler:
+    scheduler = HoldExpiryScheduler(sessionmaker(bind=engine))
+    start = time.perf_counter()
+    await scheduler.start()
+    print(f"rebuild on start: {(time.perf_counter() - start) * 1000:.1f} ms, {scheduler.stats()['pending']:,} holds")
+    await asyncio.sleep(window_seconds + 4)
+    await scheduler.stop()
+    return scheduler
+
+
+def main(n_holds: int = 20_000, n_past_reservations: int = 500_000, window_seconds: float = 5.0) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.db'}")
+        seed_reservations(engine, n_holds, n_past_reservations, window_seconds)
+        scheduler = asyncio.run(run(engine, window_seconds))
+        with Session(engine) as session:
+            n_held_seats = session.scalar(select(func.count()).where(Seat.reservation_id.is_not(None)))
+        stats = scheduler.stats()
+        print(
+            f"{n_holds:,} holds expiring over {window_seconds:.0f} s among {n_past_reservations:,} past reservations: "
+            f"{stats['released']:,} released in {stats['batches']:,} batches, mean lag "
+            f"{stats['mean_lag_seconds'] * 1000:.1f} ms, max lag {stats['max_lag_seconds'] * 1000:.1f} ms, "
+            f"{n_held_seats:,} seats still held"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]), *(float(arg) for arg in sys.argv[3:4]))
@@ -0,0 +1,85 @@
+"""Latency of GET /list_venues pages at increasing depth of a catalog of 100k venues.
+
+Keyset pages seek past the cursor on the primary key, so their latency should not depend on the depth. An offset
+query at the same depth is timed for comparison, it scans all skipped rows.
+
+Usage: python -m tests.benchmarks.bench_list_pagination [n_venues] [n_requests_per_page]
+"""
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+import httpx
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from in_concert.app.app_factory import AppFactory
+from in_concert.app.models import Base, Venue
+from in_concert.settings import AppSettingsTest
+
+PAGE_SIZE = 20
+
+
+def seed_venues(engine, n_venues: int) -> None:
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Venue),
+            [
+                dict(
+                    name=f"venue {i}", street="street", city="city", state="state", zip_code=1, phone=1, manager_id="1"
+                )
+                for i in range(n_venues)
+            ],
+        )
+
+
+async def page_latency(client: httpx.AsyncClient, url: str, headers: dict, n_requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n_requests):
+        response = await client.get(url, headers=headers)
+        assert response.status_code == 200
+    return (time.perf_counter() - start) / n_requests
+
+
+def offset_latency(engine, offset: int, n_requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n_requests):
+        with Session(engine) as session:
+            session.scalars(select(Venue).order_by(Venue.id).offset(offset).limit(PAGE_SIZE + 1)).all()
+    return (time.perf_counter() - start) / n_requests
+
+
+async def main(n_venues: int, n_requests_per_page: int) -> None:
+    app_settings = AppSettingsTest()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.db'}")
+        seed_venues(engine, n_venues)
+        app_factory = AppFactory()
+        app_factory.configure(app_settings)
+        # the identity provider is not needed to list venues
+        app_factory.jwks_client.start = mock.AsyncMock()
+        app_factory.server_metadata_client.start = mock.AsyncMock()
+        app = app_factory.create_app(app_settings, engine=engine)
+
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(app=app, base_url="http://in-concert") as client:
+                for depth in (0, n_venues // 4, n_venues // 2, n_venues - PAGE_SIZE):
+                    url = f"/list_venues?limit={PAGE_SIZE}" + (f"&after={depth}" if depth else "")
+                    html = await page_latency(client, url, {}, n_requests_per_page)
+                    json = await page_latency(client, url, {"accept": "application/json"}, n_requests_per_page)
+                    offset = offset_latency(engine, depth, n_requests_per_page)
+                    print(
+                        f"page at row {depth:>7,}: keyset html {html * 1000:6.2f}ms, keyset json {json * 1000:6.2f}ms, "
+                        f"offset query only {offset * 1000:6.2f}ms"
+                    )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    n_venues = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    n_requests_per_page = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    asyncio.run(main(n_venues, n_requests_per_page))
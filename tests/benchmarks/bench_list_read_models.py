@@ -0,0 +1,90 @@
+"""Memory and latency of loading and rendering 10k venues as orm objects vs as column-projected read models.
+
+Usage: python -m tests.benchmarks.bench_list_read_models [n_venues] [n_repeats]
+"""
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Optional
+
+from fastapi import Request
+from fastapi.templating import Jinja2Templates
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from definitions import PROJECT_ROOT
+from in_concert.app.app_factory import AppFactory
+from in_concert.app.models import Venue, VenueListItem, get_page
+from in_concert.settings import AppSettingsTest
+from tests.benchmarks.bench_list_pagination import seed_venues
+
+
+def create_template_request(engine) -> Request:
+    """Create a request whose url_for resolves the routes of the app, as needed by the template."""
+    app_settings = AppSettingsTest()
+    app_factory = AppFactory()
+    app_factory.configure(app_settings)
+    app = app_factory.create_app(app_settings, engine=engine)
+    scope = {
+        "type": "http",
+        "app": app,
+        "router": app.router,
+        "scheme": "http",
+        "server": ("in-concert", 80),
+        "root_path": "",
+        "path": "/list_venues",
+        "headers": [],
+    }
+    return Request(scope)
+
+
+def load(engine, n_venues: int, read_model: Optional[type]) -> int:
+    with Session(engine) as session:
+        venues, _ = get_page(session, Venue, None, n_venues, read_model)
+    return len(venues)
+
+
+def load_and_render(engine, templates, request, n_venues: int, read_model: Optional[type]) -> int:
+    with Session(engine) as session:
+        venues, _ = get_page(session, Venue, None, n_venues, read_model)
+        html = templates.get_template("venues.html").render(venues=venues, next_url=None, request=request)
+    return len(html)
+
+
+def mean_latency(fn, n_repeats: int, *args) -> float:
+    fn(*args)
+    start = time.perf_counter()
+    for _ in range(n_repeats):
+        fn(*args)
+    return (time.perf_counter() - start) / n_repeats
+
+
+def main(n_venues: int, n_repeats: int) -> None:
+    templates = Jinja2Templates(directory=PROJECT_ROOT / "in_concert/app/templates")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.db'}")
+        seed_venues(engine, n_venues)
+        request = create_template_request(engine)
+        for label, read_model in (("orm objects", None), ("read models", VenueListItem)):
+            load_latency = mean_latency(load, n_repeats, engine, n_venues, read_model)
+            render_latency = mean_latency(load_and_render, n_repeats, engine, templates, request, n_venues, read_model)
+
+            tracemalloc.start()
+            with Session(engine) as session:
+                venues, _ = get_page(session, Venue, None, n_venues, read_model)
+                loaded, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"{n_venues:,} venues as {label}: load {load_latency * 1000:.1f}ms, "
+                f"load and render {render_latency * 1000:.1f}ms, "
+                f"memory held by the loaded page {loaded / 2**20:.1f}MiB"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    n_venues = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    n_repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    main(n_venues, n_repeats)
@@ -0,0 +1,79 @@
+"""Benchmark the latency of authorization checks against the local authorizer and a local stub FGA server.
+
+Compares checks in process against the permission_tuples index (local backend) with checks sent to OpenFGA (fga
+backend). The stub server delays each fga call by latency_ms to model the round trip to a remote FGA server. The
+check cache is disabled for both, so that every check is resolved by the backend.
+
+Usage: python -m tests.benchmarks.bench_local_authorizer [n_checks] [latency_ms]
+"""
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from in_concert.app.app_factory import AppFactory
+from in_concert.app.local_authorization import UserAuthorizerLocal
+from in_concert.app.models import Base
+from in_concert.dependencies.auth.user_authorization import (
+    RelationshipAuthorizer,
+    UserAuthorizerFGA,
+)
+from in_concert.settings import AppSettingsTest
+from tests.stubs.fga_server import create_fga_stub_app
+from tests.stubs.server import serve, stand_in_settings
+
+USER = "user:auth0|bench"
+
+
+def percentile(latencies: list[float], q: int) -> float:
+    return statistics.quantiles(latencies, n=100)[q - 1]
+
+
+async def run_checks(user_authorizer: RelationshipAuthorizer, n_checks: int) -> list[float]:
+    permission_tuples = [(USER, "can_delete", f"venue:{i}") for i in range(n_checks)]
+    await user_authorizer.add_permission_tuples(permission_tuples)
+    latencies = []
+    for user, relation, object_ in permission_tuples:
+        start = time.perf_counter()
+        allowed = await user_authorizer._check(user, relation, object_)
+        latencies.append(time.perf_counter() - start)
+        assert allowed
+    return latencies
+
+
+async def main(n_checks: int, latency: float) -> None:
+    async with serve(create_fga_stub_app(latency=latency)) as fga_url:
+        app_settings = stand_in_settings(AppSettingsTest(), fga_url=fga_url)
+        app_factory = AppFactory()
+        app_factory.configure(app_settings)
+        fga_configuration = app_factory.user_authorizer_fga.fga_configuration
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.db'}")
+            Base.metadata.create_all(engine)
+            session_factory = sessionmaker(engine)
+            for label, user_authorizer in (
+                ("fga", UserAuthorizerFGA(fga_configuration, mock.AsyncMock())),
+                ("local", UserAuthorizerLocal(session_factory, mock.AsyncMock())),
+            ):
+                await user_authorizer.open()
+                try:
+                    latencies = await run_checks(user_authorizer, n_checks)
+                finally:
+                    await user_authorizer.close()
+                print(
+                    f"check [{label}]: p50={percentile(latencies, 50) * 1e6:.1f}us "
+                    f"p99={percentile(latencies, 99) * 1e6:.1f}us"
+                )
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    n_checks = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    asyncio.run(main(n_checks, latency_ms / 1000))
@@ -0,0 +1,89 @@
+"""Query plans and latency of manager and city lookups on 1M venues, without and with the lookup indexes.
+
+Genre lookups go through the genre tags, see bench_genre_filter.
+
+Usage: python -m tests.benchmarks.bench_lookup_indexes [n_venues] [n_repeats]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert, select, text
+
+from in_concert.app.models import Base, Venue
+
+N_MANAGERS = 10_000
+N_CITIES = 1_000
+GENRES = [f"genre {i}" for i in range(50)]
+PAGE_SIZE = 20
+
+QUERIES = {
+    "first page of a manager's venues": select(Venue.id, Venue.name)
+    .where(Venue.manager_id == "auth0|4242")
+    .order_by(Venue.id)
+    .limit(PAGE_SIZE),
+    "first page of venues in a city": select(Venue.id, Venue.name)
+    .where(Venue.city == "city 421")
+    .order_by(Venue.id)
+    .limit(PAGE_SIZE),
+}
+
+
+def seed_venues(engine, n_venues: int, batch_size: int = 50_000) -> None:
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        for start in range(0, n_venues, batch_size):
+            connection.execute(
+                insert(Venue),
+                [
+                    dict(
+                        name=f"venue {i}",
+                        street="street",
+                        city=f"city {i % N_CITIES}",
+                        state="state",
+                        zip_code=1,
+                        phone=1,
+                        genres=GENRES[i % len(GENRES)],
+                        manager_id=f"auth0|{i % N_MANAGERS}",
+                    )
+                    for i in range(start, min(start + batch_size, n_venues))
+                ],
+            )
+
+
+def measure(engine, label: str, n_repeats: int) -> None:
+    with engine.connect() as connection:
+        for name, query in QUERIES.items():
+            compiled = query.compile(engine, compile_kwargs={"literal_binds": True})
+            plan = connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+            connection.execute(query).all()
+            start = time.perf_counter()
+            for _ in range(n_repeats):
+                connection.execute(query).all()
+            latency = (time.perf_counter() - start) / n_repeats
+            print(f"[{label}] {name}: {latency * 1000:.2f}ms, plan: {' / '.join(row.detail for row in plan)}")
+
+
+def main(n_venues: int, n_repeats: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.db'}")
+        seed_venues(engine, n_venues)
+        lookup_indexes = [index for index in Venue.__table__.indexes if index.name != "ix_venues_updated_at"]
+        with engine.begin() as connection:
+            for index in lookup_indexes:
+                index.drop(connection)
+            connection.execute(text("ANALYZE"))
+        measure(engine, "without indexes", n_repeats)
+        with engine.begin() as connection:
+            for index in lookup_indexes:
+                index.create(connection)
+            connection.execute(text("ANALYZE"))
+        measure(engine, "with indexes", n_repeats)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    n_venues = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    n_repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    main(n_venues, n_repeats)
@@ -0,0 +1,95 @@
+"""Proximity search latency on a large venue catalog, grid cell index vs a bounding box scan.
+
+The venues are spread uniformly over an area the size of Germany. Also reports the throughput of the distance ranking
+on its own.
+
+Usage: python -m tests.benchmarks.bench_nearby_venues [n_venues] [n_repeats]
+"""
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from in_concert.app.geo import bounding_box, get_nearby, haversine_terms
+from in_concert.app.models import Base, Venue, VenueListItem, bulk_insert
+
+PAGE_SIZE = 20
+MIN_LATITUDE, MAX_LATITUDE = 47.0, 55.0
+MIN_LONGITUDE, MAX_LONGITUDE = 6.0, 15.0
+
+
+def seed_venues(engine, n_venues: int, batch_size: int = 10_000) -> None:
+    rng = random.Random(0)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session, session.begin():
+        for start in range(0, n_venues, batch_size):
+            rows = [
+                dict(
+                    name=f"venue {i}",
+                    street="street",
+                    city="city",
+                    state="state",
+                    zip_code=1,
+                    phone=1,
+                    manager_id="1",
+                    latitude=rng.uniform(MIN_LATITUDE, MAX_LATITUDE),
+                    longitude=rng.uniform(MIN_LONGITUDE, MAX_LONGITUDE),
+                )
+                for i in range(start, min(start + batch_size, n_venues))
+            ]
+            bulk_insert(session, Venue, rows)
+
+
+def scan_nearby(session: Session, latitude: float, longitude: float, radius_km: float) -> list:
+    """Rank the venues of the bounding box found without the cell index."""
+    min_latitude, max_latitude, ((min_longitude, max_longitude),) = bounding_box(latitude, longitude, radius_km)
+    candidates = session.execute(
+        select(Venue.id, Venue.latitude, Venue.longitude).where(
+            Venue.latitude.between(min_latitude, max_latitude), Venue.longitude.between(min_longitude, max_longitude)
+        )
+    ).all()
+    ids, latitudes, longitudes = zip(*candidates)
+    return sorted(zip(haversine_terms(latitude, longitude, latitudes, longitudes), ids))[:PAGE_SIZE]
+
+
+def mean_latency(fn, n_repeats: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(n_repeats):
+        fn()
+    return (time.perf_counter() - start) / n_repeats
+
+
+def main(n_venues: int, n_repeats: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.db'}")
+        seed_venues(engine, n_venues)
+        location = (51.0, 10.5)
+        with Session(engine) as session:
+            for radius_km in (5, 20, 50):
+                n_candidates = len(get_nearby(session, Venue, *location, radius_km, n_venues, VenueListItem))
+                latency = mean_latency(
+                    lambda: get_nearby(session, Venue, *location, radius_km, PAGE_SIZE, VenueListItem), n_repeats
+                )
+                scan_latency = mean_latency(lambda: scan_nearby(session, *location, radius_km), max(n_repeats // 5, 1))
+                print(
+                    f"radius {radius_km}km ({n_candidates:,} venues within): cell index {latency * 1000:.1f}ms, "
+                    f"bounding box scan {scan_latency * 1000:.1f}ms"
+                )
+
+        rng = random.Random(1)
+        latitudes = [rng.uniform(MIN_LATITUDE, MAX_LATITUDE) for _ in range(100_000)]
+        longitudes = [rng.uniform(MIN_LONGITUDE, MAX_LONGITUDE) for _ in range(100_000)]
+        ranking_latency = mean_latency(lambda: haversine_terms(*location, latitudes, longitudes), n_repeats)
+        print(f"distance ranking: {len(latitudes) / ranking_latency / 1e6:.1f}M candidates/s")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    n_venues = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    n_repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    main(n_venues, n_repeats)
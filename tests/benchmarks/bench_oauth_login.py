@@ -0,0 +1,84 @@
+"""Latency of /login and /callback against a local stub identity provider.
+
+Compares the shared connection pool with the openid server metadata loaded on startup (current behaviour) with a
+fresh http client per token exchange and the metadata loaded by the first login (previous behaviour). The first login
+is reported separately, as it pays for loading the metadata in the previous behaviour. The stub signs the tokens,
+which the app verifies with the keys the stub publishes, and delays each request by latency_ms to model the round
+trip to a remote identity provider.
+
+Usage: python -m tests.benchmarks.bench_oauth_login [n_logins] [latency_ms]
+"""
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+from sqlalchemy import create_engine
+
+from in_concert.app.app_factory import AppFactory
+from in_concert.settings import AppSettings, AppSettingsTest
+from tests.setup import LocalTokenIssuer
+from tests.stubs.oidc_server import create_oidc_stub_app
+from tests.stubs.server import serve, stand_in_settings
+
+# the stub needs its url before it is served, to list its endpoints in the openid configuration
+IDP_STUB_HOST = "127.0.0.1"
+IDP_STUB_PORT = 8766
+IDP_STUB_URL = f"http://{IDP_STUB_HOST}:{IDP_STUB_PORT}"
+
+
+def percentile(latencies: list[float], q: int) -> float:
+    return statistics.quantiles(latencies, n=100)[q - 1]
+
+
+async def run_logins(app_settings: AppSettings, shared_pool: bool, n_logins: int) -> tuple[list[float], list[float]]:
+    app_factory = AppFactory()
+    app_factory.configure(app_settings)
+    if not shared_pool:
+        app_factory.server_metadata_client.start = mock.AsyncMock()
+    login_latencies, callback_latencies = [], []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.db'}")
+        app = app_factory.create_app(app_settings, engine=engine)
+        if not shared_pool:
+            app.oauth.auth0.client_kwargs = {}
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(app=app, base_url="http://in-concert") as client:
+                for i in range(n_logins):
+                    start = time.perf_counter()
+                    response = await client.get("/login")
+                    login_latencies.append(time.perf_counter() - start)
+                    assert response.status_code == 302, response.text
+                    state = parse_qs(urlparse(response.headers["location"]).query)["state"][0]
+
+                    start = time.perf_counter()
+                    response = await client.get("/callback", params={"code": f"code {i}", "state": state})
+                    callback_latencies.append(time.perf_counter() - start)
+                    assert response.status_code == 307, response.text
+        engine.dispose()
+    return login_latencies, callback_latencies
+
+
+async def main(n_logins: int, latency: float) -> None:
+    app_settings = stand_in_settings(AppSettingsTest(), idp_url=IDP_STUB_URL)
+    oidc_stub_app = create_oidc_stub_app(IDP_STUB_URL, token_issuer=LocalTokenIssuer(app_settings), latency=latency)
+    async with serve(oidc_stub_app, host=IDP_STUB_HOST, port=IDP_STUB_PORT):
+        for label, shared_pool in (("client per call, lazy metadata", False), ("shared pool, preloaded", True)):
+            login_latencies, callback_latencies = await run_logins(app_settings, shared_pool, n_logins)
+            print(f"[{label}]")
+            for route, latencies in (("/login", login_latencies), ("/callback", callback_latencies)):
+                print(
+                    f"  GET {route}: first={latencies[0] * 1000:.2f}ms "
+                    f"p50={percentile(latencies[1:], 50) * 1000:.2f}ms p99={percentile(latencies[1:], 99) * 1000:.2f}ms"
+                )
+
+
+if __name__ == "__main__":
+    n_logins = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    asyncio.run(main(n_logins, latency_ms / 1000))
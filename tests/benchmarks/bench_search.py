@@ -0,0 +1,112 @@
+"""Full-text search latency on a large venue catalog, fts5 ranked search vs a LIKE scan.
+
+Names, cities and descriptions are drawn from a synthetic vocabulary, cities with a zipf distribution, so that queries
+range from terms matching a handful of venues to terms matching a tenth of the catalog.
+
+Usage: python -m tests.benchmarks.bench_search [n_venues] [n_repeats]
+"""
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, or_, select, text
+from sqlalchemy.orm import Session
+
+from in_concert.app.models import Base, Venue, VenueListItem, bulk_insert
+from in_concert.app.search import search
+
+PAGE_SIZE = 20
+# default of the search_max_candidates setting
+MAX_CANDIDATES = 2_000
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ber", "lin", "jaz", "zel", "dor", "han", "mos", "qui"]
+
+
+def make_vocabulary(rng: random.Random, n_words: int) -> list[str]:
+    words: dict[str, None] = {}
+    while len(words) < n_words:
+        words["".join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))] = None
+    return list(words)
+
+
+def seed_venues(engine, n_venues: int, batch_size: int = 10_000) -> list[str]:
+    """Seed the venues, the cities are returned most frequent first."""
+    rng = random.Random(0)
+    words = make_vocabulary(rng, 5_000)
+    cities = words[:1_000]
+    city_weights = [1 / rank for rank in range(1, len(cities) + 1)]
+    Base.metadata.create_all(engine)
+    with Session(engine) as session, session.begin():
+        for start in range(0, n_venues, batch_size):
+            batch_cities = rng.choices(cities, weights=city_weights, k=min(batch_size, n_venues - start))
+            rows = [
+                dict(
+                    name=" ".join(rng.choices(words, k=2)),
+                    city=city,
+                    about=" ".join(rng.choices(words, k=8)),
+                    street="street",
+                    state="state",
+                    zip_code=1,
+                    phone=1,
+                    manager_id="1",
+                )
+                for city in batch_cities
+            ]
+            bulk_insert(session, Venue, rows)
+    return cities
+
+
+def like_search(session: Session, term: str) -> list:
+    condition = or_(*(column.contains(term) for column in (Venue.name, Venue.city, Venue.about)))
+    query = select(Venue.id, Venue.name).where(condition).order_by(Venue.id).limit(PAGE_SIZE + 1)
+    return session.execute(query).all()
+
+
+def mean_latency(fn, n_repeats: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(n_repeats):
+        fn()
+    return (time.perf_counter() - start) / n_repeats
+
+
+def main(n_venues: int, n_repeats: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.db'}")
+        start = time.perf_counter()
+        cities = seed_venues(engine, n_venues)
+        print(f"seeded {n_venues:,} venues in {time.perf_counter() - start:.1f}s")
+        queries = {
+            "most frequent city": cities[0],
+            "10th city": cities[9],
+            "rare city": cities[-1],
+            "two terms": f"{cities[0]} {cities[-1]}",
+            "two letter prefix": cities[0][:2],
+        }
+        with Session(engine) as session:
+            for label, query in queries.items():
+                match_query = " ".join(f'"{term}"' for term in query.split()) + "*"
+                n_matches = session.scalar(
+                    text("SELECT count(*) FROM venues_fts WHERE venues_fts MATCH :query"), {"query": match_query}
+                )
+                latency = mean_latency(
+                    lambda: search(session, Venue, query, 0, PAGE_SIZE, VenueListItem, MAX_CANDIDATES), n_repeats
+                )
+                deep_latency = mean_latency(
+                    lambda: search(session, Venue, query, 200, PAGE_SIZE, VenueListItem, MAX_CANDIDATES), n_repeats
+                )
+                print(
+                    f"{label} ({query!r}, {n_matches:,} matches): first page {latency * 1000:.1f}ms, "
+                    f"page 11 {deep_latency * 1000:.1f}ms"
+                )
+            # a LIKE scan stops early on frequent terms, a term without matches scans the whole table
+            like_latency = mean_latency(lambda: like_search(session, "nomatch"), max(n_repeats // 10, 1))
+            print(f"no match, LIKE scan: {like_latency * 1000:.1f}ms")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    n_venues = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    n_repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    main(n_venues, n_repeats)
@@ -0,0 +1,115 @@
+"""Seat map reads per second for a 50k seat arena, from the in-memory bitmaps vs recomputed with sql per read.
+
+A share of the seats is held, and a hold is applied to the cached map every few reads so that the serialized body is
+rebuilt as under a live on-sale. Reports the throughput through the http endpoint and of the cache on its own, and
+the memory a cached map takes.
+
+Usage: python -m tests.benchmarks.bench_seat_map [n_seats] [n_reads]
+"""
+import asyncio
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+import httpx
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from in_concert.app.app_factory import AppFactory
+from in_concert.app.models import Event, Seat
+from in_concert.app.reservations import create_event, get_seat_availability
+from in_concert.app.seat_map import SeatMap, SeatMapCache
+from in_concert.settings import AppSettingsTest
+
+# share of the seats held before the reads, and reads between two holds applied to the map
+HELD_SHARE = 0.3
+READS_PER_WRITE = 10
+
+
+def seed_arena(engine, n_seats: int) -> int:
+    rng = random.Random(0)
+    with Session(engine) as session, session.begin():
+        event = Event(name="arena", starts_at=datetime(2030, 1, 1), venue_id=1, band_id=1, manager_id="1")
+        event_id = create_event(session, event, [str(i) for i in range(n_seats)])
+        held = rng.sample(range(1, n_seats + 1), k=int(n_seats * HELD_SHARE))
+        session.execute(update(Seat).where(Seat.id.in_(held)).values(reservation_id=1))
+    return event_id
+
+
+def measure(label: str, read, n_reads: int) -> None:
+    read(0)
+    start = time.perf_counter()
+    for i in range(n_reads):
+        body = read(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label}: {n_reads / elapsed:,.0f} reads/s, {elapsed / n_reads * 1000:.2f} ms per read, {len(body):,} bytes")
+
+
+async def measure_async(label: str, read, n_reads: int) -> None:
+    await read(0)
+    start = time.perf_counter()
+    for i in range(n_reads):
+        body = await read(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label}: {n_reads / elapsed:,.0f} reads/s, {elapsed / n_reads * 1000:.2f} ms per read, {len(body):,} bytes")
+
+
+def measure_memory(event_id: int, seats: list[tuple[int, bool]]) -> None:
+    tracemalloc.start()
+    seat_map = SeatMap(event_id, seats)
+    seat_map.to_json()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"memory per map: {size:,} bytes, {len(seat_map.bitmap):,} of them bitmap, the serialized body included")
+
+
+async def main(n_seats: int, n_reads: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.db'}")
+        app_settings = AppSettingsTest()
+        app_factory = AppFactory()
+        app_factory.configure(app_settings)
+        app_factory.jwks_client.start = mock.AsyncMock()
+        app_factory.server_metadata_client.start = mock.AsyncMock()
+        app = app_factory.create_app(app_settings, engine=engine, override_security_dependencies=True)
+        event_id = seed_arena(engine, n_seats)
+        rng = random.Random(1)
+
+        def read_sql(i: int) -> bytes:
+            with Session(engine) as session:
+                return SeatMap(event_id, get_seat_availability(session, event_id)).to_json()
+
+        measure(f"sql per read, {n_seats:,} seats", read_sql, max(n_reads // 100, 10))
+        with Session(engine) as session:
+            measure_memory(event_id, get_seat_availability(session, event_id))
+
+        seat_maps = SeatMapCache(sessionmaker(bind=engine))
+
+        async def read_cache(i: int) -> bytes:
+            if i % READS_PER_WRITE == 0:
+                seat_maps.set_available(event_id, [rng.randint(1, n_seats)], bool(i % 2))
+            return (await seat_maps.get(event_id)).to_json()
+
+        await measure_async(f"bitmap cache, a write every {READS_PER_WRITE} reads", read_cache, n_reads)
+
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(app=app, base_url="http://in-concert") as client:
+
+                async def read_http(i: int) -> bytes:
+                    if i % READS_PER_WRITE == 0:
+                        app_factory.seat_maps.set_available(event_id, [rng.randint(1, n_seats)], bool(i % 2))
+                    return (await client.get(f"/events/{event_id}/seat-map")).content
+
+                await measure_async("http endpoint on the bitmap cache", read_http, n_reads // 10)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    n_seats = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    n_reads = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    asyncio.run(main(n_seats, n_reads))
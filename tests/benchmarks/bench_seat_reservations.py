@@ -0,0 +1,121 @@
+"""Stress test of seat reservations: thousands of buyers racing for the seats of one event on sale.
+
+Most buyers want specific seats of the front rows, the others ask for the best available seats. Checks that no seat
+is sold twice and that the seats in the database match the successful reservations, and reports the throughput.
+
+Usage: python -m tests.benchmarks.bench_seat_reservations [n_buyers] [n_concurrent] [n_seats]
+"""
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from unittest import mock
+
+import httpx
+from fastapi import Request
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+
+from in_concert.app.app_factory import AppFactory
+from in_concert.app.models import Reservation, Seat
+from in_concert.settings import AppSettingsTest
+
+SEATS_PER_ROW = 50
+# share of buyers asking for specific seats of the front rows
+SPECIFIC_SEATS_SHARE = 0.7
+N_FRONT_SEATS = 100
+
+
+async def run_buyers(app, n_buyers: int, n_concurrent: int, n_seats: int) -> tuple[Counter, dict[int, list], float]:
+    rng = random.Random(0)
+    semaphore = asyncio.Semaphore(n_concurrent)
+    statuses: Counter = Counter()
+    sold: dict[int, list] = {}
+
+    async def buyer(client: httpx.AsyncClient, event_id: int, buyer_id: int) -> None:
+        if rng.random() < SPECIFIC_SEATS_SHARE:
+            first_seat = rng.randint(1, N_FRONT_SEATS - 3)
+            request = {"seat_ids": list(range(first_seat, first_seat + rng.randint(1, 4)))}
+        else:
+            request = {"quantity": rng.randint(1, 4)}
+        async with semaphore:
+            response = await client.post(
+                f"/events/{event_id}/reservations", json=request, headers={"x-buyer": f"buyer {buyer_id}"}
+            )
+        statuses[response.status_code] += 1
+        if response.status_code == 201:
+            reservation = response.json()
+            sold[reservation["id"]] = reservation["seat_ids"]
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(app=app, base_url="http://in-concert") as client:
+            organizer = {"x-buyer": "organizer"}
+            venue = {"name": "arena", "street": "street", "city": "city", "state": "state", "zip_code": 1, "phone": 1}
+            venue_id = (await client.post("/venues", data=venue, headers=organizer)).json()["id"]
+            band_id = (await client.post("/bands", data={"name": "band"}, headers=organizer)).json()["id"]
+            event = {"name": "on sale", "starts_at": "2030-01-01T20:00:00", "venue_id": venue_id, "band_id": band_id}
+            seating = {"seat_rows": n_seats // SEATS_PER_ROW, "seats_per_row": SEATS_PER_ROW}
+            response = await client.post("/events", json={**event, **seating}, headers=organizer)
+            event_id = response.json()["id"]
+            start = time.perf_counter()
+            await asyncio.gather(*(buyer(client, event_id, buyer_id) for buyer_id in range(n_buyers)))
+            return statuses, sold, time.perf_counter() - start
+
+
+def check_no_overselling(db_path: Path, sold: dict[int, list]) -> None:
+    sold_seats = [seat_id for seat_ids in sold.values() for seat_id in seat_ids]
+    assert len(sold_seats) == len(set(sold_seats)), "a seat was sold twice"
+    engine = create_engine(f"sqlite:///{db_path}")
+    with Session(engine) as session:
+        held = dict(session.execute(select(Seat.id, Seat.reservation_id).where(Seat.reservation_id.is_not(None))).all())
+        n_seats = dict(session.execute(select(Reservation.id, Reservation.n_seats)).all())
+    engine.dispose()
+    assert held == {seat_id: reservation_id for reservation_id, seats in sold.items() for seat_id in seats}
+    assert all(n_seats[reservation_id] == len(seats) for reservation_id, seats in sold.items())
+
+
+async def main(n_buyers: int, n_concurrent: int, n_seats: int) -> None:
+    app_settings = AppSettingsTest()
+    for mode in ("sync", "async"):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = Path(tmp_dir) / "bench.db"
+            if mode == "async":
+                engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", pool_size=5, max_overflow=0)
+            else:
+                engine = create_engine(f"sqlite:///{db_path}", pool_size=5, max_overflow=0)
+            app_factory = AppFactory()
+            app_factory.configure(app_settings)
+            # the identity provider is not needed, buyers are told apart by a header
+            app_factory.jwks_client.start = mock.AsyncMock()
+            app_factory.server_metadata_client.start = mock.AsyncMock()
+            # the organizer's permissions on the venue and band are not needed
+            app_factory.user_authorizer_fga.add_permissions = mock.AsyncMock()
+            app = app_factory.create_app(app_settings, engine=engine, override_security_dependencies=True)
+
+            async def get_current_user_id(request: Request) -> str:
+                return request.headers["x-buyer"]
+
+            app.dependency_overrides[app_factory.user_authorizer_jwt.get_current_user_id] = get_current_user_id
+            statuses, sold, elapsed = await run_buyers(app, n_buyers, n_concurrent, n_seats)
+            if mode == "async":
+                await engine.dispose()
+            else:
+                engine.dispose()
+            check_no_overselling(db_path, sold)
+            n_sold = sum(len(seats) for seats in sold.values())
+            print(
+                f"[{mode}] {n_buyers:,} buyers, {n_concurrent} concurrent, {n_seats:,} seats: "
+                f"{n_buyers / elapsed:,.0f} requests/s, {len(sold):,} reservations holding {n_sold:,} seats, "
+                f"statuses {dict(statuses)}, no seat sold twice"
+            )
+
+
+if __name__ == "__main__":
+    n_buyers = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    n_concurrent = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    n_seats = int(sys.argv[3]) if len(sys.argv) > 3 else 1_000
+    asyncio.run(main(n_buyers, n_concurrent, n_seats))
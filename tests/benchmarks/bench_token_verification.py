@@ -0,0 +1,60 @@
+"""Microbenchmark of RS256 access token verifications per second, with and without the verified payload cache.
+
+Usage: python -m tests.benchmarks.bench_token_verification [n_verifications]
+"""
+import asyncio
+import json
+import sys
+import time
+from types import SimpleNamespace
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from in_concert.cache import TTLCache
+from in_concert.dependencies.auth.token_validation import JwkTokenVerifier
+
+ISSUER = "https://in-concert.local/"
+AUDIENCE = "https://in-concert-api.com"
+
+
+class StaticJWKClient:
+    """Serve one signing key, like an AsyncJWKSClient whose keys are loaded."""
+
+    def __init__(self, signing_key: jwt.PyJWK) -> None:
+        self.signing_key = signing_key
+
+    async def get_signing_key_from_jwt(self, token: str) -> jwt.PyJWK:
+        return self.signing_key
+
+
+async def verifications_per_second(token_verifier: JwkTokenVerifier, token: str, n_verifications: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n_verifications):
+        await token_verifier.verify(token)
+    return n_verifications / (time.perf_counter() - start)
+
+
+def main(n_verifications: int) -> None:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwks_client = StaticJWKClient(jwt.PyJWK({**public_jwk, "kid": "bench", "alg": "RS256"}))
+    settings = SimpleNamespace(algorithms=["RS256"], audience=AUDIENCE, issuer=ISSUER)
+    token = jwt.encode(
+        {"sub": "auth0|bench", "aud": AUDIENCE, "iss": ISSUER, "exp": int(time.time()) + 3600},
+        private_key,
+        algorithm="RS256",
+        headers={"kid": "bench"},
+    )
+
+    for label, payload_cache in (
+        ("without cache", None),
+        ("with cache", TTLCache(maxsize=10_000, ttl=3600)),
+    ):
+        token_verifier = JwkTokenVerifier(settings, jwks_client, payload_cache=payload_cache)
+        rate = asyncio.run(verifications_per_second(token_verifier, token, n_verifications))
+        print(f"RS256 verify [{label}]: {rate:,.0f} verifications/s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
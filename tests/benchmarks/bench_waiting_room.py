@@ -0,0 +1,126 @@
+"""Load test of the waiting room: a 10x burst of buyers on top of a steady stream, with and without admission control.
+
+Buyers try to hold a seat. Turned away with 429, they join the waiting room, poll their position as told by
+Retry-After and try again with their queue token. Reports the requests reaching the reservation endpoint per second
+and their latency, which the waiting room keeps steady while the burst drains through the queue.
+
+Usage: python -m tests.benchmarks.bench_waiting_room [admission_rate] [burst_seconds]
+"""
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from unittest import mock
+
+import httpx
+from fastapi import Request
+from sqlalchemy import create_engine
+
+from in_concert.app.app_factory import AppFactory
+from in_concert.dependencies.waiting_room import QUEUE_TOKEN_HEADER
+from in_concert.settings import AppSettingsTest
+
+SEATS_PER_ROW = 50
+# arrivals per second of the steady stream, as a share of the admission rate, and of the burst as a multiple
+STEADY_SHARE = 0.5
+BURST_FACTOR = 10
+STEADY_SECONDS = 3
+
+
+async def run_buyers(app, admission_rate: float, burst_seconds: float) -> tuple[Counter, Counter, list[float], float]:
+    arrival_rates = [
+        (STEADY_SECONDS, admission_rate * STEADY_SHARE),
+        (burst_seconds, admission_rate * BURST_FACTOR),
+        (STEADY_SECONDS, admission_rate * STEADY_SHARE),
+    ]
+    # requests reaching the reservation endpoint per second since the start, and their latency
+    downstream_per_second: Counter = Counter()
+    latencies: list[float] = []
+
+    async def buyer(client: httpx.AsyncClient, event_id: int, buyer_id: int, start: float) -> None:
+        headers = {"x-buyer": f"buyer {buyer_id}"}
+        while True:
+            request_start = time.perf_counter()
+            response = await client.post(f"/events/{event_id}/reservations", json={"quantity": 1}, headers=headers)
+            if response.status_code != 429:
+                latencies.append(time.perf_counter() - request_start)
+                downstream_per_second[int(time.perf_counter() - start)] += 1
+                return
+            if QUEUE_TOKEN_HEADER not in headers:
+                joined = await client.post("/waiting-room", headers=headers)
+                if joined.status_code == 429:
+                    await asyncio.sleep(int(joined.headers["retry-after"]))
+                    continue
+                headers[QUEUE_TOKEN_HEADER] = joined.json()["token"]
+                retry_after = joined.json()["retry_after"]
+            else:
+                retry_after = int(response.headers["retry-after"])
+            while retry_after:
+                await asyncio.sleep(retry_after)
+                retry_after = (await client.get("/waiting-room", headers=headers)).json()["retry_after"]
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(app=app, base_url="http://in-concert") as client:
+            organizer = {"x-buyer": "organizer"}
+            venue = {"name": "arena", "street": "street", "city": "city", "state": "state", "zip_code": 1, "phone": 1}
+            venue_id = (await client.post("/venues", data=venue, headers=organizer)).json()["id"]
+            band_id = (await client.post("/bands", data={"name": "band"}, headers=organizer)).json()["id"]
+            event = {"name": "on sale", "starts_at": "2030-01-01T20:00:00", "venue_id": venue_id, "band_id": band_id}
+            n_buyers = int(sum(seconds * rate for seconds, rate in arrival_rates))
+            seating = {"seat_rows": n_buyers // SEATS_PER_ROW + 1, "seats_per_row": SEATS_PER_ROW}
+            response = await client.post("/events", json={**event, **seating}, headers=organizer)
+            event_id = response.json()["id"]
+            start = time.perf_counter()
+            buyers = []
+            arrivals: Counter = Counter()
+            arrival_times = []
+            for seconds, rate in arrival_rates:
+                offset = arrival_times[-1] if arrival_times else 0.0
+                arrival_times.extend(offset + i / rate for i in range(1, int(seconds * rate) + 1))
+            for arrival_time in arrival_times:
+                # buyers due while the event loop was busy arrive at once, so that the arrival rate holds
+                await asyncio.sleep(max(start + arrival_time - time.perf_counter(), 0))
+                arrivals[int(arrival_time)] += 1
+                buyers.append(asyncio.create_task(buyer(client, event_id, len(buyers), start)))
+            await asyncio.gather(*buyers)
+            return arrivals, downstream_per_second, latencies, time.perf_counter() - start
+
+
+def report(label: str, arrivals: Counter, downstream: Counter, latencies: list[float], elapsed: float) -> None:
+    seconds = range(int(elapsed) + 1)
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"[{label}] {sum(arrivals.values()):,} buyers served in {elapsed:.1f} s")
+    print("  arrivals/s:   " + " ".join(f"{arrivals[second]:4d}" for second in seconds))
+    print("  downstream/s: " + " ".join(f"{downstream[second]:4d}" for second in seconds))
+    print(f"  reservation latency p50 {quantiles[49] * 1000:.0f} ms, p99 {quantiles[98] * 1000:.0f} ms")
+
+
+async def main(admission_rate: float, burst_seconds: float) -> None:
+    for label, rate in (("waiting room", admission_rate), ("no admission control", 1e9)):
+        app_settings = AppSettingsTest(waiting_room_admission_rate=rate, waiting_room_burst=int(rate))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.db'}", pool_size=5, max_overflow=0)
+            app_factory = AppFactory()
+            app_factory.configure(app_settings)
+            # the identity provider is not needed, buyers are told apart by a header
+            app_factory.jwks_client.start = mock.AsyncMock()
+            app_factory.server_metadata_client.start = mock.AsyncMock()
+            # the organizer's permissions on the venue and band are not needed
+            app_factory.user_authorizer_fga.add_permissions = mock.AsyncMock()
+
+            async def get_current_user_id(request: Request) -> str:
+                return request.headers["x-buyer"]
+
+            app_factory.user_authorizer_jwt.get_current_user_id = get_current_user_id
+            app = app_factory.create_app(app_settings, engine=engine, override_security_dependencies=True)
+            report(label, *await run_buyers(app, admission_rate, burst_seconds))
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    admission_rate = float(sys.argv[1]) if len(sys.argv) > 1 else 50.0
+    burst_seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+    asyncio.run(main(admission_rate, burst_seconds))
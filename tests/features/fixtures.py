@@ -4,12 +4,14 @@ from sqlalchemy import create_engine
 
 from in_concert.app.app_factory import AppFactory
 from in_concert.settings import AppSettings, AppSettingsTest
+from tests.setup import LocalTokenIssuer, trust_token_issuer
 
 
 @fixture
 def app_settings_test(context) -> AppSettings:
     app_settings_test = AppSettingsTest()
     context.app_settings_test = app_settings_test
+    context.token_issuer = LocalTokenIssuer(app_settings_test) if app_settings_test.use_stand_ins else None
     return context.app_settings_test
 
 
@@ -23,6 +25,7 @@ def engine(context):
 def test_client(context):
     app_factory = AppFactory()
     app_factory.configure(context.app_settings_test)
+    trust_token_issuer(app_factory, context.token_issuer)
     app = app_factory.create_app(app_settings=context.app_settings_test, engine=context.engine)
     test_client = TestClient(app)
     context.test_client = test_client
@@ -6,7 +6,7 @@ from tests.setup import get_bearer_token
 
 @given("I am logged in as a user")
 def logged_in_precondition(context: Context):
-    token = get_bearer_token(settings_auth=context.app_settings_test)
+    token = get_bearer_token(settings_auth=context.app_settings_test, token_issuer=context.token_issuer)
     context.test_client.cookies = {"access_token": f'Bearer {token["access_token"]}'}
 
 
@@ -3,26 +3,164 @@
 These frameworks are:
 - pytest for unit tests
 - behave for bdd style testing/acceptance testing
+
+Bearer tokens are issued by a LocalTokenIssuer, so that the tests run offline, unless the test settings disable it,
+in which case they are fetched from the identity provider. Either way a token is reused until shortly before it
+expires.
 """
-import http
 import json
+import threading
+import time
+import uuid
+from typing import Optional
+
+import httpx
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+# a cached token is renewed this many seconds before it expires
+TOKEN_EXPIRY_MARGIN = 60.0
+# permissions of the test client at the identity provider
+TEST_CLIENT_PERMISSIONS = ["create:venues", "delete:venues", "create:bands", "create:events"]
+
+
+class LocalTokenIssuer:
+    """Issue client credentials tokens like the identity provider does, signed with a self-signed key."""
+
+    def __init__(self, settings_auth, expires_in: int = 86_400, kid: str = "local-test-key") -> None:
+        """Init the LocalTokenIssuer.
+
+        :param settings_auth: settings holding the client id, audience and issuer of the tokens
+        :param expires_in: seconds until an issued token expires
+        :param kid: key id of the signing key
+        """
+        self.settings_auth = settings_auth
+        self.expires_in = expires_in
+        self.kid = kid
+        self._private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        public_jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(self._private_key.public_key()))
+        self.jwks = {"keys": [{**public_jwk, "kid": kid, "alg": "RS256", "use": "sig"}]}
+
+    @property
+    def signing_keys(self) -> dict[str, jwt.PyJWK]:
+        """Signing keys by key id, as held by the jwks client of the app."""
+        return {jwk.key_id: jwk for jwk in jwt.PyJWKSet.from_dict(self.jwks).keys}
+
+    def issue_token(self, permissions: Optional[list[str]] = None) -> dict:
+        """Issue an access token to the test client.
+
+        :param permissions: permissions granted by the token, those of the test client if None
+        :return: token response as returned by the token endpoint
+        """
+        now = int(time.time())
+        payload = {
+            "iss": self.settings_auth.issuer,
+            "sub": f"{self.settings_auth.client_id}@clients",
+            "aud": self.settings_auth.audience,
+            "iat": now,
+            "exp": now + self.expires_in,
+            "jti": uuid.uuid4().hex,
+            "gty": "client-credentials",
+            "permissions": TEST_CLIENT_PERMISSIONS if permissions is None else permissions,
+        }
+        access_token = jwt.encode(payload, self._private_key, algorithm="RS256", headers={"kid": self.kid})
+        return {"access_token": access_token, "token_type": "Bearer", "expires_in": self.expires_in}
+
+
+class TokenCache:
+    """Reuse tokens until shortly before they expire, shared by all tests of a session."""
+
+    def __init__(self, expiry_margin: float = TOKEN_EXPIRY_MARGIN) -> None:
+        self.expiry_margin = expiry_margin
+        self._tokens: dict[tuple, tuple[dict, float]] = {}
+        self._lock = threading.Lock()
 
+    def get(self, key: tuple) -> Optional[dict]:
+        with self._lock:
+            token_dict, expires_at = self._tokens.get(key, (None, 0.0))
+        return token_dict if time.monotonic() < expires_at else None
 
-def get_bearer_token(settings_auth) -> dict:
-    conn = http.client.HTTPSConnection(settings_auth.domain)
+    def set(self, key: tuple, token_dict: dict) -> None:
+        expires_at = time.monotonic() + token_dict.get("expires_in", 0) - self.expiry_margin
+        with self._lock:
+            self._tokens[key] = (token_dict, expires_at)
+
+
+token_cache = TokenCache()
+_http_client: Optional[httpx.Client] = None
+
+
+def _token_request(settings_auth) -> tuple[str, dict]:
     payload_dict: dict = {
         "client_id": settings_auth.client_id,
         "client_secret": settings_auth.client_secret,
         "audience": settings_auth.audience,
         "grant_type": settings_auth.grant_type,
     }
-    payload: str = json.dumps(payload_dict)
-    headers = {"content-type": "application/json"}
+    return f"{settings_auth.base_url}/oauth/token", payload_dict
+
+
+def _cache_key(settings_auth, token_issuer: Optional[LocalTokenIssuer]) -> tuple:
+    return settings_auth.domain, settings_auth.client_id, settings_auth.audience, id(token_issuer)
+
+
+def get_bearer_token(settings_auth, token_issuer: Optional[LocalTokenIssuer] = None) -> dict:
+    """Get a client credentials token of the test client, reusing a cached one.
+
+    :param settings_auth: settings holding the identity provider and the client credentials
+    :param token_issuer: local issuer of the token, the identity provider is asked if None
+    :return: token response as returned by the token endpoint
+    """
+    global _http_client
+    key = _cache_key(settings_auth, token_issuer)
+    token_dict = token_cache.get(key)
+    if token_dict is None:
+        if token_issuer is not None:
+            token_dict = token_issuer.issue_token()
+        else:
+            if _http_client is None:
+                _http_client = httpx.Client(timeout=10.0)
+            url, payload_dict = _token_request(settings_auth)
+            response = _http_client.post(url, json=payload_dict)
+            response.raise_for_status()
+            token_dict = response.json()
+        token_cache.set(key, token_dict)
+    return token_dict
+
+
+async def get_bearer_token_async(
+    settings_auth, token_issuer: Optional[LocalTokenIssuer] = None, http_client: Optional[httpx.AsyncClient] = None
+) -> dict:
+    """Get a client credentials token of the test client without blocking the event loop, reusing a cached one.
+
+    :param settings_auth: settings holding the identity provider and the client credentials
+    :param token_issuer: local issuer of the token, the identity provider is asked if None
+    :param http_client: client to request the token with, a new one is opened if None
+    :return: token response as returned by the token endpoint
+    """
+    key = _cache_key(settings_auth, token_issuer)
+    token_dict = token_cache.get(key)
+    if token_dict is None:
+        if token_issuer is not None:
+            token_dict = token_issuer.issue_token()
+        else:
+            url, payload_dict = _token_request(settings_auth)
+            if http_client is None:
+                async with httpx.AsyncClient(timeout=10.0) as client:
+                    response = await client.post(url, json=payload_dict)
+            else:
+                response = await http_client.post(url, json=payload_dict)
+            response.raise_for_status()
+            token_dict = response.json()
+        token_cache.set(key, token_dict)
+    return token_dict
+
 
-    conn.request("POST", "/oauth/token", payload, headers)
+def trust_token_issuer(app_factory, token_issuer: Optional[LocalTokenIssuer]) -> None:
+    """Make an app accept the tokens of a local issuer, as if its keys were published by the identity provider.
 
-    res = conn.getresponse()
-    data = res.read()
-    data_decoded = data.decode("utf-8")
-    data_dict = json.loads(data_decoded)
-    return data_dict
+    :param app_factory: configured app factory
+    :param token_issuer: local issuer of the tokens, nothing to do if None
+    """
+    if token_issuer is not None:
+        app_factory.jwks_client.signing_keys.update(token_issuer.signing_keys)
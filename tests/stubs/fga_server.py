@@ -0,0 +1,72 @@
+"""A local stand-in for the OpenFGA http api.
+
+It implements the check, write and read endpoints used by UserAuthorizerFGA on top of an in-memory tuple store,
+so that the fga code paths can be exercised and benchmarked without a remote OpenFGA server.
+"""
+from typing import Optional
+
+from fastapi import FastAPI
+from pydantic import BaseModel, Field
+
+from tests.stubs.latency import add_latency
+
+
+class TupleKey(BaseModel):
+    user: str
+    relation: str
+    object: str
+
+
+class TupleKeys(BaseModel):
+    tuple_keys: list[TupleKey] = Field(default_factory=list)
+
+
+class CheckRequest(BaseModel):
+    tuple_key: TupleKey
+
+
+class ReadRequest(BaseModel):
+    page_size: Optional[int] = None
+    continuation_token: Optional[str] = None
+
+
+class WriteRequest(BaseModel):
+    writes: TupleKeys = Field(default_factory=TupleKeys)
+    deletes: TupleKeys = Field(default_factory=TupleKeys)
+
+
+def create_fga_stub_app(latency: float = 0.0, jitter: float = 0.0) -> FastAPI:
+    """Create an asgi app serving the subset of the OpenFGA api used by in_concert.
+
+    :param latency: seconds added to each request, see add_latency
+    :param jitter: maximum of the random seconds added on top
+    :return: fastapi app, the tuple store is exposed as app.state.tuples
+    """
+    app = FastAPI()
+    app.state.tuples = set()
+    add_latency(app, latency, jitter)
+
+    @app.post("/stores/{store_id}/check")
+    async def check(store_id: str, body: CheckRequest) -> dict:
+        tuple_key = body.tuple_key
+        allowed = (tuple_key.user, tuple_key.relation, tuple_key.object) in app.state.tuples
+        return {"allowed": allowed, "resolution": ""}
+
+    @app.post("/stores/{store_id}/read")
+    async def read(store_id: str, body: ReadRequest) -> dict:
+        # all tuples on one page, filters are not supported
+        tuples = [
+            {"key": {"user": user, "relation": relation, "object": object_}, "timestamp": "1970-01-01T00:00:00Z"}
+            for user, relation, object_ in sorted(app.state.tuples)
+        ]
+        return {"tuples": tuples, "continuation_token": ""}
+
+    @app.post("/stores/{store_id}/write")
+    async def write(store_id: str, body: WriteRequest) -> dict:
+        for tuple_key in body.writes.tuple_keys:
+            app.state.tuples.add((tuple_key.user, tuple_key.relation, tuple_key.object))
+        for tuple_key in body.deletes.tuple_keys:
+            app.state.tuples.discard((tuple_key.user, tuple_key.relation, tuple_key.object))
+        return {}
+
+    return app
@@ -0,0 +1,25 @@
+"""A local stand-in for the json web key set endpoint of the identity provider."""
+from typing import Optional
+
+from fastapi import FastAPI, Response
+
+
+def create_jwks_stub_app(jwks: dict, max_age: Optional[int] = None) -> FastAPI:
+    """Create an asgi app serving a json web key set at /.well-known/jwks.json.
+
+    :param jwks: the key set to serve, exposed as app.state.jwks so that tests can rotate keys
+    :param max_age: max-age of the Cache-Control header, not set if None
+    :return: fastapi app, the number of served key set requests is exposed as app.state.jwks_requests
+    """
+    app = FastAPI()
+    app.state.jwks = jwks
+    app.state.jwks_requests = 0
+
+    @app.get("/.well-known/jwks.json")
+    async def get_jwks(response: Response) -> dict:
+        app.state.jwks_requests += 1
+        if max_age is not None:
+            response.headers["cache-control"] = f"public, max-age={max_age}"
+        return app.state.jwks
+
+    return app
@@ -0,0 +1,26 @@
+"""Latency injection for the stand-in servers, to model the round trips to the remote services they replace."""
+import asyncio
+import random
+
+from fastapi import FastAPI, Request
+
+
+def add_latency(app: FastAPI, latency: float = 0.0, jitter: float = 0.0) -> None:
+    """Delay every response of a stand-in app.
+
+    Each request waits latency plus a uniform random share of jitter seconds. Both are exposed as app.state.latency and
+    app.state.jitter, so that benchmarks can change them while the app is served.
+
+    :param app: the stand-in app
+    :param latency: seconds added to each request
+    :param jitter: maximum of the random seconds added on top
+    """
+    app.state.latency = latency
+    app.state.jitter = jitter
+
+    @app.middleware("http")
+    async def delay(request: Request, call_next):
+        delay_seconds = app.state.latency + random.uniform(0.0, app.state.jitter)
+        if delay_seconds > 0:
+            await asyncio.sleep(delay_seconds)
+        return await call_next(request)
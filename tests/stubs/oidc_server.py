@@ -0,0 +1,71 @@
+"""A local stand-in for the identity provider: openid configuration, json web key set, authorize and token endpoints."""
+from typing import Optional
+from urllib.parse import urlencode
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import RedirectResponse
+
+from tests.setup import LocalTokenIssuer
+from tests.stubs.latency import add_latency
+
+
+def create_oidc_stub_app(
+    issuer: str,
+    token_issuer: Optional[LocalTokenIssuer] = None,
+    max_age: Optional[int] = None,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+) -> FastAPI:
+    """Create an asgi app serving the endpoints of the identity provider used by in_concert.
+
+    The authorize endpoint redirects straight back with a code and the token endpoint accepts any code or client
+    credentials. Tokens are signed by the token issuer, whose keys are served as json web key set.
+
+    :param issuer: base url the app is served at, used in the endpoint urls of the configuration
+    :param token_issuer: issuer of signed tokens, opaque dummy tokens are returned if None
+    :param max_age: max-age of the Cache-Control header of the configuration, not set if None
+    :param latency: seconds added to each request, see add_latency
+    :param jitter: maximum of the random seconds added on top
+    :return: fastapi app, the numbers of served configuration and token requests are exposed as
+        app.state.metadata_requests and app.state.token_requests
+    """
+    app = FastAPI()
+    app.state.metadata = {
+        "issuer": f"{issuer}/",
+        "authorization_endpoint": f"{issuer}/authorize",
+        "token_endpoint": f"{issuer}/oauth/token",
+        "jwks_uri": f"{issuer}/.well-known/jwks.json",
+    }
+    app.state.jwks = token_issuer.jwks if token_issuer is not None else {"keys": []}
+    app.state.metadata_requests = 0
+    app.state.token_requests = 0
+    add_latency(app, latency, jitter)
+
+    @app.get("/.well-known/openid-configuration")
+    async def get_openid_configuration(response: Response) -> dict:
+        app.state.metadata_requests += 1
+        if max_age is not None:
+            response.headers["cache-control"] = f"public, max-age={max_age}"
+        return app.state.metadata
+
+    @app.get("/.well-known/jwks.json")
+    async def get_jwks() -> dict:
+        return app.state.jwks
+
+    @app.get("/authorize")
+    async def authorize(redirect_uri: str, state: str) -> RedirectResponse:
+        return RedirectResponse(f"{redirect_uri}?{urlencode({'code': 'stand-in code', 'state': state})}")
+
+    @app.post("/oauth/token")
+    async def post_token(request: Request) -> dict:
+        app.state.token_requests += 1
+        # authlib sends a form, client credentials are usually sent as json
+        if request.headers.get("content-type", "").startswith("application/json"):
+            params = await request.json()
+        else:
+            params = await request.form()
+        if token_issuer is not None:
+            return token_issuer.issue_token()
+        return {"access_token": f"access token for {params.get('code')}", "token_type": "Bearer", "expires_in": 86_400}
+
+    return app
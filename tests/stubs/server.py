@@ -0,0 +1,78 @@
+"""Serve the stand-in apps on a local port and point the app settings at them.
+
+The fga client is built on aiohttp and needs a real socket, so the stand-ins are served by uvicorn rather than
+through an asgi transport.
+"""
+import asyncio
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, Optional
+from urllib.parse import urlsplit
+
+import uvicorn
+from fastapi import FastAPI
+
+from in_concert.settings import AppSettings
+
+
+def _base_url(server: uvicorn.Server) -> str:
+    host, port = server.servers[0].sockets[0].getsockname()[:2]
+    return f"http://{host}:{port}"
+
+
+@asynccontextmanager
+async def serve(app: FastAPI, host: str = "127.0.0.1", port: int = 0) -> AsyncIterator[str]:
+    """Serve an app on the running event loop.
+
+    :param port: port to listen on, a free one if 0
+    :return: base url of the served app
+    """
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    try:
+        yield _base_url(server)
+    finally:
+        server.should_exit = True
+        await server_task
+
+
+@contextmanager
+def serve_in_thread(app: FastAPI, host: str = "127.0.0.1", port: int = 0) -> Iterator[str]:
+    """Serve an app from a background thread with its own event loop, e.g. for synchronous tests.
+
+    :param port: port to listen on, a free one if 0
+    :return: base url of the served app
+    """
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("stand-in server failed to start")
+        threading.Event().wait(0.01)
+    try:
+        yield _base_url(server)
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def stand_in_settings(
+    app_settings: AppSettings, idp_url: Optional[str] = None, fga_url: Optional[str] = None
+) -> AppSettings:
+    """Copy the app settings, pointing them at the stand-ins served at the given urls.
+
+    :param idp_url: base url of the identity provider stand-in, the identity provider is kept if None
+    :param fga_url: base url of the fga stand-in, which needs no credentials, fga is kept if None
+    :return: the updated copy
+    """
+    update = {}
+    if idp_url is not None:
+        idp = urlsplit(idp_url)
+        update.update(scheme=idp.scheme, domain=idp.netloc, issuer=f"{idp_url}/")
+    if fga_url is not None:
+        fga = urlsplit(fga_url)
+        update.update(fga_api_scheme=fga.scheme, fga_api_host=fga.netloc, fga_api_credentials_method="none")
+    return app_settings.model_copy(update=update)
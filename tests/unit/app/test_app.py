@@ -1,5 +1,15 @@
+import base64
+import json
+import logging
+from datetime import datetime
+from typing import Iterator
+from unittest import mock
+
 import pytest
 from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlalchemy.orm import Session
 
 from in_concert.app.app_factory import AppFactory
@@ -43,6 +53,25 @@ class TestApp:
             db_session.commit()
             return band.id
 
+    @pytest.fixture
+    def existing_venue_ids(self, db_session: Session) -> list[int]:
+        with db_session:
+            venues = [
+                Venue(
+                    name=f"venue {i}",
+                    street="venue street",
+                    city="venue city",
+                    state="venue state",
+                    zip_code=12345,
+                    phone=1234567890,
+                    manager_id=1,
+                )
+                for i in range(5)
+            ]
+            db_session.add_all(venues)
+            db_session.commit()
+            return [venue.id for venue in venues]
+
     def test_create_app_should_return_fast_api_app(self, app_settings_test, engine):
         app_factory = AppFactory()
         app_factory.configure(app_settings_test)
@@ -209,6 +238,120 @@ class TestApp:
         # test previous user input is saved in form if validation fails
         assert 'value="band city"' in html_response
 
+    def test_post_user_should_use_one_pool_checkout_and_transaction(self, client_no_auth_checks, caplog):
+        with caplog.at_level(logging.DEBUG, logger="DBSessionDependency"):
+            response = client_no_auth_checks.post("/users", json={"id": "sub_id_123"})
+            client_no_auth_checks.get("/bands/123")
+
+        assert response.status_code == 201
+        assert caplog.messages == ["Request used 1 pool checkouts, 1 transactions"] * 2
+
+    def test_list_venues_should_page_through_all_venues(self, client_no_auth_checks, existing_venue_ids: list[int]):
+        venue_ids, url = [], "/list_venues?limit=2"
+        while url:
+            response = client_no_auth_checks.get(url, headers={"accept": "application/json"})
+            assert response.status_code == 200
+            page = response.json()
+            assert len(page["items"]) <= 2
+            venue_ids.extend(venue["id"] for venue in page["items"])
+            url = page["next_url"]
+
+        assert venue_ids == existing_venue_ids
+
+    def test_list_venues_should_link_next_page(self, client_no_auth_checks, existing_venue_ids: list[int]):
+        response = client_no_auth_checks.get("/list_venues", params={"limit": 2})
+        assert response.status_code == 200
+        html_response = response.content.decode(response.charset_encoding)
+        assert "venue 1" in html_response
+        assert "venue 2" not in html_response
+        assert f"after={existing_venue_ids[1]}" in html_response
+
+    def test_list_venues_should_reject_page_size_above_max(self, client_no_auth_checks, app_settings_test):
+        response = client_no_auth_checks.get("/list_venues", params={"limit": app_settings_test.max_page_size + 1})
+        assert response.status_code == 422
+
+    def test_search_venues_should_return_ranked_json_page(self, client_no_auth_checks, existing_venue_ids: list[int]):
+        response = client_no_auth_checks.get(
+            "/venues/search", params={"q": "venue 3", "limit": 1}, headers={"accept": "application/json"}
+        )
+
+        assert response.status_code == 200
+        page = response.json()
+        assert [venue["name"] for venue in page["items"]] == ["venue 3"]
+        assert page["next_cursor"] is None
+
+    def test_search_venues_should_link_next_page(self, client_no_auth_checks, existing_venue_ids: list[int]):
+        response = client_no_auth_checks.get("/venues/search", params={"q": "venue", "limit": 2})
+
+        assert response.status_code == 200
+        assert "offset=2" in response.text
+
+    def test_nearby_venues_should_return_venues_within_radius(self, client_no_auth_checks, db_session: Session):
+        with db_session:
+            for name, latitude in (("near venue", 52.52), ("far venue", 53.55)):
+                db_session.add(
+                    Venue(
+                        name=name,
+                        street="venue street",
+                        city="venue city",
+                        state="venue state",
+                        zip_code=12345,
+                        phone=1234567890,
+                        latitude=latitude,
+                        longitude=13.4,
+                        manager_id=1,
+                    )
+                )
+            db_session.commit()
+
+        params = {"lat": 52.5, "lon": 13.4, "radius": 20}
+        page = client_no_auth_checks.get("/venues/nearby", params=params, headers={"accept": "application/json"}).json()
+        html = client_no_auth_checks.get("/venues/nearby", params=params).text
+
+        assert [(venue["name"], round(venue["distance_km"])) for venue in page["items"]] == [("near venue", 2)]
+        assert "2.2 km away" in html
+
+    def test_nearby_venues_should_reject_radius_above_max(self, client_no_auth_checks):
+        response = client_no_auth_checks.get("/venues/nearby", params={"lat": 52.5, "lon": 13.4, "radius": 10_000})
+        assert response.status_code == 422
+
+    def test_export_venues_should_stream_all_venues_as_ndjson(
+        self, client_no_auth_checks, existing_venue_ids: list[int]
+    ):
+        response = client_no_auth_checks.get("/venues/export")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        venues = [json.loads(line) for line in response.text.splitlines()]
+        assert [venue["id"] for venue in venues] == existing_venue_ids
+        assert venues[0]["name"] == "venue 0"
+        assert "manager_id" not in venues[0]
+
+    def test_export_venues_should_filter_by_updated_since(
+        self, client_no_auth_checks, existing_venue_ids: list[int], db_session: Session
+    ):
+        with db_session:
+            db_session.execute(update(Venue).values(updated_at=datetime(2024, 1, 1)))
+            db_session.execute(
+                update(Venue).where(Venue.id.in_(existing_venue_ids[3:])).values(updated_at=datetime(2024, 6, 1))
+            )
+            db_session.commit()
+
+        response = client_no_auth_checks.get("/venues/export", params={"updated_since": "2024-06-01T02:00:00+02:00"})
+
+        assert [json.loads(line)["id"] for line in response.text.splitlines()] == existing_venue_ids[3:]
+
+    def test_list_bands_should_return_json_page(self, client_no_auth_checks, existing_band_id: int):
+        response = client_no_auth_checks.get("/list_bands", headers={"accept": "application/json"})
+        assert response.status_code == 200
+        assert response.json() == {
+            "items": [
+                {"id": existing_band_id, "name": "band name", "city": "band city", "genres": None, "image_link": None}
+            ],
+            "next_cursor": None,
+            "next_url": None,
+        }
+
     def test_list_bands_should_return_bands_list(self, client_no_auth_checks):
         response = client_no_auth_checks.get("/list_bands")
         assert response.status_code == 200
@@ -222,3 +365,245 @@ class TestApp:
     def test_get_band_should_return_404_if_band_not_existing(self, client_no_auth_checks):
         response = client_no_auth_checks.get("/bands/123")
         assert response.status_code == 404
+
+
+class TestAppAsyncDB:
+    """Test the routes with an async database engine and async sessions."""
+
+    @pytest.fixture
+    def async_engine(self, tmp_path) -> AsyncEngine:
+        return create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'in_concert.db'}")
+
+    @pytest.fixture
+    def client_async_db(self, app_settings_test, async_engine) -> Iterator[TestClient]:
+        app_factory = AppFactory()
+        app_factory.configure(app_settings_test)
+        app_factory.user_oauth_integrator.user_authorizer_fga.add_permissions = mock.AsyncMock(return_value=True)
+        app_factory.user_oauth_integrator.user_authorizer_fga.remove_permissions = mock.AsyncMock()
+        app_factory.user_oauth_integrator.user_authorizer_fga.add_permission_tuples = mock.AsyncMock()
+        app = app_factory.create_app(app_settings_test, engine=async_engine, override_security_dependencies=True)
+        client_app_factory = app_factory
+
+        async def get_current_user_id():
+            return "auth0|1"
+
+        app.dependency_overrides[app_factory.user_authorizer_jwt.get_current_user_id] = get_current_user_id
+        # the lifespan creates the tables of an async engine
+        with TestClient(app) as client:
+            client.app_factory = client_app_factory
+            yield client
+
+    @pytest.fixture
+    def event(self, client_async_db) -> dict:
+        venue = {"name": "venue", "street": "street", "city": "city", "state": "state", "zip_code": 1, "phone": 1}
+        venue_id = client_async_db.post("/venues", data=venue).json()["id"]
+        band_id = client_async_db.post("/bands", data={"name": "band"}).json()["id"]
+        return {"name": "event", "starts_at": "2030-01-01T20:00:00", "venue_id": venue_id, "band_id": band_id}
+
+    def test_event_should_need_existing_venue_and_band_managed_by_user(self, client_async_db, event):
+        seating = {"seat_rows": 1, "seats_per_row": 1}
+        app_factory = client_async_db.app_factory
+
+        assert client_async_db.post("/events", json={**event, **seating, "venue_id": 404}).status_code == 404
+        assert client_async_db.post("/events", json={**event, **seating, "band_id": 404}).status_code == 404
+        client_async_db.app.dependency_overrides[app_factory.user_authorizer_jwt.get_current_user_id] = lambda: "other"
+        assert client_async_db.post("/events", json={**event, **seating}).status_code == 403
+
+    def test_venue_with_events_should_not_be_deleted(self, client_async_db, event):
+        client_async_db.post("/events", json={**event, "seat_rows": 1, "seats_per_row": 1})
+
+        assert client_async_db.delete(f"/venues/{event['venue_id']}").status_code == 409
+        assert client_async_db.get(f"/venues/{event['venue_id']}").status_code == 200
+
+    def test_post_user_should_create_user_in_db(self, client_async_db):
+        response = client_async_db.post("/users", json={"id": "sub_id_123"})
+        assert response.status_code == 201
+        assert response.json()["id"] == "sub_id_123"
+
+    def test_created_venue_should_be_listed_and_deleted(self, client_async_db):
+        response = client_async_db.post(
+            "/venues",
+            data={
+                "name": "venue name",
+                "street": "venue street",
+                "city": "venue city",
+                "state": "venue state",
+                "zip_code": 12345,
+                "phone": 1234567890,
+            },
+        )
+        assert response.status_code == 201
+        venue_id = response.json()["id"]
+
+        assert client_async_db.get(f"/venues/{venue_id}").status_code == 200
+        assert b"venue name" in client_async_db.get("/list_venues").content
+
+        assert client_async_db.delete(f"/venues/{venue_id}").status_code == 200
+        assert client_async_db.get(f"/venues/{venue_id}").status_code == 404
+        assert client_async_db.delete(f"/venues/{venue_id}").status_code == 404
+
+    def test_incremental_export_should_end_with_tombstones_of_deleted_venues(self, client_async_db, event):
+        venue = {"name": "venue", "street": "street", "city": "city", "state": "state", "zip_code": 1, "phone": 1}
+        venue_id = client_async_db.post("/venues", data=venue).json()["id"]
+        client_async_db.delete(f"/venues/{venue_id}")
+
+        full = client_async_db.get("/venues/export")
+        incremental = client_async_db.get("/venues/export", params={"updated_since": "2024-01-01T00:00:00"})
+
+        assert [json.loads(line)["id"] for line in full.text.splitlines()] == [event["venue_id"]]
+        *venues, tombstone = [json.loads(line) for line in incremental.text.splitlines()]
+        assert [venue["id"] for venue in venues] == [event["venue_id"]]
+        assert tombstone["id"] == venue_id and tombstone["deleted_at"]
+
+    def test_created_band_should_be_listed(self, client_async_db):
+        response = client_async_db.post("/bands", data={"name": "band name", "city": "band city"})
+        assert response.status_code == 201
+        band_id = response.json()["id"]
+
+        assert client_async_db.get(f"/bands/{band_id}").status_code == 200
+        assert b"band name" in client_async_db.get("/list_bands").content
+
+    def test_get_band_should_be_cached_until_band_created(self, client_async_db):
+        band_id = client_async_db.post("/bands", data={"name": "band name"}).json()["id"]
+        response = client_async_db.get(f"/bands/{band_id}")
+        etag = response.headers["etag"]
+
+        assert client_async_db.get(f"/bands/{band_id}", headers={"if-none-match": etag}).status_code == 304
+        assert b"other band" not in client_async_db.get("/list_bands").content
+
+        client_async_db.post("/bands", data={"name": "other band"})
+
+        assert b"other band" in client_async_db.get("/list_bands").content
+        assert client_async_db.get(f"/bands/{band_id}", headers={"if-none-match": etag}).status_code == 304
+
+    def test_import_venues_should_insert_rows_and_report_errors(self, client_async_db):
+        venue = {"street": "street", "city": "city", "state": "state", "zip_code": 12345, "phone": 123}
+        rows = [json.dumps({**venue, "name": "first venue"}), json.dumps({"name": "missing fields"}), "{not json"]
+        rows.extend(json.dumps({**venue, "name": f"venue {i}"}) for i in range(3))
+        body = "\n".join(rows)
+
+        response = client_async_db.post(
+            "/venues/import", content=body, headers={"content-type": "application/x-ndjson"}
+        )
+
+        assert response.status_code == 200
+        report = response.json()
+        assert (report["imported"], report["failed"]) == (4, 2)
+        assert [error["line"] for error in report["errors"]] == [2, 3]
+        assert b"venue 2" in client_async_db.get("/list_venues").content
+        add_permission_tuples = client_async_db.app_factory.user_authorizer_fga.add_permission_tuples
+        granted = [permission for call in add_permission_tuples.await_args_list for permission in call.args[0]]
+        assert len(granted) == 8
+        assert all(user == "user:auth0|1" for user, _, _ in granted)
+
+    def test_import_bands_should_read_csv(self, client_async_db):
+        body = "name,city,zip_code\nfirst band,Berlin,10115\nsecond band,,\n"
+
+        response = client_async_db.post("/bands/import", content=body, headers={"content-type": "text/csv"})
+
+        assert response.json() == {"imported": 2, "failed": 0, "errors": []}
+        assert b"second band" in client_async_db.get("/list_bands").content
+
+    def test_import_should_reject_unsupported_content_type(self, client_async_db):
+        response = client_async_db.post("/bands/import", content="{}", headers={"content-type": "application/json"})
+        assert response.status_code == 415
+
+    def test_export_bands_should_stream_imported_bands(self, client_async_db, app_settings_test):
+        body = "name\n" + "".join(f"band {i}\n" for i in range(5))
+        client_async_db.post("/bands/import", content=body, headers={"content-type": "text/csv"})
+
+        response = client_async_db.get("/bands/export")
+
+        bands = [json.loads(line) for line in response.text.splitlines()]
+        assert [band["name"] for band in bands] == [f"band {i}" for i in range(5)]
+        assert all("manager_id" not in band and band["updated_at"] for band in bands)
+
+    def test_search_bands_should_find_imported_bands(self, client_async_db):
+        body = "name,city\nThe Lumberjacks,Oslo\nSilent Lakes,Bergen\n"
+        client_async_db.post("/bands/import", content=body, headers={"content-type": "text/csv"})
+
+        response = client_async_db.get("/bands/search", params={"q": "lumb"}, headers={"accept": "application/json"})
+
+        assert [band["name"] for band in response.json()["items"]] == ["The Lumberjacks"]
+
+    def test_list_bands_should_filter_by_genre(self, client_async_db):
+        body = 'name,genres\nrock band,Rock\njazz band,jazz\nfusion band,"jazz, rock"\n'
+        client_async_db.post("/bands/import", content=body, headers={"content-type": "text/csv"})
+
+        response = client_async_db.get("/list_bands", params={"genre": "rock"}, headers={"accept": "application/json"})
+
+        assert [band["name"] for band in response.json()["items"]] == ["rock band", "fusion band"]
+
+    def test_reservation_should_hold_confirm_and_block_seats(self, client_async_db, event):
+        response = client_async_db.post("/events", json={**event, "seat_rows": 2, "seats_per_row": 3})
+        assert response.status_code == 201
+        event_id = response.json()["id"]
+
+        seats = client_async_db.get(f"/events/{event_id}/seats").json()
+        response = client_async_db.post(f"/events/{event_id}/reservations", json={"seat_ids": [seats[0]["id"]]})
+        assert response.status_code == 201
+        reservation = response.json()
+        conflict = client_async_db.post(f"/events/{event_id}/reservations", json={"seat_ids": [seats[0]["id"]]})
+        confirmation = client_async_db.post(f"/reservations/{reservation['id']}/confirm")
+
+        assert [seat["label"] for seat in seats] == ["1-1", "1-2", "1-3", "2-1", "2-2", "2-3"]
+        assert reservation["status"] == "held" and reservation["seat_ids"] == [seats[0]["id"]]
+        assert conflict.status_code == 409
+        assert confirmation.json() == {"id": reservation["id"], "status": "confirmed"}
+        assert client_async_db.delete(f"/reservations/{reservation['id']}").status_code == 409
+        assert len(client_async_db.get(f"/events/{event_id}/seats").json()) == 5
+
+    def test_reservation_should_validate_requested_seats(self, client_async_db, event):
+        event_id = client_async_db.post("/events", json={**event, "seat_rows": 1, "seats_per_row": 20}).json()["id"]
+
+        assert client_async_db.post(f"/events/{event_id}/reservations", json={}).status_code == 422
+        assert client_async_db.post(f"/events/{event_id}/reservations", json={"quantity": 11}).status_code == 422
+        assert client_async_db.post("/events/404/reservations", json={"quantity": 1}).status_code == 404
+        assert client_async_db.get("/events/404/seats").status_code == 404
+        assert client_async_db.post("/reservations/404/confirm").status_code == 404
+
+    def test_reservation_should_be_shed_once_waiting_room_capacity_is_used_up(self, client_async_db, event):
+        event_id = client_async_db.post("/events", json={**event, "seat_rows": 1, "seats_per_row": 5}).json()["id"]
+        client_async_db.app_factory.waiting_room.bucket.take_up_to(1_000)
+
+        response = client_async_db.post(f"/events/{event_id}/reservations", json={"quantity": 1})
+
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) >= 1
+
+    def test_reservation_should_authenticate_before_admission(self, client_async_db):
+        app_factory = client_async_db.app_factory
+        del client_async_db.app.dependency_overrides[app_factory.user_authorizer_jwt.get_current_user_id]
+
+        for _ in range(3):
+            assert client_async_db.post("/events/1/reservations", json={"quantity": 1}).status_code == 401
+
+        assert app_factory.waiting_room.stats() == {"waiting": 0, "admitted": 0, "shed": 0}
+
+    def test_stats_should_show_cache_and_hold_expiry_counters(self, client_async_db):
+        check_cache = client_async_db.app_factory.user_authorizer_fga.check_cache
+        check_cache.get(("user:auth0|1", "can_delete", "venue:1"))
+
+        stats = client_async_db.get("/stats").json()
+
+        assert stats["fga_check_cache"] == {"hits": 0, "misses": 1, "size": 0, "maxsize": check_cache.maxsize}
+        assert stats["hold_expiry"] == client_async_db.app_factory.hold_expiry_scheduler.stats()
+
+    def test_seat_map_should_show_held_seats_and_revalidate(self, client_async_db, event):
+        event_id = client_async_db.post("/events", json={**event, "seat_rows": 1, "seats_per_row": 5}).json()["id"]
+        response = client_async_db.get(f"/events/{event_id}/seat-map")
+        assert response.json()["n_available"] == 5
+        etag = response.headers["etag"]
+
+        reservation = client_async_db.post(f"/events/{event_id}/reservations", json={"quantity": 2}).json()
+
+        response = client_async_db.get(f"/events/{event_id}/seat-map", headers={"if-none-match": etag})
+        assert response.status_code == 200
+        assert response.json()["n_available"] == 3
+        assert response.json()["available"] == base64.b64encode(bytes([0b11100])).decode()
+        etag = response.headers["etag"]
+        assert client_async_db.get(f"/events/{event_id}/seat-map", headers={"if-none-match": etag}).status_code == 304
+
+        client_async_db.delete(f"/reservations/{reservation['id']}")
+        assert client_async_db.get(f"/events/{event_id}/seat-map").json()["n_available"] == 5
+        assert client_async_db.get("/events/404/seat-map").status_code == 404
@@ -0,0 +1,133 @@
+from typing import AsyncIterator
+from unittest import mock
+
+import pytest
+import sqlalchemy.exc
+from sqlalchemy.orm import Session
+
+from in_concert.app import bulk_import
+from in_concert.app.bulk_import import import_records, iter_lines, iter_records
+from in_concert.app.models import Band
+from in_concert.app.schemas import BandSchema
+
+
+async def stream(*chunks: bytes) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(async_iterator) -> list:
+    return [item async for item in async_iterator]
+
+
+@pytest.mark.asyncio
+async def test_iter_lines_should_join_lines_split_across_chunks():
+    lines = await collect(iter_lines(stream(b"first\r\nsec", b"ond\nthi", b"rd"), max_line_length=100))
+    assert lines == ["first", "second", "third"]
+
+
+@pytest.mark.asyncio
+async def test_iter_lines_should_skip_lines_longer_than_max():
+    chunks = stream(b"short\nlonger", b" than eleven", b" bytes\nshort again\n")
+    lines = await collect(iter_lines(chunks, max_line_length=11))
+    assert lines == ["short", None, "short again"]
+
+
+@pytest.mark.asyncio
+async def test_iter_records_should_parse_csv_with_header():
+    lines = stream("name,city", 'band,"Berlin, Germany"', "", "other band,", "too,many,fields")
+
+    records = await collect(iter_records(lines, "text/csv"))
+
+    assert records == [
+        (2, {"name": "band", "city": "Berlin, Germany"}),
+        (4, {"name": "other band"}),
+        (5, "Expected 2 fields, got 3."),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_iter_records_should_report_invalid_ndjson():
+    lines = stream('{"name": "band"}', "[1, 2]", "{not json", None)
+
+    records = await collect(iter_records(lines, "application/x-ndjson"))
+
+    assert records[0] == (1, {"name": "band"})
+    assert records[1] == (2, "Expected a json object.")
+    assert records[2][0] == 3 and records[2][1].startswith("Invalid json")
+    assert records[3] == (4, "Line too long.")
+
+
+class TestImportRecords:
+    @pytest.fixture
+    def on_inserted(self) -> mock.AsyncMock:
+        return mock.AsyncMock()
+
+    async def import_bands(self, db_session: Session, records: list, on_inserted, chunk_size=2, max_errors=10):
+        return await import_records(
+            stream(*records),
+            BandSchema,
+            Band,
+            db_session,
+            defaults={"manager_id": "auth0|1"},
+            on_inserted=on_inserted,
+            chunk_size=chunk_size,
+            max_errors=max_errors,
+        )
+
+    @pytest.mark.asyncio
+    async def test_import_records_should_insert_valid_rows_in_chunks(self, db_session: Session, on_inserted):
+        records = [(line, {"name": f"band {line}", "zip_code": "12345"}) for line in range(1, 6)]
+
+        report = await self.import_bands(db_session, records, on_inserted)
+
+        assert (report.imported, report.failed) == (5, 0)
+        assert [len(call.args[0]) for call in on_inserted.await_args_list] == [2, 2, 1]
+        bands = db_session.query(Band).order_by(Band.id).all()
+        assert [band.name for band in bands] == [f"band {line}" for line in range(1, 6)]
+        assert {band.manager_id for band in bands} == {"auth0|1"}
+        assert [band.zip_code for band in bands] == [12345] * 5
+
+    @pytest.mark.asyncio
+    async def test_import_records_should_report_invalid_rows_and_go_on(self, db_session: Session, on_inserted):
+        records = [(1, {"name": "band"}), (2, {"city": "no name"}), (3, "Line too long."), (4, {"name": "other"})]
+
+        report = await self.import_bands(db_session, records, on_inserted, max_errors=1)
+
+        assert (report.imported, report.failed) == (2, 2)
+        assert len(report.errors) == 1
+        assert report.errors[0].line == 2
+        assert "name" in report.errors[0].error
+        assert db_session.query(Band).count() == 2
+
+    @pytest.mark.asyncio
+    async def test_import_records_should_reject_values_not_fitting_their_columns(
+        self, db_session: Session, on_inserted
+    ):
+        records = [
+            (1, {"name": "band", "city": "c" * 31}),
+            (2, {"name": "band", "zip_code": 2**31}),
+            (3, {"name": "ok"}),
+        ]
+
+        report = await self.import_bands(db_session, records, on_inserted)
+
+        assert (report.imported, report.failed) == (1, 2)
+        assert [error.line for error in report.errors] == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_import_records_should_report_rows_rejected_by_the_database(self, db_session: Session, on_inserted):
+        def bulk_insert(session, model_class, rows):
+            if any(row["name"] == "rejected" for row in rows):
+                raise sqlalchemy.exc.DataError("INSERT", {}, Exception("value too long"))
+            return original_bulk_insert(session, model_class, rows)
+
+        original_bulk_insert = bulk_import.bulk_insert
+        records = [(1, {"name": "band"}), (2, {"name": "rejected"}), (3, {"name": "other"})]
+
+        with mock.patch.object(bulk_import, "bulk_insert", bulk_insert):
+            report = await self.import_bands(db_session, records, on_inserted)
+
+        assert (report.imported, report.failed) == (2, 1)
+        assert report.errors[0].line == 2
+        assert db_session.query(Band).count() == 2
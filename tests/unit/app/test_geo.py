@@ -0,0 +1,62 @@
+from sqlalchemy.orm import Session
+
+from in_concert.app.geo import cell_ranges, geo_cell, get_nearby
+from in_concert.app.models import Venue, VenueListItem, bulk_insert
+
+BERLIN = (52.520, 13.405)
+POTSDAM = (52.391, 13.064)
+HAMBURG = (53.551, 9.993)
+
+
+def add_venues(db_session: Session, *names_locations: tuple[str, tuple[float, float]]) -> list[int]:
+    rows = [
+        dict(
+            name=name,
+            latitude=latitude,
+            longitude=longitude,
+            street="street",
+            city="city",
+            state="state",
+            zip_code=1,
+            phone=1,
+            manager_id="1",
+        )
+        for name, (latitude, longitude) in names_locations
+    ]
+    return bulk_insert(db_session, Venue, rows)
+
+
+def test_cell_ranges_should_split_at_antimeridian() -> None:
+    ranges = cell_ranges(-17.0, 179.95, 20)
+
+    assert len(ranges) == 2 * len(cell_ranges(-17.0, 0.0, 20))
+    assert geo_cell(-17.0, 179.99) in (cell for first, last in ranges for cell in range(first, last + 1))
+    assert geo_cell(-17.0, -179.99) in (cell for first, last in ranges for cell in range(first, last + 1))
+
+
+def test_get_nearby_should_rank_venues_within_radius_by_distance(db_session: Session) -> None:
+    add_venues(db_session, ("potsdam", POTSDAM), ("hamburg", HAMBURG), ("berlin", BERLIN), ("nowhere", (None, None)))
+
+    nearby = get_nearby(db_session, Venue, *BERLIN, radius_km=50, limit=10, read_model=VenueListItem)
+
+    assert [venue.name for venue, _ in nearby] == ["berlin", "potsdam"]
+    assert [round(distance_km) for _, distance_km in nearby] == [0, 27]
+    assert isinstance(nearby[0][0], VenueListItem)
+
+
+def test_get_nearby_should_return_nearest_first_up_to_limit(db_session: Session) -> None:
+    add_venues(db_session, *((f"venue {i}", (52.0 + i / 100, 13.0)) for i in range(5)))
+
+    nearby = get_nearby(db_session, Venue, 52.04, 13.0, radius_km=10, limit=2, read_model=VenueListItem)
+
+    assert [venue.name for venue, _ in nearby] == ["venue 4", "venue 3"]
+
+
+def test_moved_venue_should_be_found_at_new_location(db_session: Session) -> None:
+    venue_id = add_venues(db_session, ("moving venue", HAMBURG))[0]
+
+    db_session.get(Venue, venue_id).latitude, db_session.get(Venue, venue_id).longitude = BERLIN
+    db_session.flush()
+
+    assert get_nearby(db_session, Venue, *HAMBURG, radius_km=10, limit=10, read_model=VenueListItem) == []
+    assert len(get_nearby(db_session, Venue, *BERLIN, radius_km=10, limit=10, read_model=VenueListItem)) == 1
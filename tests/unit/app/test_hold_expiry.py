@@ -0,0 +1,59 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session, sessionmaker
+
+from in_concert.app.hold_expiry import HoldExpiryScheduler
+from in_concert.app.models import Event, Reservation, Seat
+from in_concert.app.reservations import create_event, hold_seats
+
+
+@pytest.fixture
+def event_id(db_session: Session) -> int:
+    event = Event(name="event", starts_at=datetime(2030, 1, 1), venue_id=1, band_id=1, manager_id="1")
+    event_id = create_event(db_session, event, [f"A{i}" for i in range(1, 6)])
+    db_session.commit()
+    return event_id
+
+
+@pytest.mark.asyncio
+async def test_release_due_should_release_expired_holds_in_batches(
+    db_session_factory: sessionmaker, db_session: Session, event_id: int, caplog
+) -> None:
+    expired_ids = [hold_seats(db_session, event_id, f"user {i}", -1, seat_ids=[i])[0].id for i in (1, 2)]
+    hold_seats(db_session, event_id, "user 3", 600, seat_ids=[3])
+    db_session.commit()
+    scheduler = HoldExpiryScheduler(db_session_factory, batch_size=1, lag_warning_seconds=0.5)
+    await scheduler.rebuild()
+
+    assert await scheduler.release_due() == 2
+
+    statuses = dict(db_session.execute(select(Reservation.id, Reservation.status)).all())
+    assert [statuses[reservation_id] for reservation_id in expired_ids] == ["released", "released"]
+    held = db_session.scalars(select(Seat.id).where(Seat.reservation_id.is_not(None))).all()
+    assert held == [3]
+    stats = scheduler.stats()
+    assert (stats["pending"], stats["released"], stats["batches"]) == (1, 2, 2)
+    assert stats["max_lag_seconds"] >= 1
+    assert "Released 1 holds up to" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_scheduled_hold_should_be_released_once_expired(
+    db_session_factory: sessionmaker, db_session: Session, event_id: int
+) -> None:
+    scheduler = HoldExpiryScheduler(db_session_factory)
+    await scheduler.start()
+    reservation, _ = hold_seats(db_session, event_id, "user 1", 0.1, seat_ids=[1])
+    db_session.commit()
+    reservation_id, expires_at = reservation.id, reservation.expires_at
+
+    scheduler.schedule(reservation_id, expires_at)
+    await asyncio.sleep(0.5)
+    await scheduler.stop()
+
+    assert scheduler.stats()["released"] == 1
+    assert db_session.get(Reservation, reservation_id, populate_existing=True).status == "released"
+    assert db_session.get(Seat, 1, populate_existing=True).reservation_id is None
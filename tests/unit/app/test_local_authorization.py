@@ -0,0 +1,143 @@
+from unittest import mock
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.orm import Session, sessionmaker
+
+from in_concert.app.app_factory import AppFactory
+from in_concert.app.local_authorization import UserAuthorizerLocal
+from in_concert.app.models import PermissionTuple, Venue
+from tests.setup import trust_token_issuer
+
+
+@pytest.fixture
+def user_authorizer_jwt():
+    user_authorizer_jwt = mock.AsyncMock()
+    user_authorizer_jwt.get_current_user_id = mock.AsyncMock(return_value="auth0|1")
+    return user_authorizer_jwt
+
+
+@pytest.fixture
+def security_scopes_can_delete_venue():
+    return mock.MagicMock(scopes=["can_delete:venue"])
+
+
+@pytest.mark.asyncio
+async def test_checks_should_follow_permission_writes(
+    db_session_factory: sessionmaker, db_session: Session, user_authorizer_jwt, security_scopes_can_delete_venue
+) -> None:
+    user_authorizer = UserAuthorizerLocal(db_session_factory, user_authorizer_jwt)
+    await user_authorizer.open()
+
+    await user_authorizer.add_permissions({}, ["can_delete", "can_update"], "venue", 1)
+    assert await user_authorizer.is_authorized_current_user({}, security_scopes_can_delete_venue, 1)
+    with pytest.raises(HTTPException):
+        await user_authorizer.is_authorized_current_user({}, security_scopes_can_delete_venue, 2)
+
+    await user_authorizer.remove_permissions({}, "venue", 1, ["can_delete"])
+    with pytest.raises(HTTPException):
+        await user_authorizer.is_authorized_current_user({}, security_scopes_can_delete_venue, 1)
+    await user_authorizer.close()
+
+    rows = db_session.execute(select(PermissionTuple.user, PermissionTuple.relation, PermissionTuple.object_)).all()
+    assert [tuple(row) for row in rows] == [("user:auth0|1", "can_update", "venue:1")]
+
+
+@pytest.mark.asyncio
+async def test_reload_should_pick_up_writes_of_other_processes(
+    db_session_factory: sessionmaker, db_session: Session, user_authorizer_jwt
+) -> None:
+    user_authorizer = UserAuthorizerLocal(db_session_factory, user_authorizer_jwt)
+    assert not await user_authorizer.index.contains("user:auth0|2", "can_delete", "venue:1")
+
+    PermissionTuple.insert_missing(db_session, [("user:auth0|2", "can_delete", "venue:1")])
+    db_session.commit()
+    await user_authorizer.index.reload()
+
+    assert await user_authorizer.index.contains("user:auth0|2", "can_delete", "venue:1")
+
+
+@pytest.mark.asyncio
+async def test_writes_should_go_through_to_remote_fga_first(
+    db_session_factory: sessionmaker, db_session: Session, user_authorizer_jwt
+) -> None:
+    remote = mock.AsyncMock()
+    user_authorizer = UserAuthorizerLocal(db_session_factory, user_authorizer_jwt, remote=remote)
+    permission_tuples = [("user:auth0|1", "can_delete", "venue:1")]
+
+    await user_authorizer.add_permission_tuples(permission_tuples)
+    remote.add_permission_tuples.assert_awaited_once_with(permission_tuples)
+
+    remote.remove_permission_tuples.side_effect = RuntimeError("fga unavailable")
+    with pytest.raises(RuntimeError):
+        await user_authorizer.remove_permission_tuples(permission_tuples)
+    assert await user_authorizer.index.contains(*permission_tuples[0])
+    assert db_session.scalar(select(PermissionTuple.user)) == "user:auth0|1"
+
+
+@pytest.mark.asyncio
+async def test_open_should_import_fga_tuples_once(
+    db_session_factory: sessionmaker, db_session: Session, user_authorizer_jwt
+) -> None:
+    async def read_permission_tuples():
+        yield [("user:auth0|1", "can_delete", "venue:1"), ("user:auth0|1", "can_update", "venue:1")]
+        yield [("user:auth0|1", "can_delete", "band:1")]
+
+    fga = mock.AsyncMock()
+    fga.read_permission_tuples = mock.MagicMock(side_effect=read_permission_tuples)
+    user_authorizer = UserAuthorizerLocal(db_session_factory, user_authorizer_jwt, import_from=fga)
+
+    await user_authorizer.open()
+    assert await user_authorizer.index.contains("user:auth0|1", "can_delete", "band:1")
+    await user_authorizer.remove_permission_tuples([("user:auth0|1", "can_delete", "band:1")])
+    await user_authorizer.close()
+    await user_authorizer.open()
+    await user_authorizer.close()
+
+    fga.read_permission_tuples.assert_called_once()
+    assert fga.close.await_count == 2
+    assert not await user_authorizer.index.contains("user:auth0|1", "can_delete", "band:1")
+    assert await user_authorizer.index.contains("user:auth0|1", "can_update", "venue:1")
+
+
+def test_local_backend_should_protect_routes(
+    app_settings_test, engine, db_session: Session, fga_stub_app, token_issuer, bearer_token
+):
+    app_settings = app_settings_test.model_copy(
+        update={"authorization_backend": "local", "local_authorization_import_from_fga": True}
+    )
+    app_factory = AppFactory()
+    app_factory.configure(app_settings)
+    trust_token_issuer(app_factory, token_issuer)
+    venue = {"name": "venue", "street": "street", "city": "city", "state": "state", "zip_code": 1, "phone": 1}
+    other_venue_id = Venue(**venue, manager_id="someone else").insert(db_session)
+    granted_venue_id = Venue(**venue, manager_id="someone else").insert(db_session)
+    db_session.commit()
+    user = f"user:{jwt.decode(bearer_token['access_token'], options={'verify_signature': False})['sub']}"
+    fga_stub_app.state.tuples.add((user, "can_delete", f"venue:{granted_venue_id}"))
+
+    with TestClient(app_factory.create_app(app_settings, engine=engine)) as client:
+        client.cookies = {"access_token": f'Bearer {bearer_token["access_token"]}'}
+        venue_id = client.post("/venues", json=venue).json()["id"]
+
+        assert client.delete(f"/venues/{other_venue_id}").status_code == 403
+        assert client.delete(f"/venues/{granted_venue_id}").status_code == 200
+        assert client.delete(f"/venues/{venue_id}").status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_failed_import_should_be_logged_and_close_fga(
+    db_session_factory: sessionmaker, user_authorizer_jwt, caplog
+) -> None:
+    fga = mock.AsyncMock()
+    fga.read_permission_tuples = mock.MagicMock(side_effect=RuntimeError("fga unavailable"))
+    user_authorizer = UserAuthorizerLocal(db_session_factory, user_authorizer_jwt, import_from=fga)
+
+    await user_authorizer.open()
+    await user_authorizer.close()
+
+    assert "Could not import permission tuples from fga" in caplog.text
+    fga.close.assert_awaited_once()
@@ -0,0 +1,102 @@
+from unittest import mock
+
+import pytest
+from fastapi import HTTPException, Request
+from fastapi.responses import HTMLResponse
+
+from in_concert.app.page_cache import InMemoryPageCacheBackend, PageCache
+
+
+def make_request(path: str = "/venues/1", query_string: bytes = b"", headers: dict = None) -> Request:
+    raw_headers = [(name.encode(), value.encode()) for name, value in (headers or {}).items()]
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "scheme": "http",
+            "server": ("in-concert", 80),
+            "path": path,
+            "query_string": query_string,
+            "headers": raw_headers,
+        }
+    )
+
+
+class TestPageCache:
+    @pytest.fixture
+    def page_cache(self) -> PageCache:
+        return PageCache(InMemoryPageCacheBackend(maxsize=10, ttl=60))
+
+    @pytest.fixture
+    def render(self) -> mock.AsyncMock:
+        return mock.AsyncMock(side_effect=lambda: HTMLResponse("<h1>venue</h1>"))
+
+    @pytest.mark.asyncio
+    async def test_respond_should_render_once_per_key(self, page_cache, render):
+        first = await page_cache.respond(make_request(), "venues", render)
+        second = await page_cache.respond(make_request(), "venues", render)
+        await page_cache.respond(make_request(query_string=b"a=1"), "venues", render)
+
+        assert render.await_count == 2
+        assert second.body == first.body == b"<h1>venue</h1>"
+        assert second.headers["etag"] == first.headers["etag"]
+
+    @pytest.mark.asyncio
+    async def test_respond_should_ignore_query_parameter_order(self, page_cache, render):
+        await page_cache.respond(make_request(query_string=b"a=1&b=2"), "venues", render)
+        await page_cache.respond(make_request(query_string=b"b=2&a=1"), "venues", render)
+
+        render.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_respond_should_not_serve_page_to_other_host(self, page_cache):
+        render = mock.AsyncMock(side_effect=lambda: HTMLResponse(f"<a href='http://{host}/venues'>"))
+
+        host = "evil.example"
+        await page_cache.respond(make_request(headers={"host": host}), "venues", render)
+        host = "in-concert"
+        response = await page_cache.respond(make_request(), "venues", render)
+
+        assert render.await_count == 2
+        assert b"evil.example" not in response.body
+
+    @pytest.mark.asyncio
+    async def test_respond_should_return_304_if_etag_matches(self, page_cache, render):
+        etag = (await page_cache.respond(make_request(), "venues", render)).headers["etag"]
+
+        response = await page_cache.respond(make_request(headers={"if-none-match": etag}), "venues", render)
+
+        assert response.status_code == 304
+        assert response.body == b""
+        assert response.headers["etag"] == etag
+
+    @pytest.mark.asyncio
+    async def test_invalidate_should_drop_pages_of_namespace_only(self, page_cache, render):
+        await page_cache.respond(make_request(), "venues", render)
+        await page_cache.respond(make_request("/bands/1"), "bands", render)
+
+        page_cache.invalidate("venues")
+        await page_cache.respond(make_request(), "venues", render)
+        await page_cache.respond(make_request("/bands/1"), "bands", render)
+
+        assert render.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_respond_should_not_cache_errors(self, page_cache):
+        render = mock.AsyncMock(side_effect=HTTPException(status_code=404))
+
+        for _ in range(2):
+            with pytest.raises(HTTPException):
+                await page_cache.respond(make_request(), "venues", render)
+
+        assert render.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_respond_should_not_cache_page_rendered_during_invalidation(self, page_cache):
+        async def render_during_write():
+            page_cache.invalidate("venues")
+            return HTMLResponse("<h1>stale venue</h1>")
+
+        await page_cache.respond(make_request(), "venues", render_during_write)
+
+        assert page_cache.backend.get("venues", "http://in-concert/venues/1?") is None
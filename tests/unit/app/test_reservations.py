@@ -0,0 +1,106 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session, sessionmaker
+
+from in_concert.app.models import Event, Seat
+from in_concert.app.reservations import (
+    ReservationConflictError,
+    confirm_reservation,
+    create_event,
+    get_available_seats,
+    hold_seats,
+    release_reservation,
+)
+
+
+@pytest.fixture
+def event_id(db_session: Session) -> int:
+    event = Event(name="event", starts_at=datetime(2030, 1, 1), venue_id=1, band_id=1, manager_id="1")
+    event_id = create_event(db_session, event, [f"A{i}" for i in range(1, 6)])
+    db_session.commit()
+    return event_id
+
+
+def test_hold_seats_should_hold_all_seats_or_none(db_session: Session, event_id: int) -> None:
+    _, held_ids = hold_seats(db_session, event_id, "user 1", 600, seat_ids=[1, 2])
+    db_session.commit()
+
+    with pytest.raises(ReservationConflictError):
+        hold_seats(db_session, event_id, "user 2", 600, seat_ids=[2, 3])
+    db_session.rollback()
+
+    assert held_ids == [1, 2]
+    assert [seat.id for seat in get_available_seats(db_session, event_id)] == [3, 4, 5]
+
+
+def test_hold_seats_should_hold_best_available_seats(db_session: Session, event_id: int) -> None:
+    hold_seats(db_session, event_id, "user 1", 600, seat_ids=[2])
+
+    _, held_ids = hold_seats(db_session, event_id, "user 2", 600, quantity=3)
+
+    assert held_ids == [1, 3, 4]
+    with pytest.raises(ReservationConflictError):
+        hold_seats(db_session, event_id, "user 3", 600, quantity=2)
+
+
+def test_hold_seats_should_raise_key_error_for_unknown_event(db_session: Session) -> None:
+    with pytest.raises(KeyError):
+        hold_seats(db_session, 404, "user 1", 600, quantity=1)
+
+
+def test_expired_hold_should_free_seats_and_not_be_confirmed(db_session: Session, event_id: int) -> None:
+    expired_reservation, _ = hold_seats(db_session, event_id, "user 1", -1, seat_ids=[1, 2])
+    db_session.commit()
+
+    reservation, _ = hold_seats(db_session, event_id, "user 2", 600, seat_ids=[2])
+    db_session.commit()
+
+    with pytest.raises(ReservationConflictError, match="expired"):
+        confirm_reservation(db_session, expired_reservation.id, "user 1")
+    db_session.rollback()
+    release_reservation(db_session, expired_reservation.id, "user 1")
+    assert confirm_reservation(db_session, reservation.id, "user 2").status == "confirmed"
+    assert db_session.get(Seat, 2).reservation_id == reservation.id
+    assert db_session.get(Seat, 1).reservation_id is None
+
+
+def test_confirmed_reservation_should_not_be_released(db_session: Session, event_id: int) -> None:
+    reservation, _ = hold_seats(db_session, event_id, "user 1", 600, quantity=2)
+    confirm_reservation(db_session, reservation.id, "user 1")
+
+    with pytest.raises(ReservationConflictError):
+        release_reservation(db_session, reservation.id, "user 1")
+    with pytest.raises(KeyError):
+        confirm_reservation(db_session, reservation.id, "user 2")
+
+
+def test_concurrent_buyers_should_never_share_a_seat(
+    db_session_factory: sessionmaker, db_session: Session, event_id: int
+) -> None:
+    n_seats = 5
+
+    def buy(buyer: int) -> list[int]:
+        rng = random.Random(buyer)
+        with db_session_factory() as session:
+            try:
+                if buyer % 2:
+                    _, seat_ids = hold_seats(session, event_id, f"user {buyer}", 600, quantity=rng.randint(1, 2))
+                else:
+                    wanted = rng.sample(range(1, n_seats + 1), k=rng.randint(1, 2))
+                    _, seat_ids = hold_seats(session, event_id, f"user {buyer}", 600, seat_ids=wanted)
+            except ReservationConflictError:
+                session.rollback()
+                return []
+            session.commit()
+            return seat_ids
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        sold = [seat_id for seat_ids in executor.map(buy, range(200)) for seat_id in seat_ids]
+
+    assert len(sold) == len(set(sold))
+    held = db_session.scalars(select(Seat.id).where(Seat.reservation_id.is_not(None))).all()
+    assert sorted(sold) == sorted(held)
@@ -97,6 +97,10 @@ class TestApp:
         response = client.get("/private")
         assert response.status_code == 200
 
+    def test_get_stats_without_stats_scope_should_return_403(self, client, bearer_token):
+        client.cookies = {"access_token": f'Bearer {bearer_token["access_token"]}'}
+        assert client.get("/stats").status_code == 403
+
     def test_fga_insufficient_scope_should_return_403(
         self, client, existing_venue_id: int, db_session: Session, bearer_token
     ):
@@ -0,0 +1,76 @@
+from sqlalchemy.orm import Session
+
+from in_concert.app.models import (
+    Band,
+    BandListItem,
+    Venue,
+    VenueListItem,
+    bulk_insert,
+    delete_db_entry,
+)
+from in_concert.app.search import search
+
+
+def add_venues(db_session: Session, *names_cities_abouts: tuple[str, str, str]) -> list[int]:
+    rows = [
+        dict(name=name, city=city, about=about, street="street", state="state", zip_code=1, phone=1, manager_id="1")
+        for name, city, about in names_cities_abouts
+    ]
+    return bulk_insert(db_session, Venue, rows)
+
+
+def test_search_should_rank_name_matches_first(db_session: Session) -> None:
+    add_venues(db_session, ("Blue Note", "Berlin", "the best jazz in town"), ("Jazz Keller", "Köln", None))
+
+    venues, next_offset = search(db_session, Venue, "jazz", 0, 10, VenueListItem, max_candidates=100)
+
+    assert [venue.name for venue in venues] == ["Jazz Keller", "Blue Note"]
+    assert next_offset is None
+
+
+def test_search_should_rank_all_matches_before_capping_candidates(db_session: Session) -> None:
+    add_venues(db_session, *((f"Club {i}", "Berlin", "some jazz") for i in range(5)), ("Jazz Keller", "Köln", None))
+
+    venues, next_offset = search(db_session, Venue, "jazz", 0, 1, VenueListItem, max_candidates=2)
+
+    assert [venue.name for venue in venues] == ["Jazz Keller"]
+    assert next_offset == 1
+
+
+def test_search_should_match_all_terms_and_last_term_as_prefix(db_session: Session) -> None:
+    add_venues(db_session, ("Jazz Club", "Berlin", None), ("Jazz Bar", "Hamburg", None), ("Rock Club", "Berlin", None))
+
+    venues, _ = search(db_session, Venue, "JAZZ ber", 0, 10, VenueListItem, max_candidates=100)
+
+    assert [venue.name for venue in venues] == ["Jazz Club"]
+
+
+def test_search_should_paginate_by_offset(db_session: Session) -> None:
+    add_venues(db_session, *((f"venue {i}", "Berlin", None) for i in range(5)))
+
+    first_page, next_offset = search(db_session, Venue, "berlin", 0, 3, VenueListItem, max_candidates=100)
+    second_page, last_offset = search(db_session, Venue, "berlin", next_offset, 3, VenueListItem, max_candidates=100)
+
+    assert next_offset == 3
+    assert [venue.name for venue in first_page + second_page] == [f"venue {i}" for i in range(5)]
+    assert last_offset is None
+
+
+def test_search_index_should_follow_updates_and_deletes(db_session: Session) -> None:
+    band_id = Band(name="Gravel Road", city="Leipzig", manager_id="1").insert(session=db_session)
+    other_band_id = Band(name="Gravel Pit", city="Dresden", manager_id="1").insert(session=db_session)
+
+    db_session.get(Band, band_id).name = "Stone Road"
+    db_session.flush()
+    delete_db_entry(db_session, other_band_id, Band)
+
+    assert search(db_session, Band, "gravel", 0, 10, BandListItem, max_candidates=100) == ([], None)
+    bands, _ = search(db_session, Band, "stone", 0, 10, BandListItem, max_candidates=100)
+    assert [band.id for band in bands] == [band_id]
+
+
+def test_search_should_ignore_query_syntax(db_session: Session) -> None:
+    add_venues(db_session, ("Club", "Berlin", None))
+
+    assert search(db_session, Venue, '"*) OR', 0, 10, VenueListItem, max_candidates=100) == ([], None)
+    assert search(db_session, Venue, "  ", 0, 10, VenueListItem, max_candidates=100) == ([], None)
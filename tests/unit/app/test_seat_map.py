@@ -0,0 +1,61 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import Session, sessionmaker
+
+from in_concert.app.models import Event
+from in_concert.app.reservations import create_event, hold_seats, release_reservation
+from in_concert.app.seat_map import SeatMapCache
+
+
+@pytest.fixture
+def event_id(db_session: Session) -> int:
+    event = Event(name="event", starts_at=datetime(2030, 1, 1), venue_id=1, band_id=1, manager_id="1")
+    event_id = create_event(db_session, event, [f"A{i}" for i in range(1, 11)])
+    db_session.commit()
+    return event_id
+
+
+def available_seat_ids(body: bytes) -> list[int]:
+    seat_map = json.loads(body)
+    bitmap = base64.b64decode(seat_map["available"])
+    ((first_id, last_id),) = seat_map["seat_id_ranges"]
+    return [seat_id for i, seat_id in enumerate(range(first_id, last_id + 1)) if bitmap[i // 8] >> (i % 8) & 1]
+
+
+@pytest.mark.asyncio
+async def test_seat_map_should_be_updated_by_writes(db_session_factory: sessionmaker, event_id: int) -> None:
+    seat_maps = SeatMapCache(db_session_factory)
+    seat_map = await seat_maps.get(event_id)
+    etag = seat_maps.etag(seat_map)
+
+    seat_maps.set_available(event_id, [2, 9], False)
+    seat_maps.release_seats([(event_id, 9), (404, 1)])
+
+    assert await seat_maps.get(event_id) is seat_map
+    assert available_seat_ids(seat_map.to_json()) == [1, 3, 4, 5, 6, 7, 8, 9, 10]
+    assert seat_map.n_available == 9
+    assert seat_maps.etag(seat_map) != etag
+    with pytest.raises(KeyError):
+        await seat_maps.get(404)
+
+
+@pytest.mark.asyncio
+async def test_reconcile_should_pick_up_writes_of_other_processes(
+    db_session_factory: sessionmaker, db_session: Session, event_id: int
+) -> None:
+    seat_maps = SeatMapCache(db_session_factory)
+    await seat_maps.get(event_id)
+    reservation, _ = hold_seats(db_session, event_id, "user 1", 600, seat_ids=[1, 2])
+    hold_seats(db_session, event_id, "user 2", -1, seat_ids=[3])
+    db_session.commit()
+    await seat_maps.reconcile()
+    assert available_seat_ids((await seat_maps.get(event_id)).to_json()) == list(range(3, 11))
+
+    release_reservation(db_session, reservation.id, "user 1")
+    db_session.commit()
+    await seat_maps.reconcile()
+
+    assert available_seat_ids((await seat_maps.get(event_id)).to_json()) == list(range(1, 11))
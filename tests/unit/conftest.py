@@ -1,8 +1,8 @@
-from typing import Iterator
+from typing import Iterator, Optional
 from unittest import mock
 
 import pytest
-from fastapi import Response
+from fastapi import FastAPI, Response
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import Session, sessionmaker
@@ -11,18 +11,42 @@ from in_concert.app.app_factory import AppFactory
 from in_concert.app.models import Base
 from in_concert.dependencies.db_session import DBSessionDependency
 from in_concert.settings import AppSettings, AppSettingsTest
-from tests.setup import get_bearer_token
+from tests.setup import LocalTokenIssuer, get_bearer_token, trust_token_issuer
+from tests.stubs.fga_server import create_fga_stub_app
+from tests.stubs.server import serve_in_thread, stand_in_settings
+
+
+@pytest.fixture(scope="session")
+def fga_stub_app() -> FastAPI:
+    return create_fga_stub_app()
+
+
+@pytest.fixture(scope="session")
+def fga_stub_url(fga_stub_app) -> Iterator[Optional[str]]:
+    """Serve the fga stand-in for the whole session, unless the test settings ask for the remote fga."""
+    if not AppSettingsTest().use_stand_ins:
+        yield None
+        return
+    with serve_in_thread(fga_stub_app) as fga_stub_url:
+        yield fga_stub_url
 
 
 @pytest.fixture
-def app_settings_test() -> AppSettings:
-    app_settings_test = AppSettingsTest()
+def app_settings_test(fga_stub_app, fga_stub_url) -> AppSettings:
+    fga_stub_app.state.tuples.clear()
+    app_settings_test = stand_in_settings(AppSettingsTest(), fga_url=fga_stub_url)
     return app_settings_test
 
 
+@pytest.fixture(scope="session")
+def token_issuer() -> Optional[LocalTokenIssuer]:
+    app_settings_test = AppSettingsTest()
+    return LocalTokenIssuer(app_settings_test) if app_settings_test.use_stand_ins else None
+
+
 @pytest.fixture()
-def bearer_token(app_settings_test) -> dict:
-    return get_bearer_token(app_settings_test)
+def bearer_token(app_settings_test, token_issuer) -> dict:
+    return get_bearer_token(app_settings_test, token_issuer)
 
 
 @pytest.fixture()
@@ -64,18 +88,20 @@ def response_obj(self):
 
 
 @pytest.fixture
-def client(app_settings_test, engine):
+def client(app_settings_test, engine, token_issuer):
     app_factory = AppFactory()
     app_factory.configure(app_settings_test)
+    trust_token_issuer(app_factory, token_issuer)
     app = app_factory.create_app(app_settings_test, engine=engine)
     return TestClient(app)
 
 
 @pytest.fixture
-def client_no_auth_checks(app_settings_test, engine):
+def client_no_auth_checks(app_settings_test, engine, token_issuer):
     """A test client where all security dependencies are overridden or mocked."""
     app_factory = AppFactory()
     app_factory.configure(app_settings_test)
+    trust_token_issuer(app_factory, token_issuer)
     app_factory.user_oauth_integrator.user_authorizer_fga.add_permissions = mock.AsyncMock(return_value=True)
     app_factory.user_oauth_integrator.user_authorizer_fga.remove_permissions = mock.AsyncMock()
     app = app_factory.create_app(app_settings_test, engine=engine, override_security_dependencies=True)
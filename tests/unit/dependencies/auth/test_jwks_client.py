@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+import httpx
+import jwt
+import pytest
+import pytest_asyncio
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from in_concert.dependencies.auth.jwks_client import AsyncJWKSClient
+from tests.stubs.jwks_server import create_jwks_stub_app
+
+JWKS_URL = "http://auth.local/.well-known/jwks.json"
+
+
+def create_jwk(kid: str) -> tuple[rsa.RSAPrivateKey, dict]:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    return private_key, {**public_jwk, "kid": kid, "alg": "RS256", "use": "sig"}
+
+
+class TestAsyncJWKSClient:
+    @pytest.fixture(scope="class")
+    def signing_keys(self) -> dict:
+        return {kid: create_jwk(kid) for kid in ("key_1", "key_2")}
+
+    @pytest.fixture
+    def jwks_stub_app(self, signing_keys):
+        return create_jwks_stub_app({"keys": [signing_keys["key_1"][1]]})
+
+    @pytest_asyncio.fixture
+    async def jwks_client(self, jwks_stub_app):
+        async with httpx.AsyncClient(app=jwks_stub_app) as http_client:
+            jwks_client = AsyncJWKSClient(JWKS_URL, http_client=http_client)
+            await jwks_client.start()
+            yield jwks_client
+            await jwks_client.stop()
+
+    @pytest.mark.asyncio
+    async def test_start_should_load_keys(self, jwks_client, jwks_stub_app):
+        assert set(jwks_client.signing_keys) == {"key_1"}
+        assert jwks_stub_app.state.jwks_requests == 1
+
+    @pytest.mark.asyncio
+    async def test_get_signing_key_from_jwt_should_return_key_matching_kid(self, jwks_client, signing_keys):
+        token = jwt.encode({"sub": "auth0|1"}, signing_keys["key_1"][0], algorithm="RS256", headers={"kid": "key_1"})
+        signing_key = await jwks_client.get_signing_key_from_jwt(token)
+        assert jwt.decode(token, signing_key.key, algorithms=["RS256"]) == {"sub": "auth0|1"}
+
+    @pytest.mark.asyncio
+    async def test_unknown_kid_should_trigger_one_shared_refetch(self, jwks_client, jwks_stub_app, signing_keys):
+        jwks_client.min_refetch_interval = 0
+        jwks_stub_app.state.jwks = {"keys": [signing_keys["key_1"][1], signing_keys["key_2"][1]]}
+
+        signing_key_list = await asyncio.gather(*(jwks_client.get_signing_key("key_2") for _ in range(50)))
+
+        assert all(signing_key.key_id == "key_2" for signing_key in signing_key_list)
+        assert jwks_stub_app.state.jwks_requests == 2
+
+    @pytest.mark.asyncio
+    async def test_unknown_kid_should_raise_and_refetch_at_most_once_per_interval(self, jwks_stub_app):
+        async with httpx.AsyncClient(app=jwks_stub_app) as http_client:
+            jwks_client = AsyncJWKSClient(JWKS_URL, http_client=http_client, min_refetch_interval=60)
+            for _ in range(3):
+                with pytest.raises(jwt.PyJWKClientError):
+                    await jwks_client.get_signing_key("unknown_key")
+        assert jwks_stub_app.state.jwks_requests == 1
+
+    @pytest.mark.asyncio
+    async def test_keys_should_be_fetched_on_demand_if_not_started(self, jwks_stub_app):
+        async with httpx.AsyncClient(app=jwks_stub_app) as http_client:
+            jwks_client = AsyncJWKSClient(JWKS_URL, http_client=http_client)
+            signing_key = await jwks_client.get_signing_key("key_1")
+        assert signing_key.key_id == "key_1"
+
+    @pytest.mark.asyncio
+    async def test_max_age_should_set_refresh_interval(self, signing_keys):
+        jwks_stub_app = create_jwks_stub_app({"keys": [signing_keys["key_1"][1]]}, max_age=60)
+        async with httpx.AsyncClient(app=jwks_stub_app) as http_client:
+            jwks_client = AsyncJWKSClient(JWKS_URL, http_client=http_client, refresh_interval=600)
+            await jwks_client.start()
+            await jwks_client.stop()
+        assert jwks_client._expires_in == 60
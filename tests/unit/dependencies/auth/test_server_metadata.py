@@ -0,0 +1,82 @@
+import httpx
+import pytest
+import pytest_asyncio
+from authlib.integrations.starlette_client import OAuth
+
+from in_concert.dependencies.auth.server_metadata import ServerMetadataClient
+from in_concert.dependencies.http_transport import SharedTransport
+from tests.stubs.oidc_server import create_oidc_stub_app
+
+ISSUER = "http://auth.local"
+METADATA_URL = f"{ISSUER}/.well-known/openid-configuration"
+
+
+class TestServerMetadataClient:
+    @pytest.fixture
+    def oidc_stub_app(self):
+        return create_oidc_stub_app(ISSUER, max_age=60)
+
+    @pytest.fixture
+    def http_transport(self, oidc_stub_app):
+        return SharedTransport(transport=httpx.ASGITransport(app=oidc_stub_app))
+
+    @pytest.fixture
+    def oauth_app(self, http_transport):
+        oauth = OAuth()
+        oauth.register(
+            name="auth0",
+            server_metadata_url=METADATA_URL,
+            client_id="client id",
+            client_secret="client secret",
+            client_kwargs={"transport": http_transport},
+            audience="audience",
+        )
+        return oauth.auth0
+
+    @pytest_asyncio.fixture
+    async def server_metadata_client(self, http_transport, oauth_app):
+        async with httpx.AsyncClient(transport=http_transport) as http_client:
+            server_metadata_client = ServerMetadataClient(METADATA_URL, http_client=http_client)
+            server_metadata_client.attach(oauth_app)
+            await server_metadata_client.start()
+            yield server_metadata_client
+            await server_metadata_client.stop()
+
+    @pytest.mark.asyncio
+    async def test_start_should_load_metadata_into_oauth_app(self, server_metadata_client, oauth_app, oidc_stub_app):
+        server_metadata = await oauth_app.load_server_metadata()
+
+        assert server_metadata["token_endpoint"] == f"{ISSUER}/oauth/token"
+        assert server_metadata["audience"] == "audience"
+        assert oidc_stub_app.state.metadata_requests == 1
+        assert server_metadata_client._expires_in == 60
+
+    @pytest.mark.asyncio
+    async def test_refresh_should_update_oauth_app(self, server_metadata_client, oauth_app, oidc_stub_app):
+        oidc_stub_app.state.metadata = {**oidc_stub_app.state.metadata, "token_endpoint": f"{ISSUER}/v2/token"}
+
+        await server_metadata_client.fetch()
+
+        assert (await oauth_app.load_server_metadata())["token_endpoint"] == f"{ISSUER}/v2/token"
+        assert oidc_stub_app.state.metadata_requests == 2
+
+    @pytest.mark.asyncio
+    async def test_token_exchanges_should_share_the_transport(self, server_metadata_client, oauth_app, oidc_stub_app):
+        for code in ("code 1", "code 2"):
+            token = await oauth_app.fetch_access_token(code=code, redirect_uri="http://in-concert/callback")
+            assert token["access_token"] == f"access token for {code}"
+
+        # closing the per call clients of authlib leaves the shared transport usable
+        assert oidc_stub_app.state.token_requests == 2
+        assert oidc_stub_app.state.metadata_requests == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_start_should_leave_loading_to_authlib(self, oauth_app, oidc_stub_app):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(503))) as client:
+            server_metadata_client = ServerMetadataClient(METADATA_URL, http_client=client)
+            server_metadata_client.attach(oauth_app)
+            await server_metadata_client.start()
+            await server_metadata_client.stop()
+
+        assert (await oauth_app.load_server_metadata())["token_endpoint"] == f"{ISSUER}/oauth/token"
+        assert oidc_stub_app.state.metadata_requests == 1
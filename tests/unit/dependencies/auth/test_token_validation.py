@@ -1,8 +1,10 @@
+import time
 from unittest import mock
 
 import pytest
 from fastapi import HTTPException, Response
 
+from in_concert.cache import TTLCache
 from in_concert.dependencies.auth.token_validation import (
     HTTPBearerWithCookie,
     JwkTokenVerifier,
@@ -81,18 +83,43 @@ class TestJwkTokenVerifier:
     @pytest.fixture
     def jwks_client(self):
         jwks_client = mock.MagicMock()
-        jwks_client.get_signing_key_from_jwt.return_value = mock.MagicMock(return_value=mock.MagicMock(key="valid_key"))
+        jwks_client.get_signing_key_from_jwt = mock.AsyncMock(return_value=mock.MagicMock(key="valid_key"))
         return jwks_client
 
     @pytest.fixture
     def decoder(self):
         return mock.MagicMock(return_value={"payload": "valid_payload"})
 
-    def test_valid_token_should_return_payload(self, settings, jwks_client, decoder):
+    @pytest.mark.asyncio
+    async def test_valid_token_should_return_payload(self, settings, jwks_client, decoder):
         token_verifier = JwkTokenVerifier(settings, jwks_client, decoder=decoder)
 
-        payload = token_verifier.verify("valid_token")
+        payload = await token_verifier.verify("valid_token")
         jwks_client.get_signing_key_from_jwt.assert_called_once_with("valid_token")
 
         decoder.assert_called_once()
         assert payload == {"payload": "valid_payload"}
+
+    @pytest.mark.asyncio
+    async def test_verified_payload_should_be_served_from_cache_until_expiry(self, settings, jwks_client):
+        decoder = mock.MagicMock(return_value={"sub": "auth0|1", "exp": time.time() + 60})
+        payload_cache = TTLCache(maxsize=10, ttl=3600)
+        token_verifier = JwkTokenVerifier(settings, jwks_client, decoder=decoder, payload_cache=payload_cache)
+
+        first_payload = await token_verifier.verify("valid_token")
+        second_payload = await token_verifier.verify("valid_token")
+
+        assert first_payload == second_payload
+        decoder.assert_called_once()
+        assert payload_cache.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_or_non_expiring_payload_should_not_be_cached(self, settings, jwks_client):
+        decoder = mock.MagicMock(side_effect=[{"sub": "auth0|1", "exp": time.time() - 1}, {"sub": "auth0|1"}])
+        payload_cache = TTLCache(maxsize=10, ttl=3600)
+        token_verifier = JwkTokenVerifier(settings, jwks_client, decoder=decoder, payload_cache=payload_cache)
+
+        await token_verifier.verify("expired_token")
+        await token_verifier.verify("non_expiring_token")
+
+        assert len(payload_cache) == 0
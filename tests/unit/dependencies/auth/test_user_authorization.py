@@ -1,12 +1,16 @@
+import asyncio
+import concurrent.futures
+import threading
 from unittest import mock
 
 import jwt
 import pytest
-from fastapi import HTTPException
+from fastapi import HTTPException, Request
 from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.exc import IntegrityError
 
 from in_concert.app.models import User
+from in_concert.cache import TTLCache
 from in_concert.dependencies.auth.user_authorization import (
     UserAuthorizerFGA,
     UserAuthorizerJWT,
@@ -29,25 +33,25 @@ class TestUserAuthorizerJWT:
 
     @pytest.fixture
     def token_verifier(self):
-        token_verifier = mock.MagicMock()
+        token_verifier = mock.AsyncMock()
         token_verifier.verify.return_value = {"sub": "auth0|1234567890"}
         return token_verifier
 
     @pytest.fixture
     def token_verifier_create_venue_permission(self):
-        token_verifier = mock.MagicMock()
+        token_verifier = mock.AsyncMock()
         token_verifier.verify.return_value = {"sub": "auth0|1234567890", "permissions": ["create:venues"]}
         return token_verifier
 
     @pytest.fixture
     def token_verifier_decode_error(self):
-        token_verifier = mock.MagicMock()
+        token_verifier = mock.AsyncMock()
         token_verifier.verify.side_effect = jwt.DecodeError("Invalid token")
         return token_verifier
 
     @pytest.fixture
     def token_verifier_missing_id_key(self):
-        token_verifier = mock.MagicMock()
+        token_verifier = mock.AsyncMock()
         token_verifier.verify.return_value = {"not_id": "123"}
         return token_verifier
 
@@ -130,6 +134,18 @@ class TestUserAuthorizerJWT:
             _ = await user_authorizer.get_current_user_id(request_obj)
             assert excinfo.status_code == 401
 
+    @pytest.mark.asyncio
+    async def test_payload_should_be_verified_once_per_request(
+        self, token_verifier_create_venue_permission, bearer, security_scopes_create_venue
+    ):
+        user_authorizer = UserAuthorizerJWT(token_verifier_create_venue_permission, bearer)
+        request = Request({"type": "http", "headers": []})
+
+        assert await user_authorizer.is_authorized_current_user(request, scopes=security_scopes_create_venue)
+        assert await user_authorizer.get_current_user_id(request) == "auth0|1234567890"
+
+        token_verifier_create_venue_permission.verify.assert_called_once_with("valid_token")
+
 
 class TestUserOAUth2Integrator:
     @pytest.fixture
@@ -229,3 +245,206 @@ class TestUserOAUth2Integrator:
             user = db_session.get(User, "auth0|1")
             assert user
             assert user.id == "auth0|1"
+
+    @pytest.mark.asyncio
+    async def test_sync_current_user_should_skip_db_for_known_user(
+        self, user_authorizer, request_obj, db_session, user_authorizer_fga
+    ):
+        known_users = TTLCache(maxsize=10, ttl=60)
+        user_integrator = UserOAuth2Integrator(user_authorizer, User, user_authorizer_fga, known_users=known_users)
+        _ = await user_integrator.sync_current_user(request=request_obj, db_session=db_session)
+
+        with mock.patch.object(User, "insert_if_missing") as insert_if_missing:
+            _ = await user_integrator.sync_current_user(request=request_obj, db_session=db_session)
+
+        insert_if_missing.assert_not_called()
+        assert known_users.get("auth0|1")
+        with db_session:
+            assert db_session.get(User, "auth0|1")
+
+
+class TestUserAuthorizerFGA:
+    @pytest.fixture
+    def user_authorizer_jwt(self) -> UserAuthorizerJWT:
+        user_authorizer_jwt = mock.AsyncMock()
+        user_authorizer_jwt.get_current_user_id = mock.AsyncMock(return_value="auth0|1")
+        return user_authorizer_jwt
+
+    @pytest.fixture
+    def fga_client_class(self):
+        with mock.patch("in_concert.dependencies.auth.user_authorization.OpenFgaClient") as fga_client_class:
+            fga_client_class.return_value.check = mock.AsyncMock(return_value=mock.MagicMock(allowed=True))
+            fga_client_class.return_value.write = mock.AsyncMock()
+            fga_client_class.return_value.close = mock.AsyncMock()
+            yield fga_client_class
+
+    @pytest.fixture
+    def security_scopes_can_delete_venue(self):
+        return mock.MagicMock(scopes=["can_delete:venue"])
+
+    @pytest.mark.asyncio
+    async def test_fga_calls_should_share_one_client(
+        self, fga_client_class, user_authorizer_jwt, request_obj, security_scopes_can_delete_venue
+    ):
+        user_authorizer_fga = UserAuthorizerFGA(mock.MagicMock(), user_authorizer_jwt)
+        await user_authorizer_fga.open()
+
+        await user_authorizer_fga.add_permissions(request_obj, ["can_delete", "can_update"], "venue", 1)
+        assert await user_authorizer_fga.is_authorized_current_user(request_obj, security_scopes_can_delete_venue, 1)
+        await user_authorizer_fga.remove_permissions(request_obj, "venue", 1, ["can_delete", "can_update"])
+
+        fga_client_class.assert_called_once()
+        fga_client_class.return_value.close.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_fga_client_should_be_opened_lazily(
+        self, fga_client_class, user_authorizer_jwt, request_obj, security_scopes_can_delete_venue
+    ):
+        user_authorizer_fga = UserAuthorizerFGA(mock.MagicMock(), user_authorizer_jwt)
+        assert await user_authorizer_fga.is_authorized_current_user(request_obj, security_scopes_can_delete_venue, 1)
+        fga_client_class.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_client_of_another_running_loop_should_be_closed_there_and_replaced(
+        self, fga_client_class, user_authorizer_jwt, request_obj, security_scopes_can_delete_venue
+    ):
+        other_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=other_loop.run_forever)
+        thread.start()
+        try:
+            user_authorizer_fga = UserAuthorizerFGA(mock.MagicMock(), user_authorizer_jwt)
+            asyncio.run_coroutine_threadsafe(user_authorizer_fga.open(), other_loop).result()
+
+            assert await user_authorizer_fga.is_authorized_current_user(
+                request_obj, security_scopes_can_delete_venue, 1
+            )
+            asyncio.run_coroutine_threadsafe(asyncio.sleep(0), other_loop).result()
+        finally:
+            other_loop.call_soon_threadsafe(other_loop.stop)
+            thread.join()
+            other_loop.close()
+
+        assert fga_client_class.call_count == 2
+        fga_client_class.return_value.close.assert_awaited_once()
+        assert user_authorizer_fga._fga_client_loop is asyncio.get_running_loop()
+
+    @pytest.mark.asyncio
+    async def test_client_of_closed_loop_should_be_dropped_with_warning(
+        self, fga_client_class, user_authorizer_jwt, request_obj, security_scopes_can_delete_venue, caplog
+    ):
+        user_authorizer_fga = UserAuthorizerFGA(mock.MagicMock(), user_authorizer_jwt)
+        await asyncio.to_thread(asyncio.run, user_authorizer_fga.open())
+
+        assert await user_authorizer_fga.is_authorized_current_user(request_obj, security_scopes_can_delete_venue, 1)
+
+        assert fga_client_class.call_count == 2
+        fga_client_class.return_value.close.assert_not_awaited()
+        assert "Dropped the fga client of a closed event loop" in caplog.text
+
+    def test_failed_close_on_another_loop_should_be_logged(self, user_authorizer_jwt, caplog):
+        user_authorizer_fga = UserAuthorizerFGA(mock.MagicMock(), user_authorizer_jwt)
+        closing = concurrent.futures.Future()
+        closing.set_exception(RuntimeError("session gone"))
+
+        user_authorizer_fga._log_close_error(closing)
+
+        assert "Could not close the fga client of another event loop: session gone" in caplog.text
+
+    @pytest.mark.asyncio
+    async def test_close_should_close_shared_client(self, fga_client_class, user_authorizer_jwt):
+        user_authorizer_fga = UserAuthorizerFGA(mock.MagicMock(), user_authorizer_jwt)
+        await user_authorizer_fga.open()
+        await user_authorizer_fga.close()
+
+        fga_client_class.return_value.close.assert_awaited_once()
+        assert user_authorizer_fga.fga_client is None
+
+    @pytest.mark.asyncio
+    async def test_add_permissions_should_write_all_relations_at_once(
+        self, fga_client_class, user_authorizer_jwt, request_obj
+    ):
+        user_authorizer_fga = UserAuthorizerFGA(mock.MagicMock(), user_authorizer_jwt)
+        await user_authorizer_fga.add_permissions(request_obj, ["can_delete", "can_update"], "venue", 1)
+
+        fga_client_class.return_value.write.assert_awaited_once()
+        body = fga_client_class.return_value.write.call_args.args[0]
+        assert [(t.user, t.relation, t.object) for t in body.writes] == [
+            ("user:auth0|1", "can_delete", "venue:1"),
+            ("user:auth0|1", "can_update", "venue:1"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_remove_permissions_should_delete_all_relations_at_once(
+        self, fga_client_class, user_authorizer_jwt, request_obj
+    ):
+        user_authorizer_fga = UserAuthorizerFGA(mock.MagicMock(), user_authorizer_jwt)
+        await user_authorizer_fga.remove_permissions(request_obj, "venue", 1, ["can_delete", "can_update"])
+
+        fga_client_class.return_value.write.assert_awaited_once()
+        body = fga_client_class.return_value.write.call_args.args[0]
+        assert len(body.deletes) == 2
+        assert not body.writes
+
+    @pytest.mark.asyncio
+    async def test_add_permission_tuples_should_write_in_chunks(self, fga_client_class, user_authorizer_jwt):
+        user_authorizer_fga = UserAuthorizerFGA(mock.MagicMock(), user_authorizer_jwt, max_tuples_per_write=10)
+        permission_tuples = [("user:auth0|1", "can_delete", f"venue:{venue_id}") for venue_id in range(25)]
+
+        await user_authorizer_fga.add_permission_tuples(permission_tuples)
+
+        write_calls = fga_client_class.return_value.write.call_args_list
+        assert [len(write_call.args[0].writes) for write_call in write_calls] == [10, 10, 5]
+
+    @pytest.mark.asyncio
+    async def test_read_permission_tuples_should_follow_continuation_tokens(
+        self, fga_client_class, user_authorizer_jwt
+    ):
+        def page(objects: list[str], continuation_token: str) -> mock.MagicMock:
+            tuples = [
+                mock.MagicMock(key=mock.MagicMock(user="user:auth0|1", relation="owner", object=o)) for o in objects
+            ]
+            return mock.MagicMock(tuples=tuples, continuation_token=continuation_token)
+
+        fga_client_class.return_value.read = mock.AsyncMock(
+            side_effect=[page(["venue:1", "venue:2"], "next"), page(["band:1"], "")]
+        )
+        user_authorizer_fga = UserAuthorizerFGA(mock.MagicMock(), user_authorizer_jwt)
+
+        pages = [permission_tuples async for permission_tuples in user_authorizer_fga.read_permission_tuples(2)]
+
+        assert pages == [
+            [("user:auth0|1", "owner", "venue:1"), ("user:auth0|1", "owner", "venue:2")],
+            [("user:auth0|1", "owner", "band:1")],
+        ]
+        read_calls = fga_client_class.return_value.read.call_args_list
+        assert [read_call.args[1].get("continuation_token") for read_call in read_calls] == [None, "next"]
+
+    @pytest.mark.asyncio
+    async def test_repeated_check_should_be_served_from_check_cache(
+        self, fga_client_class, user_authorizer_jwt, request_obj, security_scopes_can_delete_venue
+    ):
+        check_cache = TTLCache(maxsize=10, ttl=60)
+        user_authorizer_fga = UserAuthorizerFGA(mock.MagicMock(), user_authorizer_jwt, check_cache=check_cache)
+
+        assert await user_authorizer_fga.is_authorized_current_user(request_obj, security_scopes_can_delete_venue, 1)
+        assert await user_authorizer_fga.is_authorized_current_user(request_obj, security_scopes_can_delete_venue, 1)
+
+        fga_client_class.return_value.check.assert_awaited_once()
+        assert check_cache.hits == 1
+        assert check_cache.misses == 1
+
+    @pytest.mark.asyncio
+    async def test_permission_writes_should_invalidate_check_cache(
+        self, fga_client_class, user_authorizer_jwt, request_obj, security_scopes_can_delete_venue
+    ):
+        check_cache = TTLCache(maxsize=10, ttl=60)
+        user_authorizer_fga = UserAuthorizerFGA(mock.MagicMock(), user_authorizer_jwt, check_cache=check_cache)
+        fga_client_class.return_value.check.return_value = mock.MagicMock(allowed=False)
+        with pytest.raises(HTTPException):
+            await user_authorizer_fga.is_authorized_current_user(request_obj, security_scopes_can_delete_venue, 1)
+
+        await user_authorizer_fga.add_permissions(request_obj, ["can_delete"], "venue", 1)
+        fga_client_class.return_value.check.return_value = mock.MagicMock(allowed=True)
+
+        assert await user_authorizer_fga.is_authorized_current_user(request_obj, security_scopes_can_delete_venue, 1)
+        assert fga_client_class.return_value.check.await_count == 2
@@ -0,0 +1,109 @@
+import pytest
+from pydantic import SecretStr
+from sqlalchemy import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from in_concert.app.models import Base, User
+from in_concert.dependencies.db_session import (
+    AsyncDBSessionDependency,
+    DBSessionDependency,
+    create_db_engine,
+    create_db_session_dependency,
+    get_db_request_stats,
+    run_in_session,
+)
+
+
+def test_create_db_engine_should_create_async_engine_if_db_async(app_settings_test):
+    app_settings = app_settings_test.model_copy(
+        update={"db_connection_string": SecretStr("sqlite+aiosqlite://"), "db_async": True}
+    )
+    assert isinstance(create_db_engine(app_settings), AsyncEngine)
+
+
+def test_create_db_engine_should_create_sync_engine_by_default(app_settings_test):
+    assert isinstance(create_db_engine(app_settings_test), Engine)
+
+
+def test_create_db_session_dependency_should_match_engine(engine):
+    assert isinstance(create_db_session_dependency(engine), DBSessionDependency)
+    assert isinstance(
+        create_db_session_dependency(create_async_engine("sqlite+aiosqlite://")), AsyncDBSessionDependency
+    )
+
+
+@pytest.mark.asyncio
+async def test_run_in_session_should_run_with_sync_session(db_session: Session):
+    user_id = await run_in_session(db_session, User(id="auth0|1").insert)
+    assert user_id == "auth0|1"
+
+
+@pytest.mark.asyncio
+async def test_run_in_session_should_run_with_async_session(tmp_path):
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'in_concert.db'}")
+    async with async_engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    async with AsyncSession(async_engine) as async_session:
+        user_id = await run_in_session(async_session, User(id="auth0|1").insert)
+        user = await run_in_session(async_session, Session.get, User, "auth0|1")
+    await async_engine.dispose()
+
+    assert user_id == "auth0|1"
+    assert user.id == "auth0|1"
+
+
+async def finish(dependency_generator) -> None:
+    with pytest.raises(StopAsyncIteration):
+        await dependency_generator.__anext__()
+
+
+@pytest.mark.asyncio
+async def test_db_session_dependency_should_use_one_transaction_and_checkout_per_request(engine, db_session):
+    Base.metadata.create_all(engine)
+    dependency_generator = DBSessionDependency(engine)()
+    session = await dependency_generator.__anext__()
+
+    await run_in_session(session, User(id="auth0|1").insert)
+    await run_in_session(session, User(id="auth0|2").insert)
+    await run_in_session(session, Session.get, User, "auth0|1")
+    await finish(dependency_generator)
+
+    stats = get_db_request_stats(session)
+    assert (stats.pool_checkouts, stats.transactions) == (1, 1)
+    assert db_session.get(User, "auth0|2")
+
+
+@pytest.mark.asyncio
+async def test_db_session_dependency_should_roll_back_if_endpoint_raises(engine, db_session):
+    Base.metadata.create_all(engine)
+    dependency_generator = DBSessionDependency(engine)()
+    session = await dependency_generator.__anext__()
+
+    await run_in_session(session, User(id="auth0|1").insert)
+    with pytest.raises(ValueError):
+        await dependency_generator.athrow(ValueError("endpoint failed"))
+
+    assert db_session.get(User, "auth0|1") is None
+
+
+@pytest.mark.asyncio
+async def test_async_db_session_dependency_should_use_one_transaction_and_checkout_per_request(tmp_path):
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'in_concert.db'}")
+    async with async_engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    dependency_generator = AsyncDBSessionDependency(async_engine)()
+    session = await dependency_generator.__anext__()
+
+    await run_in_session(session, User(id="auth0|1").insert)
+    await run_in_session(session, Session.get, User, "auth0|1")
+    await finish(dependency_generator)
+
+    async with AsyncSession(async_engine) as async_session:
+        user = await async_session.get(User, "auth0|1")
+    await async_engine.dispose()
+
+    stats = get_db_request_stats(session)
+    assert (stats.pool_checkouts, stats.transactions) == (1, 1)
+    assert user
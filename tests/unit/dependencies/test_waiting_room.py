@@ -0,0 +1,100 @@
+from unittest import mock
+
+import pytest
+from fastapi import HTTPException
+
+from in_concert.dependencies.waiting_room import QUEUE_TOKEN_HEADER, WaitingRoom
+
+
+class TestWaitingRoom:
+    @pytest.fixture
+    def now(self) -> list[float]:
+        return [0.0]
+
+    @pytest.fixture
+    def user_authorizer_jwt(self):
+        user_authorizer_jwt = mock.AsyncMock()
+        user_authorizer_jwt.get_current_user_id.side_effect = lambda request: request.headers["user"]
+        return user_authorizer_jwt
+
+    @pytest.fixture
+    def waiting_room(self, user_authorizer_jwt, now) -> WaitingRoom:
+        return WaitingRoom(
+            user_authorizer_jwt,
+            secret_key="secret",
+            admission_rate=2,
+            burst=2,
+            max_queue_length=3,
+            token_ttl=60,
+            clock=lambda: now[0],
+        )
+
+    @staticmethod
+    def request(user: str, token: str = None):
+        headers = {"user": user}
+        if token is not None:
+            headers[QUEUE_TOKEN_HEADER] = token
+        return mock.MagicMock(headers=headers)
+
+    @pytest.mark.asyncio
+    async def test_admit_should_admit_burst_then_shed_with_retry_after(self, waiting_room):
+        assert await waiting_room.admit(self.request("1"), "1")
+        assert await waiting_room.admit(self.request("2"), "2")
+
+        with pytest.raises(HTTPException) as excinfo:
+            await waiting_room.admit(self.request("3"), "3")
+
+        assert excinfo.value.status_code == 429
+        assert excinfo.value.headers["Retry-After"] == "1"
+        assert waiting_room.stats() == {"waiting": 0, "admitted": 2, "shed": 1}
+
+    @pytest.mark.asyncio
+    async def test_queue_tickets_should_be_admitted_in_order_at_the_admission_rate(self, waiting_room, now):
+        waiting_room.bucket.take_up_to(2)
+        tickets = [await waiting_room.join(self.request(user)) for user in ("1", "2", "3")]
+
+        assert [ticket.position for ticket in tickets] == [1, 2, 3]
+        assert [ticket.retry_after for ticket in tickets] == [1, 1, 2]
+        with pytest.raises(HTTPException) as excinfo:
+            await waiting_room.join(self.request("4"))
+        assert excinfo.value.status_code == 429
+
+        now[0] = 1.0
+        assert await waiting_room.admit(self.request("1", tickets[0].token), "1")
+        assert (await waiting_room.get_position(self.request("3", tickets[2].token))).position == 1
+        with pytest.raises(HTTPException) as excinfo:
+            await waiting_room.admit(self.request("3", tickets[2].token), "3")
+        assert excinfo.value.status_code == 429
+        assert waiting_room.stats()["waiting"] == 1
+
+    @pytest.mark.asyncio
+    async def test_queue_token_should_be_bound_to_its_user(self, waiting_room):
+        ticket = await waiting_room.join(self.request("1"))
+
+        with pytest.raises(HTTPException) as excinfo:
+            await waiting_room.admit(self.request("2", ticket.token), "2")
+
+        assert excinfo.value.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_queue_token_should_admit_once(self, waiting_room, now):
+        waiting_room.bucket.take_up_to(2)
+        ticket = await waiting_room.join(self.request("1"))
+        now[0] = 1.0
+
+        assert await waiting_room.admit(self.request("1", ticket.token), "1")
+        with pytest.raises(HTTPException) as excinfo:
+            await waiting_room.admit(self.request("1", ticket.token), "1")
+
+        assert excinfo.value.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_join_should_return_the_unused_ticket_of_the_user(self, waiting_room, now):
+        waiting_room.bucket.take_up_to(2)
+        ticket = await waiting_room.join(self.request("1"))
+
+        assert await waiting_room.join(self.request("1")) == ticket
+        assert waiting_room.stats()["waiting"] == 1
+
+        now[0] = 61.0
+        assert (await waiting_room.join(self.request("1"))).token != ticket.token
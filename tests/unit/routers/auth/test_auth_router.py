@@ -2,6 +2,7 @@ from unittest import mock
 
 import pytest
 from authlib.integrations.starlette_client import OAuth
+from fastapi import FastAPI
 from fastapi.responses import Response
 from fastapi.testclient import TestClient
 
@@ -39,7 +40,10 @@ class TestAuthRouter:
         router = create_router(
             app_settings_test, oauth=oauth, user_oauth_integrator=user_oauth_integrator, db_session_dep=db_session_dep
         )
-        return TestClient(router)
+        # dependencies with yield, like the db session, need the exit stack of an app
+        app = FastAPI()
+        app.include_router(router)
+        return TestClient(app)
 
     def test_login(self, client):
         response = client.get("/login")
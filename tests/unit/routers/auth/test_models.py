@@ -1,6 +1,14 @@
 from sqlalchemy.orm import Session
 
-from in_concert.app.models import User
+from in_concert.app.models import (
+    GENRE_NAME_MAX_LENGTH,
+    Band,
+    BandListItem,
+    Genre,
+    User,
+    bulk_insert,
+    get_page,
+)
 
 
 def test_insert_user_should_add_user_to_db(db_session: Session) -> None:
@@ -13,3 +21,53 @@ def test_insert_user_should_add_user_to_db(db_session: Session) -> None:
     assert user_from_db
     assert user_from_db.id
     assert user_from_db.id == "oauth2|1234567890"
+
+
+def test_insert_user_if_missing_should_skip_existing_user(db_session: Session) -> None:
+    assert User.insert_if_missing(db_session, "oauth2|1")
+    assert not User.insert_if_missing(db_session, "oauth2|1")
+
+    db_session.commit()
+    assert db_session.get(User, "oauth2|1")
+
+
+def test_get_page_should_load_read_model_without_tracking(db_session: Session) -> None:
+    db_session.add_all(Band(name=f"band {i}", manager_id="1") for i in range(3))
+    db_session.commit()
+
+    bands, next_cursor = get_page(db_session, Band, after=1, limit=1, read_model=BandListItem)
+
+    assert bands == [BandListItem(id=2, name="band 1", image_link=None, city=None, genres=None)]
+    assert next_cursor == 2
+    assert not hasattr(bands[0], "__dict__")
+    assert not any(isinstance(entry, Band) for entry in db_session.identity_map.values())
+
+
+def test_insert_should_tag_normalized_genres(db_session: Session) -> None:
+    band_id = Band(name="band", genres="Rock, jazz ,rock", manager_id="1").insert(session=db_session)
+    bulk_insert(db_session, Band, [{"name": "other band", "genres": "rock, Pop", "manager_id": "1"}])
+
+    band = db_session.get(Band, band_id)
+    assert sorted(genre.name for genre in band.genre_tags) == ["jazz", "rock"]
+    assert db_session.query(Genre).count() == 3
+
+
+def test_insert_should_truncate_genre_names_to_genre_column(db_session: Session) -> None:
+    genres = "Progressive psychedelic space rock, progressive psychedelic space rock band, x"
+    band_id = Band(name="band", genres=genres, manager_id="1").insert(session=db_session)
+
+    band = db_session.get(Band, band_id)
+    assert sorted(genre.name for genre in band.genre_tags) == ["progressive psychedelic space", "x"]
+    assert all(len(genre.name) <= GENRE_NAME_MAX_LENGTH for genre in band.genre_tags)
+
+
+def test_get_page_should_filter_by_genre(db_session: Session) -> None:
+    for i, genres in enumerate(["rock", "jazz", "Rock, pop", "pop", "rock"]):
+        Band(name=f"band {i}", genres=genres, manager_id="1").insert(session=db_session)
+
+    first_page, next_cursor = get_page(db_session, Band, None, 2, BandListItem, genre="ROCK")
+    second_page, last_cursor = get_page(db_session, Band, next_cursor, 2, BandListItem, genre="rock")
+
+    assert [band.name for band in first_page + second_page] == ["band 0", "band 2", "band 4"]
+    assert last_cursor is None
+    assert get_page(db_session, Band, None, 2, BandListItem, genre="metal") == ([], None)
@@ -0,0 +1,64 @@
+import pytest
+
+from in_concert.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTTLCache:
+    @pytest.fixture
+    def clock(self) -> FakeClock:
+        return FakeClock()
+
+    def test_get_should_return_cached_value_and_count_hit(self, clock):
+        cache = TTLCache(maxsize=10, ttl=5, clock=clock)
+        cache.set("key", "value")
+        assert cache.get("key") == "value"
+        assert cache.hits == 1
+        assert cache.misses == 0
+
+    def test_get_should_return_default_and_count_miss_if_missing(self, clock):
+        cache = TTLCache(maxsize=10, ttl=5, clock=clock)
+        assert cache.get("key", "default") == "default"
+        assert cache.misses == 1
+
+    def test_entry_should_expire_after_ttl(self, clock):
+        cache = TTLCache(maxsize=10, ttl=5, clock=clock)
+        cache.set("key", "value")
+        clock.now = 5
+        assert cache.get("key") is None
+        assert len(cache) == 0
+
+    def test_set_should_accept_ttl_per_entry(self, clock):
+        cache = TTLCache(maxsize=10, ttl=5, clock=clock)
+        cache.set("key", "value", ttl=20)
+        clock.now = 10
+        assert cache.get("key") == "value"
+
+    def test_least_recently_used_entry_should_be_evicted(self, clock):
+        cache = TTLCache(maxsize=2, ttl=5, clock=clock)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+
+    def test_invalidate_should_remove_entry(self, clock):
+        cache = TTLCache(maxsize=10, ttl=5, clock=clock)
+        cache.set("key", "value")
+        cache.invalidate("key")
+        cache.invalidate("missing_key")
+        assert cache.get("key") is None
+
+    def test_cache_with_zero_size_should_store_nothing(self, clock):
+        cache = TTLCache(maxsize=0, ttl=5, clock=clock)
+        cache.set("key", "value")
+        assert cache.get("key") is None
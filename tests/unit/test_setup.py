@@ -0,0 +1,35 @@
+from unittest import mock
+
+import pytest
+
+from tests.setup import (
+    TOKEN_EXPIRY_MARGIN,
+    LocalTokenIssuer,
+    get_bearer_token,
+    get_bearer_token_async,
+    token_cache,
+)
+
+
+@pytest.fixture
+def fresh_token_cache():
+    with mock.patch.object(token_cache, "_tokens", {}):
+        yield token_cache
+
+
+@pytest.mark.asyncio
+async def test_bearer_token_should_be_reused_by_sync_and_async_callers(app_settings_test, fresh_token_cache):
+    token_issuer = LocalTokenIssuer(app_settings_test)
+
+    token_dict = get_bearer_token(app_settings_test, token_issuer)
+
+    assert get_bearer_token(app_settings_test, token_issuer) is token_dict
+    assert await get_bearer_token_async(app_settings_test, token_issuer) is token_dict
+
+
+def test_bearer_token_should_be_renewed_shortly_before_expiry(app_settings_test, fresh_token_cache):
+    token_issuer = LocalTokenIssuer(app_settings_test, expires_in=int(TOKEN_EXPIRY_MARGIN))
+
+    token_dict = get_bearer_token(app_settings_test, token_issuer)
+
+    assert get_bearer_token(app_settings_test, token_issuer)["access_token"] != token_dict["access_token"]